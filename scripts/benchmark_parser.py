@@ -0,0 +1,333 @@
+import argparse
+import builtins
+import contextlib
+import gc
+import io
+import json
+import logging
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from utcm_exporter.parser import (
+    _prune_stale_yaml_files,
+    load_snapshot_file,
+    parse_snapshot_to_yaml,
+    sanitize_filename,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+_CASES = ("parse_cold", "parse_warm", "prune_full_scan", "sanitize_filename")
+_DEFAULT_SIZES = [1_000, 10_000, 100_000]
+_WORKLOADS = ("entra", "exchange", "intune", "securityandcompliance", "sharepoint", "teams")
+_SHAPES = ("list", "items", "value", "dict_of_dicts", "single", "bare")
+_INSTANCES_PER_RESOURCE = 50
+_COMPARED_METRICS = ("wallSeconds", "peakRssGrowthKb")
+# File system entry points counted while a case runs. pathlib, gzip and the parser all
+# look these up on the os/io/builtins modules at call time, so wrapping them there
+# sees every call the parser makes (stat for exists/is_dir, scandir for rglob, ...).
+_COUNTED_OS_FUNCTIONS = (
+    "stat", "lstat", "scandir", "listdir", "mkdir", "rmdir", "unlink", "replace", "rename",
+)
+
+
+def _make_instance(rng: random.Random, idx: int) -> dict[str, Any]:
+    return {
+        "displayName": f"Policy {idx} / {rng.choice(['Prod', 'Test', 'Legacy'])}: {rng.random():.6f}",
+        "id": f"{rng.getrandbits(128):032x}",
+        "state": rng.choice(["enabled", "disabled", "enabledForReportingButNotEnforced"]),
+        "conditions": {
+            "users": {"includeUsers": [f"user{rng.randrange(10_000)}" for _ in range(3)]},
+            "applications": {"includeApplications": ["All"]},
+        },
+        "settings": [{"name": f"setting{n}", "value": rng.randrange(1000)} for n in range(5)],
+    }
+
+
+def generate_snapshot(instance_count: int, *, seed: int = 0) -> dict[str, Any]:
+    """Build a synthetic snapshot covering every shape extract_instances handles."""
+    rng = random.Random(seed)
+    resources: list[dict[str, Any]] = []
+    created = 0
+    resource_idx = 0
+    while created < instance_count:
+        shape = _SHAPES[resource_idx % len(_SHAPES)]
+        workload = _WORKLOADS[resource_idx % len(_WORKLOADS)]
+        resource_type = f"microsoft.{workload}.resource{resource_idx % 40}"
+        batch = 1 if shape in ("single", "bare") else min(
+            _INSTANCES_PER_RESOURCE, instance_count - created
+        )
+        instances = [_make_instance(rng, created + n) for n in range(batch)]
+        created += batch
+        resource_idx += 1
+
+        entry: dict[str, Any] = {
+            "resourceType": resource_type,
+            "displayName": f"{resource_type}-Global",
+        }
+        if shape == "list":
+            entry["properties"] = instances
+        elif shape in ("items", "value"):
+            entry["properties"] = {shape: instances}
+        elif shape == "dict_of_dicts":
+            # Strip identity keys so names come from the dict keys.
+            entry["properties"] = {
+                f"key{n}": {k: v for k, v in instance.items() if k not in ("displayName", "id")}
+                for n, instance in enumerate(instances)
+            }
+        elif shape == "single":
+            entry["properties"] = instances[0]
+        else:
+            entry.update({k: v for k, v in instances[0].items() if k != "displayName"})
+        resources.append(entry)
+
+    return {"snapshotId": f"synthetic-{instance_count}-{seed}", "resources": resources}
+
+
+def _read_proc_io() -> dict[str, int]:
+    """read()/write() call counters for this process (Linux only)."""
+    try:
+        lines = Path("/proc/self/io").read_text(encoding="ascii").splitlines()
+    except OSError:
+        return {}
+    counters = dict(line.split(": ", 1) for line in lines if ": " in line)
+    return {key: int(counters[key]) for key in ("syscr", "syscw") if key in counters}
+
+
+def _read_proc_status_kb(field: str) -> int | None:
+    try:
+        lines = Path("/proc/self/status").read_text(encoding="ascii").splitlines()
+    except OSError:
+        return None
+    for line in lines:
+        if line.startswith(f"{field}:"):
+            return int(line.split()[1])
+    return None
+
+
+def _max_rss_kb() -> int:
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (
+        1024 if sys.platform == "darwin" else 1
+    )
+
+
+@contextlib.contextmanager
+def _count_fs_calls() -> Iterator[Counter]:
+    """Count file system calls (stat, scandir, unlink, open, ...) made inside the block."""
+    counts: Counter = Counter()
+    originals: list[tuple[Any, str, Any]] = []
+
+    def _wrap(module: Any, name: str, label: str) -> None:
+        original = getattr(module, name)
+
+        def _counted(*args: Any, **kwargs: Any) -> Any:
+            counts[label] += 1
+            return original(*args, **kwargs)
+
+        originals.append((module, name, original))
+        setattr(module, name, _counted)
+
+    for name in _COUNTED_OS_FUNCTIONS:
+        _wrap(os, name, name)
+    _wrap(io, "open", "open")
+    _wrap(builtins, "open", "open")
+    try:
+        yield counts
+    finally:
+        for module, name, original in reversed(originals):
+            setattr(module, name, original)
+
+
+def _measure(operation: Callable[[], Any]) -> dict[str, Any]:
+    # Only the operation's own allocations count: the peak is reset (Linux) or taken
+    # relative to the high-water mark left by generating the payload.
+    gc.collect()
+    resident_before = _read_proc_status_kb("VmRSS")
+    try:
+        Path("/proc/self/clear_refs").write_text("5", encoding="ascii")
+        peak_reset = resident_before is not None
+    except OSError:
+        peak_reset = False
+    max_rss_before = _max_rss_kb()
+
+    io_before = _read_proc_io()
+    with _count_fs_calls() as fs_calls:
+        started = time.perf_counter()
+        operation()
+        wall_seconds = time.perf_counter() - started
+    io_after = _read_proc_io()
+
+    peak_after = _read_proc_status_kb("VmHWM") if peak_reset else None
+    if peak_after is not None and resident_before is not None:
+        peak_growth = peak_after - resident_before
+    else:
+        peak_growth = _max_rss_kb() - max_rss_before
+    result: dict[str, Any] = {
+        "wallSeconds": round(wall_seconds, 4),
+        "peakRssGrowthKb": max(0, peak_growth),
+        "fsCalls": dict(sorted(fs_calls.items())),
+    }
+    if io_before and io_after:
+        result["readCalls"] = io_after["syscr"] - io_before["syscr"]
+        result["writeCalls"] = io_after["syscw"] - io_before["syscw"]
+    return result
+
+
+def _run_case(case: str, size: int, seed: int, fixture: str = "") -> dict[str, Any]:
+    """Run one case in this process and return its measurements."""
+    work_dir = Path(tempfile.mkdtemp(prefix="utcm-bench-"))
+    try:
+        output_root = work_dir / "tenant_state"
+        if case == "sanitize_filename":
+            names = [f"Policy {idx}: name/with*odd?chars <{idx}>" for idx in range(size)]
+            return _measure(lambda: [sanitize_filename(name) for name in names])
+
+        payload = load_snapshot_file(fixture) if fixture else generate_snapshot(size, seed=seed)
+        if case == "parse_cold":
+            return _measure(lambda: parse_snapshot_to_yaml(payload, output_root, clean=True))
+        if case == "parse_warm":
+            parse_snapshot_to_yaml(payload, output_root, clean=True)
+            return _measure(lambda: parse_snapshot_to_yaml(payload, output_root, clean=True))
+        if case == "prune_full_scan":
+            parse_snapshot_to_yaml(payload, output_root, clean=False)
+            kept = sorted(output_root.rglob("*.yaml"))[::2]
+            return _measure(
+                lambda: _prune_stale_yaml_files(output_base=output_root, written_files=kept)
+            )
+        raise ValueError(f"Unknown benchmark case: {case}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _run_case_subprocess(case: str, size: int, seed: int, fixture: str = "") -> dict[str, Any]:
+    # A fresh interpreter per case keeps peak RSS attributable to that case alone.
+    command = [sys.executable, __file__, "--run-case", case, "--sizes", str(size), "--seed", str(seed)]
+    if fixture:
+        command += ["--fixture", fixture]
+    completed = subprocess.run(
+        command,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _compare(results: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    regressions: list[str] = []
+    for case, by_size in results["results"].items():
+        for size, metrics in by_size.items():
+            reference = baseline.get("results", {}).get(case, {}).get(size)
+            if not reference:
+                continue
+            for metric in _COMPARED_METRICS:
+                if metric not in reference or metric not in metrics:
+                    continue
+                limit = reference[metric] * (1 + tolerance)
+                if metrics[metric] > limit:
+                    regressions.append(
+                        f"{case}[{size}] {metric}: {metrics[metric]} > {reference[metric]} "
+                        f"(+{tolerance:.0%} allowed)"
+                    )
+    return regressions
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the snapshot parser against synthetic tenant-scale snapshots.",
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=_DEFAULT_SIZES,
+        help="Instance counts to benchmark (default: 1000 10000 100000).",
+    )
+    parser.add_argument(
+        "--cases",
+        nargs="+",
+        choices=_CASES,
+        default=list(_CASES),
+        help="Benchmark cases to run (default: all).",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Generator seed (default: 0).")
+    parser.add_argument(
+        "--fixture",
+        default="",
+        help=(
+            "Benchmark against a stored snapshot file (plain, gzip or zstd JSON) instead "
+            "of a generated one; --sizes then only labels the results."
+        ),
+    )
+    parser.add_argument(
+        "--save-baseline",
+        default="",
+        help="Write results to this JSON file for later comparison.",
+    )
+    parser.add_argument(
+        "--compare",
+        default="",
+        help="Baseline JSON to compare against; exits non-zero on regression.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed relative slowdown/growth before a metric counts as a regression (default: 0.25).",
+    )
+    parser.add_argument("--run-case", choices=_CASES, help=argparse.SUPPRESS)
+    return parser
+
+
+def main() -> None:
+    args = _build_parser().parse_args()
+
+    if args.run_case:
+        print(json.dumps(_run_case(args.run_case, args.sizes[0], args.seed, args.fixture)))
+        return
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s - %(message)s",
+    )
+
+    results: dict[str, Any] = {
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "seed": args.seed,
+        "results": {},
+    }
+    for case in args.cases:
+        for size in args.sizes:
+            metrics = _run_case_subprocess(case, size, args.seed, args.fixture)
+            results["results"].setdefault(case, {})[str(size)] = metrics
+            LOGGER.info("%s[%d]: %s", case, size, json.dumps(metrics, sort_keys=True))
+
+    if args.save_baseline:
+        baseline_path = Path(args.save_baseline)
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        LOGGER.info("Wrote benchmark baseline: %s", baseline_path)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = _compare(results, baseline, args.tolerance)
+        if regressions:
+            for regression in regressions:
+                LOGGER.error("Regression: %s", regression)
+            raise SystemExit(1)
+        LOGGER.info("No regressions against %s", args.compare)
+
+
+if __name__ == "__main__":
+    main()
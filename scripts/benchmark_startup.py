@@ -0,0 +1,230 @@
+import argparse
+import contextlib
+import json
+import logging
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Iterator
+
+LOGGER = logging.getLogger(__name__)
+
+_COMMANDS = ("snapshot", "parse", "cleanup", "catalog", "run-all")
+_HEAVY_PACKAGES = ("msal", "requests", "yaml", "dotenv")
+_REPO_ROOT = Path(__file__).resolve().parent.parent
+# The standalone script each subcommand replaced, run from the baseline checkout.
+_BASELINE_SCRIPTS = {
+    "snapshot": "scripts/run_utcm_snapshot.py",
+    "parse": "scripts/parse_snapshot.py",
+    "cleanup": "scripts/cleanup_snapshot_jobs.py",
+    "catalog": "scripts/build_resources_catalog.py",
+    "run-all": "scripts/run_pipeline.py",
+}
+_CLI_MODULE_PATH = "src/utcm_exporter/cli.py"
+_COMPARED_METRICS = ("importSeconds", "wallSeconds")
+_IMPORTTIME_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+\d+ \|\s+(\S+)")
+
+
+def _git(args: list[str]) -> str:
+    completed = subprocess.run(
+        ["git", *args], cwd=_REPO_ROOT, capture_output=True, text=True, check=False
+    )
+    if completed.returncode != 0:
+        LOGGER.error("git %s failed: %s", args[0], completed.stderr.strip())
+        raise SystemExit(1)
+    return completed.stdout.strip()
+
+
+def _default_baseline_ref() -> str:
+    """Parent of the commit that added the CLI, i.e. the last tree with standalone scripts."""
+    added = _git(["log", "--diff-filter=A", "--format=%H", "--", _CLI_MODULE_PATH]).split()
+    if not added:
+        LOGGER.error("Could not find the commit adding %s; pass --baseline-ref", _CLI_MODULE_PATH)
+        raise SystemExit(1)
+    return f"{added[-1]}^"
+
+
+@contextlib.contextmanager
+def _baseline_checkout(ref: str) -> Iterator[Path]:
+    """Check ``ref`` out into a temporary git worktree, removed afterwards."""
+    with tempfile.TemporaryDirectory(prefix="utcm-startup-baseline-") as temp_dir:
+        tree = Path(temp_dir) / "tree"
+        _git(["worktree", "add", "--detach", "--quiet", str(tree), ref])
+        try:
+            yield tree
+        finally:
+            _git(["worktree", "remove", "--force", str(tree)])
+
+
+def _command_line(command: str, mode: str, baseline_tree: Path) -> list[str]:
+    if mode == "cli":
+        return [sys.executable, "-X", "importtime", "-m", "utcm_exporter.cli", command, "--help"]
+    script = baseline_tree / _BASELINE_SCRIPTS[command]
+    return [sys.executable, "-X", "importtime", str(script), "--help"]
+
+
+def _command_env(mode: str, baseline_tree: Path) -> dict[str, str]:
+    # Each side imports utcm_exporter from its own tree, ahead of any installed copy.
+    source = (_REPO_ROOT if mode == "cli" else baseline_tree) / "src"
+    return {**os.environ, "PYTHONPATH": str(source)}
+
+
+def _measure_once(command_line: list[str], env: dict[str, str]) -> dict[str, Any]:
+    started = time.perf_counter()
+    completed = subprocess.run(command_line, check=True, capture_output=True, text=True, env=env)
+    wall_seconds = time.perf_counter() - started
+
+    import_microseconds = 0
+    modules: set[str] = set()
+    for line in completed.stderr.splitlines():
+        match = _IMPORTTIME_PATTERN.match(line)
+        if match:
+            import_microseconds += int(match.group(1))
+            modules.add(match.group(2))
+    return {
+        "importSeconds": import_microseconds / 1_000_000,
+        "wallSeconds": wall_seconds,
+        "modules": len(modules),
+        "heavyPackages": sorted(name for name in _HEAVY_PACKAGES if name in modules),
+    }
+
+
+def _measure(command: str, mode: str, repeat: int, baseline_tree: Path) -> dict[str, Any]:
+    """Median of ``repeat`` fresh interpreters, so one cold file cache does not skew it."""
+    command_line = _command_line(command, mode, baseline_tree)
+    env = _command_env(mode, baseline_tree)
+    runs = [_measure_once(command_line, env) for _ in range(max(1, repeat))]
+    return {
+        "importSeconds": round(statistics.median(run["importSeconds"] for run in runs), 4),
+        "wallSeconds": round(statistics.median(run["wallSeconds"] for run in runs), 4),
+        "modules": runs[-1]["modules"],
+        "heavyPackages": runs[-1]["heavyPackages"],
+    }
+
+
+def _compare(results: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    regressions: list[str] = []
+    for command, metrics in results["results"].items():
+        reference = baseline.get("results", {}).get(command, {}).get("cli")
+        if not reference:
+            continue
+        for metric in _COMPARED_METRICS:
+            limit = reference[metric] * (1 + tolerance)
+            if metrics["cli"][metric] > limit:
+                regressions.append(
+                    f"{command} {metric}: {metrics['cli'][metric]} > {reference[metric]} "
+                    f"(+{tolerance:.0%} allowed)"
+                )
+    return regressions
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Measure start-up cost of 'utcm-exporter <command> --help' with python -X "
+            "importtime, against '<script> --help' of the former standalone scripts "
+            "checked out from a baseline commit."
+        ),
+    )
+    parser.add_argument(
+        "--commands",
+        nargs="+",
+        choices=_COMMANDS,
+        default=list(_COMMANDS),
+        help="CLI commands to measure (default: all).",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Fresh interpreters per measurement; the median is reported (default: 5).",
+    )
+    parser.add_argument(
+        "--baseline-ref",
+        default="",
+        help=(
+            "Git revision whose standalone scripts are the baseline "
+            "(default: the parent of the commit that added the CLI)."
+        ),
+    )
+    parser.add_argument(
+        "--save-baseline",
+        default="",
+        help="Write results to this JSON file for later comparison.",
+    )
+    parser.add_argument(
+        "--compare",
+        default="",
+        help="Baseline JSON to compare the CLI against; exits non-zero on regression.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed relative slowdown before a metric counts as a regression (default: 0.25).",
+    )
+    return parser
+
+
+def main() -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s - %(message)s",
+    )
+    args = _build_parser().parse_args()
+    baseline_ref = args.baseline_ref or _default_baseline_ref()
+    baseline_commit = _git(["rev-parse", "--short", f"{baseline_ref}^{{commit}}"])
+
+    results: dict[str, Any] = {
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "repeat": args.repeat,
+        "baselineCommit": baseline_commit,
+        "results": {},
+    }
+    with _baseline_checkout(baseline_commit) as baseline_tree:
+        for command in args.commands:
+            cli = _measure(command, "cli", args.repeat, baseline_tree)
+            standalone = _measure(command, "baseline", args.repeat, baseline_tree)
+            results["results"][command] = {"cli": cli, "baseline": standalone}
+            LOGGER.info(
+                "%s: imports %.1f ms (%d modules, heavy: %s) vs %s %.1f ms (%d modules, "
+                "heavy: %s); wall %.1f ms vs %.1f ms",
+                command,
+                cli["importSeconds"] * 1000,
+                cli["modules"],
+                ", ".join(cli["heavyPackages"]) or "none",
+                _BASELINE_SCRIPTS[command],
+                standalone["importSeconds"] * 1000,
+                standalone["modules"],
+                ", ".join(standalone["heavyPackages"]) or "none",
+                cli["wallSeconds"] * 1000,
+                standalone["wallSeconds"] * 1000,
+            )
+
+    if args.save_baseline:
+        baseline_path = Path(args.save_baseline)
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(
+            json.dumps(results, indent=2, sort_keys=True) + "\n",
+            encoding="utf-8",
+        )
+        LOGGER.info("Wrote start-up baseline: %s", baseline_path)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = _compare(results, baseline, args.tolerance)
+        if regressions:
+            for regression in regressions:
+                LOGGER.error("Regression: %s", regression)
+            raise SystemExit(1)
+        LOGGER.info("No regressions against %s", args.compare)
+
+
+if __name__ == "__main__":
+    main()
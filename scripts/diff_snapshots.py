@@ -0,0 +1,72 @@
+import argparse
+import json
+import logging
+from pathlib import Path
+
+from utcm_exporter.diff import diff_snapshots, render_markdown
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare two snapshots (tenant_state directories or snapshot JSON files) "
+            "instance by instance and report added, removed and modified instances."
+        ),
+    )
+    parser.add_argument("old", help="Older snapshot: tenant_state directory or snapshot file.")
+    parser.add_argument("new", help="Newer snapshot: tenant_state directory or snapshot file.")
+    parser.add_argument(
+        "--format",
+        choices=("markdown", "json"),
+        default="markdown",
+        help="Report format (default: markdown).",
+    )
+    parser.add_argument(
+        "--output",
+        default="",
+        help="Write the report to this file instead of stdout.",
+    )
+    parser.add_argument(
+        "--exit-code",
+        action="store_true",
+        help="Exit with status 1 when the snapshots differ.",
+    )
+    return parser
+
+
+def main() -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s - %(message)s",
+    )
+    args = _build_parser().parse_args()
+
+    report = diff_snapshots(args.old, args.new)
+    if args.format == "json":
+        rendered = json.dumps(report.as_dict(), indent=2, ensure_ascii=False) + "\n"
+    else:
+        rendered = render_markdown(report)
+
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_text(rendered, encoding="utf-8")
+        LOGGER.info("Wrote diff report: %s", output_path)
+    else:
+        print(rendered, end="")
+
+    LOGGER.info(
+        "Instances added: %d, removed: %d, modified: %d, unchanged: %d",
+        len(report.added),
+        len(report.removed),
+        len(report.modified),
+        report.unchanged,
+    )
+    if args.exit_code and report.changed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
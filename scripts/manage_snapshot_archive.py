@@ -0,0 +1,108 @@
+import argparse
+import gzip
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+
+from utcm_exporter.archive import SnapshotArchive
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="List, export and prune archived raw UTCM snapshots.",
+    )
+    parser.add_argument(
+        "--archive-dir",
+        default=".utcm_state/archive",
+        help="Snapshot archive directory (default: .utcm_state/archive).",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("list", help="Print archived snapshots as JSON lines.")
+
+    export = subparsers.add_parser(
+        "export",
+        help="Write one archived snapshot back out as a JSON file.",
+    )
+    selector = export.add_mutually_exclusive_group()
+    selector.add_argument("--snapshot-id", help="Archived snapshot ID.")
+    selector.add_argument("--job-id", help="Snapshot job ID recorded at archive time.")
+    selector.add_argument(
+        "--at",
+        type=datetime.fromisoformat,
+        help="Export the latest snapshot taken at or before this ISO timestamp.",
+    )
+    export.add_argument(
+        "--output",
+        required=True,
+        help="Destination file; a .gz suffix writes gzip-compressed JSON.",
+    )
+
+    prune = subparsers.add_parser(
+        "prune",
+        help="Apply a retention policy and delete unreferenced objects.",
+    )
+    prune.add_argument(
+        "--keep-last",
+        type=int,
+        default=None,
+        help="Always keep this many of the newest snapshots.",
+    )
+    prune.add_argument(
+        "--max-age-days",
+        type=int,
+        default=None,
+        help="Delete snapshots older than this many days (unless kept by --keep-last).",
+    )
+    prune.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Log snapshots that would be deleted without deleting them.",
+    )
+    return parser
+
+
+def main() -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s - %(message)s",
+    )
+    args = _build_parser().parse_args()
+    archive = SnapshotArchive(args.archive_dir)
+
+    if args.command == "list":
+        for snapshot in archive.list_snapshots():
+            print(json.dumps(snapshot.as_dict()))
+        return
+
+    if args.command == "export":
+        snapshot = archive.find(snapshot_id=args.snapshot_id, job_id=args.job_id, at=args.at)
+        if snapshot is None:
+            LOGGER.error("No archived snapshot matches the given selector")
+            raise SystemExit(1)
+        payload = archive.load_payload(snapshot.snapshot_id)
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        content = json.dumps(payload).encode("utf-8")
+        if output_path.suffix == ".gz":
+            content = gzip.compress(content)
+        output_path.write_bytes(content)
+        LOGGER.info("Exported archived snapshot %s to %s", snapshot.snapshot_id, output_path)
+        return
+
+    result = archive.apply_retention(
+        keep_last=args.keep_last,
+        max_age_days=args.max_age_days,
+        dry_run=args.dry_run,
+    )
+    if args.dry_run:
+        for snapshot_id in result.removed_snapshots:
+            LOGGER.info("Would delete archived snapshot %s", snapshot_id)
+        LOGGER.info("Archived snapshots matched (dry run): %d", len(result.removed_snapshots))
+
+
+if __name__ == "__main__":
+    main()
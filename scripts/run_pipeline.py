@@ -0,0 +1,6 @@
+import sys
+
+from utcm_exporter.cli import main
+
+if __name__ == "__main__":
+    main(["run-all", *sys.argv[1:]])
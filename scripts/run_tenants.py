@@ -0,0 +1,81 @@
+import argparse
+import logging
+import signal
+
+from utcm_exporter.metrics import REGISTRY
+from utcm_exporter.tenants import (
+    MultiTenantRunner,
+    load_tenants_config,
+    render_report_table,
+    write_report,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Run the snapshot -> YAML pipeline for every tenant in a tenants config, "
+            "concurrently within global and per-tenant limits, and write a run report."
+        ),
+    )
+    parser.add_argument(
+        "--config",
+        default="tenants.json",
+        help="Tenants config JSON (default: tenants.json).",
+    )
+    parser.add_argument(
+        "--tenants",
+        nargs="+",
+        default=[],
+        help="Only run these tenants (names from the config).",
+    )
+    parser.add_argument(
+        "--report-file",
+        default="",
+        help="Write the JSON run report here instead of the config's reportFile.",
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        default="",
+        help=(
+            "Write Prometheus metrics here for node_exporter's textfile collector "
+            "(overrides the config's metricsTextfile)."
+        ),
+    )
+    return parser
+
+
+def main() -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s - %(message)s",
+    )
+    args = _build_parser().parse_args()
+
+    config = load_tenants_config(args.config)
+    runner = MultiTenantRunner(config)
+
+    def _handle_signal(signum: int, _frame: object) -> None:
+        LOGGER.info("Received %s; interrupting running jobs", signal.Signals(signum).name)
+        runner.stop()
+
+    signal.signal(signal.SIGINT, _handle_signal)
+    signal.signal(signal.SIGTERM, _handle_signal)
+
+    metrics_textfile = args.metrics_textfile or config.metrics_textfile
+    try:
+        report = runner.run(args.tenants or None)
+    finally:
+        if metrics_textfile:
+            REGISTRY.write_textfile(metrics_textfile)
+    report_path = write_report(report, args.report_file or config.report_file)
+    print(render_report_table(report))
+    LOGGER.info("Run report written to %s", report_path)
+    if report.failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
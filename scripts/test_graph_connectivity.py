@@ -1,8 +1,6 @@
 import logging
 
-import requests
-
-from utcm_exporter.auth import get_access_token
+from utcm_exporter.graph_session import get_graph_session
 
 LOGGER = logging.getLogger(__name__)
 
@@ -13,16 +11,9 @@ def main() -> None:
         format="%(asctime)s %(levelname)s %(name)s - %(message)s",
     )
 
-    token = get_access_token()
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/json",
-    }
-
     LOGGER.info("Calling Microsoft Graph /v1.0/organization")
-    response = requests.get(
+    response = get_graph_session().get(
         "https://graph.microsoft.com/v1.0/organization",
-        headers=headers,
         timeout=30,
     )
     response.raise_for_status()
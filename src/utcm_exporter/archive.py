@@ -0,0 +1,419 @@
+import contextlib
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Iterable, Iterator
+
+from utcm_exporter.locking import FILE_LOCKS_SUPPORTED, file_lock
+
+LOGGER = logging.getLogger(__name__)
+
+_ARCHIVE_VERSION = 1
+_INDEX_FILE_NAME = "index.json"
+_OBJECTS_DIR = "objects"
+_SNAPSHOTS_DIR = "snapshots"
+# Writers hold _LOCK_FILE_NAME shared from their first object until their manifest is
+# indexed; garbage collection holds it exclusively. Index updates serialise on their own.
+_LOCK_FILE_NAME = ".lock"
+_INDEX_LOCK_FILE_NAME = ".index.lock"
+# Without flock, objects younger than this are never collected, so a writer in another
+# process has that long to reference them.
+_GC_GRACE_SECONDS = 3600
+_CODEC_SUFFIXES = {"zstd": ".json.zst", "gzip": ".json.gz"}
+_GZIP_LEVEL = 6
+_ZSTD_LEVEL = 10
+
+
+class SnapshotArchiveError(RuntimeError):
+    """Raised when the snapshot archive cannot store or load a snapshot."""
+
+
+@dataclass(frozen=True)
+class ArchivedSnapshot:
+    """Index entry for one archived snapshot."""
+
+    snapshot_id: str
+    created_at: datetime
+    job_ids: tuple[str, ...] = ()
+    resource_count: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "snapshotId": self.snapshot_id,
+            "createdAt": self.created_at.isoformat(),
+            "jobIds": list(self.job_ids),
+            "resourceCount": self.resource_count,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ArchivedSnapshot":
+        return cls(
+            snapshot_id=str(data["snapshotId"]),
+            created_at=datetime.fromisoformat(str(data["createdAt"])),
+            job_ids=tuple(str(job_id) for job_id in data.get("jobIds", [])),
+            resource_count=int(data.get("resourceCount", 0)),
+        )
+
+
+@dataclass
+class RetentionResult:
+    """Outcome of applying a retention policy to the archive."""
+
+    removed_snapshots: list[str] = field(default_factory=list)
+    removed_objects: int = 0
+
+
+def _zstd_module() -> ModuleType | None:
+    # zstandard is optional; gzip from the standard library is the fallback.
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def _canonical_json(value: Any) -> bytes:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode(
+        "utf-8"
+    )
+
+
+def _atomic_write_bytes(path: Path, content: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(content)
+    os.replace(tmp_path, path)
+
+
+class SnapshotArchive:
+    """Content-addressed, compressed store of raw snapshot payloads.
+
+    Each resource entry is stored once as canonical JSON under ``objects/`` keyed by
+    its sha256, compressed with zstd when ``zstandard`` is installed and gzip
+    otherwise. A snapshot is a small manifest under ``snapshots/`` listing its
+    resource hashes and top-level metadata, so resources that did not change between
+    snapshots cost no extra space. ``index.json`` keeps job IDs and timestamps for
+    lookups without opening every manifest.
+
+    Archiving and retention may run in different processes on the same directory:
+    writers share a file lock that garbage collection takes exclusively, so objects
+    written ahead of their manifest are never collected.
+    """
+
+    def __init__(self, root: Path | str, *, codec: str | None = None) -> None:
+        self.root = Path(root)
+        if codec is None:
+            codec = "zstd" if _zstd_module() is not None else "gzip"
+        if codec not in _CODEC_SUFFIXES:
+            raise SnapshotArchiveError(f"Unsupported archive codec: {codec}")
+        if codec == "zstd" and _zstd_module() is None:
+            raise SnapshotArchiveError("The zstd codec requires the 'zstandard' package")
+        self.codec = codec
+        self._lock = threading.Lock()
+
+    # Objects
+
+    def _object_paths(self, digest: str) -> list[Path]:
+        base = self.root / _OBJECTS_DIR / digest[:2]
+        return [base / f"{digest}{suffix}" for suffix in _CODEC_SUFFIXES.values()]
+
+    def _compress(self, content: bytes) -> bytes:
+        if self.codec == "zstd":
+            zstandard = _zstd_module()
+            return zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(content)
+        return gzip.compress(content, compresslevel=_GZIP_LEVEL, mtime=0)
+
+    def _put_object(self, value: Any) -> tuple[str, bool]:
+        content = _canonical_json(value)
+        digest = hashlib.sha256(content).hexdigest()
+        for path in self._object_paths(digest):
+            if path.exists():
+                if not FILE_LOCKS_SUPPORTED:
+                    # Restart the grace period of an object that may be unreferenced.
+                    path.touch()
+                return digest, False
+        target = self.root / _OBJECTS_DIR / digest[:2] / f"{digest}{_CODEC_SUFFIXES[self.codec]}"
+        _atomic_write_bytes(target, self._compress(content))
+        return digest, True
+
+    def _get_object(self, digest: str) -> Any:
+        for path in self._object_paths(digest):
+            try:
+                raw = path.read_bytes()
+            except FileNotFoundError:
+                continue
+            if path.name.endswith(_CODEC_SUFFIXES["zstd"]):
+                zstandard = _zstd_module()
+                if zstandard is None:
+                    raise SnapshotArchiveError(
+                        f"Archived object {digest} is zstd-compressed; install 'zstandard'"
+                    )
+                content = zstandard.ZstdDecompressor().decompress(raw)
+            else:
+                content = gzip.decompress(raw)
+            return json.loads(content)
+        raise SnapshotArchiveError(f"Archived object is missing: {digest}")
+
+    # Snapshots
+
+    def store(
+        self,
+        payload: dict[str, Any],
+        *,
+        job_ids: Iterable[str] = (),
+        created_at: datetime | None = None,
+    ) -> ArchivedSnapshot:
+        """Archive a full snapshot payload."""
+        resources = payload.get("resources", [])
+        if not isinstance(resources, list):
+            raise SnapshotArchiveError("Snapshot JSON does not contain a list at 'resources'")
+        with self._writer_lock():
+            stored = [self._put_object(resource) for resource in resources]
+            return self._write_snapshot(
+                stored,
+                metadata={key: value for key, value in payload.items() if key != "resources"},
+                job_ids=job_ids,
+                created_at=created_at,
+            )
+
+    def archive_resources(
+        self,
+        resources: Iterable[Any],
+        *,
+        metadata: dict[str, Any] | None = None,
+        job_ids: Iterable[str] = (),
+        created_at: datetime | None = None,
+    ) -> Iterator[Any]:
+        """Pass ``resources`` through unchanged while archiving each entry.
+
+        Works on the lazy stream from stream_snapshot_resources. The snapshot manifest
+        is written once the input is exhausted, reading ``metadata`` at that point so a
+        dict filled during streaming is complete. An abandoned iteration archives
+        nothing but may leave objects behind for the next retention run to collect.
+        Retention waits until the iteration finishes or is closed.
+        """
+        with self._writer_lock():
+            stored: list[tuple[str, bool]] = []
+            for resource in resources:
+                stored.append(self._put_object(resource))
+                yield resource
+            self._write_snapshot(
+                stored,
+                metadata=metadata,
+                job_ids=job_ids,
+                created_at=created_at,
+            )
+
+    def _writer_lock(self) -> contextlib.AbstractContextManager[None]:
+        return file_lock(self.root / _LOCK_FILE_NAME, shared=True)
+
+    @contextlib.contextmanager
+    def _index_lock(self) -> Iterator[None]:
+        with self._lock, file_lock(self.root / _INDEX_LOCK_FILE_NAME, shared=False):
+            yield
+
+    def _write_snapshot(
+        self,
+        objects: list[tuple[str, bool]],
+        *,
+        metadata: dict[str, Any] | None,
+        job_ids: Iterable[str],
+        created_at: datetime | None,
+    ) -> ArchivedSnapshot:
+        created_at = created_at or datetime.now(UTC)
+        digests = [digest for digest, _ in objects]
+        fingerprint = hashlib.sha256("\n".join(digests).encode("ascii")).hexdigest()[:8]
+        snapshot = ArchivedSnapshot(
+            snapshot_id=f"{created_at.astimezone(UTC):%Y%m%dT%H%M%SZ}-{fingerprint}",
+            created_at=created_at,
+            job_ids=tuple(job_ids),
+            resource_count=len(digests),
+        )
+        manifest = {
+            "version": _ARCHIVE_VERSION,
+            **snapshot.as_dict(),
+            "metadata": metadata or {},
+            "resources": digests,
+        }
+        _atomic_write_bytes(
+            self.root / _SNAPSHOTS_DIR / f"{snapshot.snapshot_id}.json",
+            (json.dumps(manifest, indent=2) + "\n").encode("utf-8"),
+        )
+        with self._index_lock():
+            index = self._load_index()
+            index[snapshot.snapshot_id] = snapshot
+            self._save_index(index)
+        LOGGER.info(
+            "Archived snapshot %s: %d resources, %d new objects",
+            snapshot.snapshot_id,
+            len(digests),
+            sum(created for _, created in objects),
+        )
+        return snapshot
+
+    def list_snapshots(self) -> list[ArchivedSnapshot]:
+        """Return archived snapshots, oldest first."""
+        with self._lock:
+            index = self._load_index()
+        return sorted(index.values(), key=lambda item: (item.created_at, item.snapshot_id))
+
+    def find(
+        self,
+        *,
+        snapshot_id: str | None = None,
+        job_id: str | None = None,
+        at: datetime | None = None,
+    ) -> ArchivedSnapshot | None:
+        """Look up a snapshot by ID, by job ID, or the latest one created at or before ``at``.
+
+        With no criteria the most recent snapshot is returned.
+        """
+        snapshots = self.list_snapshots()
+        if snapshot_id is not None:
+            snapshots = [item for item in snapshots if item.snapshot_id == snapshot_id]
+        if job_id is not None:
+            snapshots = [item for item in snapshots if job_id in item.job_ids]
+        if at is not None:
+            if at.tzinfo is None:
+                at = at.replace(tzinfo=UTC)
+            snapshots = [item for item in snapshots if item.created_at <= at]
+        return snapshots[-1] if snapshots else None
+
+    def _load_manifest(self, snapshot_id: str) -> dict[str, Any]:
+        path = self.root / _SNAPSHOTS_DIR / f"{snapshot_id}.json"
+        try:
+            manifest = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError as exc:
+            raise SnapshotArchiveError(f"Archived snapshot not found: {snapshot_id}") from exc
+        except (OSError, ValueError) as exc:
+            raise SnapshotArchiveError(
+                f"Archived snapshot {snapshot_id} is unreadable: {exc}"
+            ) from exc
+        if not isinstance(manifest, dict) or not isinstance(manifest.get("resources"), list):
+            raise SnapshotArchiveError(f"Archived snapshot {snapshot_id} has an unexpected format")
+        return manifest
+
+    def iter_resources(self, snapshot_id: str) -> Iterator[Any]:
+        """Yield the resource entries of an archived snapshot one at a time."""
+        for digest in self._load_manifest(snapshot_id)["resources"]:
+            yield self._get_object(digest)
+
+    def load_payload(self, snapshot_id: str) -> dict[str, Any]:
+        """Rebuild the full snapshot payload (metadata plus ``resources``)."""
+        manifest = self._load_manifest(snapshot_id)
+        resources = [self._get_object(digest) for digest in manifest["resources"]]
+        return {**manifest.get("metadata", {}), "resources": resources}
+
+    # Retention
+
+    def apply_retention(
+        self,
+        *,
+        keep_last: int | None = None,
+        max_age_days: int | None = None,
+        dry_run: bool = False,
+        now: datetime | None = None,
+    ) -> RetentionResult:
+        """Drop snapshots outside the policy, then delete objects no snapshot references.
+
+        A snapshot is kept if it is among the ``keep_last`` newest or younger than
+        ``max_age_days``; with neither set, only unreferenced objects are collected.
+        Waits for snapshots still being archived, in this or another process.
+        """
+        now = now or datetime.now(UTC)
+        result = RetentionResult()
+        gc_lock = file_lock(self.root / _LOCK_FILE_NAME, shared=False)
+        with gc_lock, self._index_lock():
+            index = self._load_index()
+            ordered = sorted(index.values(), key=lambda item: (item.created_at, item.snapshot_id))
+            if keep_last is not None or max_age_days is not None:
+                newest = {item.snapshot_id for item in ordered[-keep_last:]} if keep_last else set()
+                cutoff = now - timedelta(days=max_age_days) if max_age_days is not None else None
+                for item in ordered:
+                    if item.snapshot_id in newest:
+                        continue
+                    if cutoff is not None and item.created_at >= cutoff:
+                        continue
+                    result.removed_snapshots.append(item.snapshot_id)
+
+            if dry_run:
+                return result
+
+            for snapshot_id in result.removed_snapshots:
+                (self.root / _SNAPSHOTS_DIR / f"{snapshot_id}.json").unlink(missing_ok=True)
+                index.pop(snapshot_id, None)
+            self._save_index(index)
+            result.removed_objects = self._collect_garbage(index)
+
+        LOGGER.info(
+            "Archive retention removed %d snapshots and %d objects",
+            len(result.removed_snapshots),
+            result.removed_objects,
+        )
+        return result
+
+    def _collect_garbage(self, index: dict[str, ArchivedSnapshot]) -> int:
+        referenced: set[str] = set()
+        for snapshot_id in index:
+            referenced.update(self._load_manifest(snapshot_id)["resources"])
+
+        removed = 0
+        objects_dir = self.root / _OBJECTS_DIR
+        if not objects_dir.exists():
+            return 0
+        grace_cutoff = time.time() - _GC_GRACE_SECONDS if not FILE_LOCKS_SUPPORTED else None
+        for path in objects_dir.glob("*/*"):
+            digest = path.name.split(".", 1)[0]
+            if digest in referenced:
+                continue
+            if grace_cutoff is not None and path.stat().st_mtime > grace_cutoff:
+                continue
+            path.unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+    # Index
+
+    def _load_index(self) -> dict[str, ArchivedSnapshot]:
+        path = self.root / _INDEX_FILE_NAME
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            return {
+                entry["snapshotId"]: ArchivedSnapshot.from_dict(entry)
+                for entry in data["snapshots"]
+            }
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            LOGGER.warning("Rebuilding unreadable archive index %s: %s", path, exc)
+        return self._rebuild_index()
+
+    def _rebuild_index(self) -> dict[str, ArchivedSnapshot]:
+        index: dict[str, ArchivedSnapshot] = {}
+        snapshots_dir = self.root / _SNAPSHOTS_DIR
+        if not snapshots_dir.exists():
+            return index
+        for path in snapshots_dir.glob("*.json"):
+            try:
+                snapshot = ArchivedSnapshot.from_dict(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError, KeyError, TypeError) as exc:
+                LOGGER.warning("Skipping unreadable archived snapshot %s: %s", path, exc)
+                continue
+            index[snapshot.snapshot_id] = snapshot
+        return index
+
+    def _save_index(self, index: dict[str, ArchivedSnapshot]) -> None:
+        ordered = sorted(index.values(), key=lambda item: (item.created_at, item.snapshot_id))
+        data = {"version": _ARCHIVE_VERSION, "snapshots": [item.as_dict() for item in ordered]}
+        _atomic_write_bytes(
+            self.root / _INDEX_FILE_NAME,
+            (json.dumps(data, indent=2) + "\n").encode("utf-8"),
+        )
@@ -1,19 +1,56 @@
 import logging
 import os
-from typing import Sequence
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Sequence
 
-from dotenv import load_dotenv
-from msal import ConfidentialClientApplication
+from utcm_exporter.metrics import REGISTRY
+
+if TYPE_CHECKING:
+    from msal import ConfidentialClientApplication, SerializableTokenCache
 
 LOGGER = logging.getLogger(__name__)
 
 _GRAPH_DEFAULT_SCOPE = "https://graph.microsoft.com/.default"
+_DEFAULT_REFRESH_MARGIN_SECONDS = 300
+
+_TOKEN_CACHE_PATH_ENV = "UTCM_TOKEN_CACHE_PATH"
+_TOKEN_CACHE_KEY_ENV = "UTCM_TOKEN_CACHE_KEY"
+
+# One MSAL application per (tenant, client, cache file) for the whole process, so the
+# MSAL token cache and its HTTP session are reused across providers and calls.
+_MSAL_APPS: dict[tuple[str, str, str], "ConfidentialClientApplication"] = {}
+_MSAL_APPS_LOCK = threading.Lock()
+
+_TOKEN_REQUESTS = REGISTRY.counter(
+    "utcm_token_requests_total",
+    "Token lookups by source: memory (provider cache), cache (MSAL token cache), "
+    "identity_provider (token endpoint) or error.",
+    ("source",),
+)
+_TOKEN_ACQUIRE_SECONDS = REGISTRY.histogram(
+    "utcm_token_acquire_seconds",
+    "Time spent acquiring a token through MSAL on a provider cache miss.",
+)
+
+_DEFAULT_PROVIDER: "TokenProvider | None" = None
+_DEFAULT_PROVIDER_LOCK = threading.Lock()
 
 
 class AuthConfigError(ValueError):
     """Raised when required auth environment variables are missing."""
 
 
+def _load_dotenv() -> None:
+    # python-dotenv and msal are imported on first use, so commands that never
+    # authenticate (parsing a local snapshot, --help) do not pay for them.
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+
 def _read_required_env(name: str) -> str:
     value = os.getenv(name)
     if not value:
@@ -21,35 +58,195 @@ def _read_required_env(name: str) -> str:
     return value
 
 
-def get_access_token(scopes: Sequence[str] | None = None) -> str:
-    """Acquire an app-only Microsoft Graph access token using client credentials."""
-    load_dotenv()
-
-    tenant_id = _read_required_env("AZURE_TENANT_ID")
-    client_id = _read_required_env("AZURE_CLIENT_ID")
-    client_secret = _read_required_env("AZURE_CLIENT_SECRET")
-
-    authority = f"https://login.microsoftonline.com/{tenant_id}"
-    requested_scopes = list(scopes) if scopes else [_GRAPH_DEFAULT_SCOPE]
-
-    app = ConfidentialClientApplication(
-        client_id=client_id,
-        client_credential=client_secret,
-        authority=authority,
-    )
+@dataclass(frozen=True)
+class ClientCredentials:
+    """App registration credentials used for the client credentials flow."""
+
+    tenant_id: str
+    client_id: str
+    client_secret: str = field(repr=False)
+
+    @property
+    def authority(self) -> str:
+        return f"https://login.microsoftonline.com/{self.tenant_id}"
+
+    @classmethod
+    def from_env(cls) -> "ClientCredentials":
+        _load_dotenv()
+        return cls(
+            tenant_id=_read_required_env("AZURE_TENANT_ID"),
+            client_id=_read_required_env("AZURE_CLIENT_ID"),
+            client_secret=_read_required_env("AZURE_CLIENT_SECRET"),
+        )
+
+
+@dataclass(frozen=True)
+class _CachedToken:
+    access_token: str
+    expires_at: float
+
+
+class _EncryptedTokenCacheFile:
+    """Fernet-encrypted on-disk persistence for an MSAL SerializableTokenCache."""
+
+    def __init__(self, path: Path, key: str) -> None:
+        # cryptography is always installed alongside msal; import lazily so the
+        # in-memory-only path never pays for it.
+        from cryptography.fernet import Fernet
+
+        self._path = path
+        try:
+            self._fernet = Fernet(key.encode("ascii"))
+        except ValueError as exc:
+            raise AuthConfigError(
+                f"{_TOKEN_CACHE_KEY_ENV} must be a urlsafe base64-encoded 32-byte Fernet key"
+            ) from exc
+
+    def load(self, cache: "SerializableTokenCache") -> None:
+        from cryptography.fernet import InvalidToken
+
+        if not self._path.exists():
+            return
+        try:
+            cache.deserialize(self._fernet.decrypt(self._path.read_bytes()).decode("utf-8"))
+        except (InvalidToken, ValueError) as exc:
+            LOGGER.warning("Ignoring unreadable token cache %s: %s", self._path, exc)
+
+    def save(self, cache: "SerializableTokenCache") -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path.with_name(f"{self._path.name}.tmp")
+        encrypted = self._fernet.encrypt(cache.serialize().encode("utf-8"))
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(encrypted)
+        os.replace(tmp_path, self._path)
+
+
+class TokenProvider:
+    """Thread-safe app-only token source with expiry-aware in-memory caching.
+
+    Tokens are cached per scope set and reused until they are within
+    ``refresh_margin_seconds`` of expiry. When ``cache_path`` is set, the underlying
+    MSAL token cache is also persisted to an encrypted file so short-lived cron runs
+    can reuse a still-valid token instead of calling the token endpoint again.
+    """
+
+    def __init__(
+        self,
+        credentials: ClientCredentials | None = None,
+        *,
+        cache_path: Path | str | None = None,
+        cache_key: str | None = None,
+        refresh_margin_seconds: int = _DEFAULT_REFRESH_MARGIN_SECONDS,
+    ) -> None:
+        self._credentials = credentials
+        self._cache_path = Path(cache_path) if cache_path else None
+        self._cache_key = cache_key
+        self._refresh_margin_seconds = refresh_margin_seconds
+        self._tokens: dict[tuple[str, ...], _CachedToken] = {}
+        self._lock = threading.Lock()
+        if self._cache_path and not self._cache_key:
+            raise AuthConfigError(
+                f"An encryption key ({_TOKEN_CACHE_KEY_ENV}) is required when persisting "
+                "the token cache to disk"
+            )
+
+    @classmethod
+    def from_env(cls) -> "TokenProvider":
+        _load_dotenv()
+        return cls(
+            cache_path=os.getenv(_TOKEN_CACHE_PATH_ENV) or None,
+            cache_key=os.getenv(_TOKEN_CACHE_KEY_ENV) or None,
+        )
+
+    @property
+    def credentials(self) -> ClientCredentials:
+        if self._credentials is None:
+            self._credentials = ClientCredentials.from_env()
+        return self._credentials
+
+    def get_token(self, scopes: Sequence[str] | None = None) -> str:
+        """Return a cached access token, acquiring a new one when close to expiry."""
+        requested_scopes = tuple(sorted(scopes)) if scopes else (_GRAPH_DEFAULT_SCOPE,)
+        with self._lock:
+            cached = self._tokens.get(requested_scopes)
+            if cached and cached.expires_at - self._refresh_margin_seconds > time.time():
+                _TOKEN_REQUESTS.inc(source="memory")
+                return cached.access_token
+
+            with _TOKEN_ACQUIRE_SECONDS.time():
+                token = self._acquire(list(requested_scopes))
+            self._tokens[requested_scopes] = token
+            return token.access_token
+
+    def invalidate(self) -> None:
+        """Drop in-memory tokens, e.g. after Graph rejected one with HTTP 401."""
+        with self._lock:
+            self._tokens.clear()
+
+    def _acquire(self, scopes: list[str]) -> _CachedToken:
+        app, cache_file = self._get_app()
+
+        LOGGER.info("Acquiring app-only access token for Microsoft Graph")
+        result = app.acquire_token_for_client(scopes=scopes)
+
+        access_token = result.get("access_token")
+        _TOKEN_REQUESTS.inc(
+            source=str(result.get("token_source", "unknown")) if access_token else "error"
+        )
+        if access_token:
+            if cache_file is not None and app.token_cache.has_state_changed:
+                cache_file.save(app.token_cache)
+                app.token_cache.has_state_changed = False
+            LOGGER.debug("Token source: %s", result.get("token_source", "unknown"))
+            expires_in = int(result.get("expires_in", 0) or 0)
+            return _CachedToken(access_token=access_token, expires_at=time.time() + expires_in)
+
+        error = result.get("error", "unknown_error")
+        description = result.get("error_description", "No description returned")
+        correlation_id = result.get("correlation_id", "n/a")
+
+        raise RuntimeError(
+            "Failed to acquire access token "
+            f"(error={error}, correlation_id={correlation_id}): {description}"
+        )
+
+    def _get_app(self) -> tuple["ConfidentialClientApplication", _EncryptedTokenCacheFile | None]:
+        from msal import ConfidentialClientApplication, SerializableTokenCache
+
+        credentials = self.credentials
+        cache_file = (
+            _EncryptedTokenCacheFile(self._cache_path, self._cache_key or "")
+            if self._cache_path
+            else None
+        )
+        app_key = (credentials.tenant_id, credentials.client_id, str(self._cache_path or ""))
+
+        with _MSAL_APPS_LOCK:
+            app = _MSAL_APPS.get(app_key)
+            if app is None:
+                token_cache = SerializableTokenCache()
+                if cache_file is not None:
+                    cache_file.load(token_cache)
+                app = ConfidentialClientApplication(
+                    client_id=credentials.client_id,
+                    client_credential=credentials.client_secret,
+                    authority=credentials.authority,
+                    token_cache=token_cache,
+                )
+                _MSAL_APPS[app_key] = app
+        return app, cache_file
+
+
+def get_token_provider() -> TokenProvider:
+    """Return the process-wide token provider configured from the environment."""
+    global _DEFAULT_PROVIDER
+    with _DEFAULT_PROVIDER_LOCK:
+        if _DEFAULT_PROVIDER is None:
+            _DEFAULT_PROVIDER = TokenProvider.from_env()
+        return _DEFAULT_PROVIDER
 
-    LOGGER.info("Acquiring app-only access token for Microsoft Graph")
-    result = app.acquire_token_for_client(scopes=requested_scopes)
 
-    access_token = result.get("access_token")
-    if access_token:
-        return access_token
-
-    error = result.get("error", "unknown_error")
-    description = result.get("error_description", "No description returned")
-    correlation_id = result.get("correlation_id", "n/a")
-
-    raise RuntimeError(
-        "Failed to acquire access token "
-        f"(error={error}, correlation_id={correlation_id}): {description}"
-    )
+def get_access_token(scopes: Sequence[str] | None = None) -> str:
+    """Acquire an app-only Microsoft Graph access token using client credentials."""
+    return get_token_provider().get_token(scopes)
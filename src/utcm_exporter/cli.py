@@ -0,0 +1,792 @@
+import argparse
+import itertools
+import json
+import logging
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Callable, Iterator, Sequence
+
+LOGGER = logging.getLogger(__name__)
+
+# Handlers import the library modules they use (and with them msal, requests, yaml and
+# python-dotenv) only when their command runs, so --help, usage errors and commands
+# that need none of them start without that cost.
+
+_Handler = Callable[[argparse.Namespace, argparse.ArgumentParser], None]
+
+
+def _add_snapshot_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--resources-file",
+        default="resources.json",
+        help="Path to resources catalog JSON file (default: resources.json).",
+    )
+    parser.add_argument(
+        "--resources",
+        nargs="+",
+        default=[],
+        help=(
+            "Optional resource list override for test runs. "
+            "Examples: microsoft.entra.conditionalaccesspolicy "
+            "microsoft.teams.meetingpolicy"
+        ),
+    )
+    parser.add_argument(
+        "--timeout-seconds",
+        type=int,
+        default=7200,
+        help="Snapshot polling timeout in seconds (default: 7200).",
+    )
+    parser.add_argument(
+        "--poll-interval-seconds",
+        type=float,
+        default=5,
+        help="Initial polling interval in seconds; grows exponentially (default: 5).",
+    )
+    parser.add_argument(
+        "--max-poll-interval-seconds",
+        type=float,
+        default=60,
+        help="Upper bound for the adaptive polling interval (default: 60).",
+    )
+    parser.add_argument(
+        "--poll-history-file",
+        default=".utcm_state/poll_history.json",
+        help=(
+            "File recording typical job durations per resource set, used to schedule "
+            "polls (default: .utcm_state/poll_history.json). Pass '' to disable."
+        ),
+    )
+    parser.add_argument(
+        "--shard-by",
+        choices=["workload", "size", "cost"],
+        default="",
+        help=(
+            "Split resources into several concurrent snapshot jobs, grouped by workload "
+            "prefix, cut into fixed-size chunks or balanced by observed cost (one shard "
+            "per --max-concurrent-jobs). Default: one job."
+        ),
+    )
+    parser.add_argument(
+        "--max-shard-size",
+        type=int,
+        default=0,
+        help="Maximum resources per shard (default: unlimited for workload, 50 for size).",
+    )
+    parser.add_argument(
+        "--max-concurrent-jobs",
+        type=int,
+        default=3,
+        help="Maximum number of shard jobs running at once (default: 3).",
+    )
+    parser.add_argument(
+        "--unsupported-cache-file",
+        default=".utcm_state/unsupported_resources.json",
+        help=(
+            "Resource types createSnapshot rejected as unsupported, skipped until their "
+            "re-probe (default: .utcm_state/unsupported_resources.json). Pass '' to disable."
+        ),
+    )
+    parser.add_argument(
+        "--unsupported-ttl-hours",
+        type=float,
+        default=168,
+        help="Hours before a cached unsupported resource type is re-probed (default: 168).",
+    )
+    parser.add_argument(
+        "--resource-stats-file",
+        default=".utcm_state/resource_stats.json",
+        help=(
+            "Observed job durations and instance counts per resource type, used as cost "
+            "hints for shard planning (default: .utcm_state/resource_stats.json). "
+            "Pass '' to disable."
+        ),
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        default="",
+        help="Write Prometheus metrics here when the run ends (node_exporter textfile collector).",
+    )
+
+
+def _run_snapshot(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    from utcm_exporter.metrics import REGISTRY
+    from utcm_exporter.polling import PollHistory
+    from utcm_exporter.resources_catalog import (
+        ResourceStats,
+        UnsupportedResourceCache,
+        load_resource_catalog,
+    )
+    from utcm_exporter.utcm_client import (
+        create_sharded_snapshots_and_wait,
+        create_snapshot_and_wait,
+    )
+
+    resource_stats = ResourceStats(args.resource_stats_file) if args.resource_stats_file else None
+    resources: list[str] | None = None
+    if args.resources:
+        resources = sorted({item.strip() for item in args.resources if item.strip()})
+        LOGGER.info("Using %d resource(s) from --resources override", len(resources))
+    if resources is None or args.shard_by == "cost":
+        catalog = load_resource_catalog(args.resources_file, stats=resource_stats)
+    if resources is None:
+        resources = catalog.resources
+        LOGGER.info("Loaded %d UTCM resources from %s", len(resources), args.resources_file)
+
+    poll_history = PollHistory(args.poll_history_file) if args.poll_history_file else None
+    unsupported_cache = (
+        UnsupportedResourceCache(
+            args.unsupported_cache_file,
+            ttl_seconds=args.unsupported_ttl_hours * 3600,
+        )
+        if args.unsupported_cache_file
+        else None
+    )
+    try:
+        if args.shard_by:
+            shard_results = create_sharded_snapshots_and_wait(
+                resources=resources,
+                strategy=args.shard_by,
+                max_resources_per_shard=args.max_shard_size or None,
+                max_concurrent_jobs=args.max_concurrent_jobs,
+                poll_interval_seconds=args.poll_interval_seconds,
+                max_poll_interval_seconds=args.max_poll_interval_seconds,
+                timeout_seconds=args.timeout_seconds,
+                poll_history=poll_history,
+                unsupported_cache=unsupported_cache,
+                resource_costs=catalog.costs(resources) if args.shard_by == "cost" else None,
+                resource_stats=resource_stats,
+            )
+            for job_id, resource_location in shard_results:
+                LOGGER.info("UTCM snapshot job succeeded: %s", job_id)
+                print(resource_location)
+            return
+
+        job_id, resource_location = create_snapshot_and_wait(
+            resources=resources,
+            poll_interval_seconds=args.poll_interval_seconds,
+            max_poll_interval_seconds=args.max_poll_interval_seconds,
+            timeout_seconds=args.timeout_seconds,
+            poll_history=poll_history,
+            unsupported_cache=unsupported_cache,
+        )
+        LOGGER.info("UTCM snapshot job succeeded: %s", job_id)
+        print(resource_location)
+    finally:
+        if args.metrics_textfile:
+            REGISTRY.write_textfile(args.metrics_textfile)
+
+
+def _add_parse_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "sources",
+        nargs="*",
+        metavar="source",
+        help=(
+            "The Graph resourceLocation URL returned by configurationSnapshotJobs, or a "
+            "local snapshot file (plain, gzip or zstd JSON, e.g. a _debug dump). "
+            "Pass several (one per shard) to merge sharded snapshots."
+        ),
+    )
+    parser.add_argument(
+        "--from-archive",
+        default="",
+        metavar="SNAPSHOT_ID",
+        help="Parse a snapshot from --archive-dir instead ('latest' for the newest one).",
+    )
+    parser.add_argument(
+        "--output-dir",
+        default="tenant_state",
+        help="Output folder for parsed tenant state (default: tenant_state)",
+    )
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        default=True,
+        help="Delete stale YAML files not present in the current snapshot output (default: on).",
+    )
+    parser.add_argument(
+        "--no-clean",
+        action="store_false",
+        dest="clean",
+        help="Disable pruning of stale YAML files.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes used for YAML serialization (default: 1, no process pool).",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Skip rendering resource types whose snapshot payload is unchanged since the "
+            "last incremental run (fingerprints are kept in the output manifest)."
+        ),
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help=(
+            "Parse resources incrementally while downloading to keep memory bounded "
+            "by the largest resource. Ignored with --debug."
+        ),
+    )
+    parser.add_argument(
+        "--archive-dir",
+        default="",
+        help=(
+            "Snapshot archive directory: new snapshots are also stored there (compressed "
+            "and deduplicated), and --from-archive reads from it."
+        ),
+    )
+    parser.add_argument(
+        "--job-id",
+        action="append",
+        default=[],
+        dest="job_ids",
+        help="Snapshot job ID to record with the archived snapshot (repeatable).",
+    )
+    parser.add_argument(
+        "--git-commit",
+        action="store_true",
+        help=(
+            "Stage exactly the changed files in the git repository containing the output "
+            "folder and commit them with a per-resource-type summary."
+        ),
+    )
+    parser.add_argument(
+        "--git-push",
+        action="store_true",
+        help="Push the commit made by --git-commit.",
+    )
+    parser.add_argument(
+        "--git-remote",
+        default="origin",
+        help="Remote used by --git-push (default: origin).",
+    )
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        help="Dump raw snapshot JSON to a debug file before parsing.",
+    )
+    parser.add_argument(
+        "--debug-file",
+        default="",
+        help=(
+            "Optional path for raw snapshot JSON dump. "
+            "Default when --debug is set: output_dir/_debug/snapshot_<timestamp>.json"
+        ),
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        default="",
+        help="Write Prometheus metrics here when the run ends (node_exporter textfile collector).",
+    )
+
+
+def _is_url(source: str) -> bool:
+    return source.startswith(("https://", "http://"))
+
+
+def _run_parse(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    from utcm_exporter.archive import SnapshotArchive
+    from utcm_exporter.git_history import commit_export
+    from utcm_exporter.metrics import REGISTRY
+    from utcm_exporter.parser import (
+        ExportSummary,
+        download_snapshot_json,
+        load_snapshot_file,
+        merge_snapshot_payloads,
+        parse_snapshot_to_yaml,
+        stream_snapshot_file_resources,
+        stream_snapshot_resources,
+        write_resources_to_yaml,
+    )
+
+    if bool(args.sources) == bool(args.from_archive):
+        parser.error("pass either one or more sources or --from-archive")
+    if args.from_archive and not args.archive_dir:
+        parser.error("--from-archive requires --archive-dir")
+    if args.git_push and not args.git_commit:
+        parser.error("--git-push requires --git-commit")
+
+    def _finish(summary: ExportSummary) -> None:
+        LOGGER.info(
+            "Parser finished. Files created: %d, updated: %d, unchanged: %d, removed: %d",
+            summary.created,
+            summary.updated,
+            summary.unchanged,
+            summary.removed,
+        )
+        if summary.changed_resource_types:
+            LOGGER.info("Changed resource types: %s", ", ".join(summary.changed_resource_types))
+        if args.git_commit:
+            commit_export(
+                output_root=args.output_dir,
+                changed_paths=summary.changed_paths,
+                push=args.git_push,
+                remote=args.git_remote,
+                stage_untracked=summary.manifest_incomplete,
+            )
+        if args.metrics_textfile:
+            REGISTRY.write_textfile(args.metrics_textfile)
+
+    def _stream_source(source: str, metadata: dict | None) -> Iterator[Any]:
+        if _is_url(source):
+            return stream_snapshot_resources(source, metadata=metadata)
+        return stream_snapshot_file_resources(source, metadata=metadata)
+
+    def _load_source(source: str) -> dict[str, Any]:
+        return download_snapshot_json(source) if _is_url(source) else load_snapshot_file(source)
+
+    archive = SnapshotArchive(args.archive_dir) if args.archive_dir else None
+    archived_id = ""
+    if args.from_archive:
+        snapshot_id = None if args.from_archive == "latest" else args.from_archive
+        snapshot = archive.find(snapshot_id=snapshot_id)
+        if snapshot is None:
+            LOGGER.error("Archived snapshot not found: %s", args.from_archive)
+            raise SystemExit(1)
+        archived_id = snapshot.snapshot_id
+
+    if args.stream and not args.debug:
+        # Like merge_snapshot_payloads, top-level metadata comes from the first shard.
+        metadata: dict = {}
+        if archived_id:
+            resources = archive.iter_resources(archived_id)
+        else:
+            resources = itertools.chain.from_iterable(
+                _stream_source(source, metadata if not idx else None)
+                for idx, source in enumerate(args.sources)
+            )
+        if archive is not None and not archived_id:
+            resources = archive.archive_resources(
+                resources,
+                metadata=metadata,
+                job_ids=args.job_ids,
+            )
+        summary = write_resources_to_yaml(
+            resources,
+            output_root=args.output_dir,
+            clean=args.clean,
+            workers=args.workers,
+            incremental=args.incremental,
+        )
+        _finish(summary)
+        return
+    if args.stream:
+        LOGGER.warning("--debug needs the full payload; downloading without streaming")
+
+    if archived_id:
+        payload = archive.load_payload(archived_id)
+    else:
+        payload = merge_snapshot_payloads([_load_source(source) for source in args.sources])
+
+    if args.debug:
+        if args.debug_file:
+            debug_path = Path(args.debug_file)
+        else:
+            ts = datetime.now(UTC).strftime("%Y%m%dT%H%M%SZ")
+            debug_path = Path(args.output_dir) / "_debug" / f"snapshot_{ts}.json"
+        debug_path.parent.mkdir(parents=True, exist_ok=True)
+        with debug_path.open("w", encoding="utf-8") as handle:
+            json.dump(payload, handle, indent=2, sort_keys=True)
+        LOGGER.info("Wrote debug snapshot JSON: %s", debug_path)
+
+    if archive is not None and not archived_id:
+        archive.store(payload, job_ids=args.job_ids)
+
+    summary = parse_snapshot_to_yaml(
+        snapshot_payload=payload,
+        output_root=args.output_dir,
+        clean=args.clean,
+        workers=args.workers,
+        incremental=args.incremental,
+    )
+    _finish(summary)
+
+
+def _add_cleanup_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--older-than-days",
+        type=int,
+        default=7,
+        help="Delete jobs older than this many days (default: 7).",
+    )
+    parser.add_argument(
+        "--statuses",
+        nargs="+",
+        default=["succeeded", "failed", "cancelled", "canceled"],
+        help=(
+            "Statuses eligible for deletion. "
+            "Default: succeeded failed cancelled canceled"
+        ),
+    )
+    parser.add_argument(
+        "--max-jobs",
+        type=int,
+        default=500,
+        help="Maximum number of jobs to inspect from Graph (default: 500).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Maximum number of delete requests in flight at once (default: 4).",
+    )
+    parser.add_argument(
+        "--no-batch",
+        action="store_false",
+        dest="use_batch",
+        help="Send one DELETE per job instead of Graph $batch requests of 20.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Log jobs that would be deleted without deleting them.",
+    )
+
+
+def _run_cleanup(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    from utcm_exporter.graph_session import GraphSession
+    from utcm_exporter.utcm_client import cleanup_snapshot_jobs
+
+    session = GraphSession(pool_size=max(10, args.concurrency))
+    results = cleanup_snapshot_jobs(
+        older_than_days=args.older_than_days,
+        statuses=set(args.statuses),
+        dry_run=args.dry_run,
+        max_jobs=args.max_jobs,
+        concurrency=args.concurrency,
+        use_batch=args.use_batch,
+        session=session,
+    )
+    if args.dry_run:
+        LOGGER.info("Snapshot jobs matched (dry run): %d", len(results))
+        return
+
+    failed = [result for result in results if not result.deleted]
+    LOGGER.info("Snapshot jobs deleted: %d", len(results) - len(failed))
+    if failed:
+        LOGGER.error("Snapshot jobs failed to delete: %d", len(failed))
+        raise SystemExit(1)
+
+
+def _add_catalog_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--output",
+        default="resources.json",
+        help="Path to write generated resource catalog (default: resources.json)",
+    )
+    parser.add_argument(
+        "--docs-dir",
+        default="",
+        help=(
+            "Build from a local checkout of microsoft-graph-docs-contrib instead of "
+            "fetching pages from GitHub (no network access)."
+        ),
+    )
+    parser.add_argument(
+        "--cache-file",
+        default=".utcm_state/docs_cache.json",
+        help=(
+            "ETag cache of fetched docs pages; unchanged pages are not downloaded or "
+            "re-scanned (default: .utcm_state/docs_cache.json). Pass '' to disable."
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=6,
+        help="Docs pages fetched concurrently (default: 6).",
+    )
+    parser.add_argument(
+        "--permissions",
+        action="store_true",
+        help=(
+            "Also fetch each resource's docs include and record the Graph permissions "
+            "and Entra roles it lists under 'resourceDetails'."
+        ),
+    )
+
+
+def _run_catalog(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    from utcm_exporter.resources_catalog import (
+        DocsPageCache,
+        build_resource_catalog_from_docs,
+        write_resource_catalog,
+    )
+
+    catalog = build_resource_catalog_from_docs(
+        docs_root=args.docs_dir or None,
+        cache=DocsPageCache(args.cache_file) if args.cache_file and not args.docs_dir else None,
+        workers=args.workers,
+        include_permissions=args.permissions,
+    )
+    out = write_resource_catalog(args.output, catalog)
+    LOGGER.info("Wrote resource catalog: %s", out)
+    LOGGER.info("Discovered %d supported UTCM resources", catalog["resourceCount"])
+
+
+def _add_run_all_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--resources-file",
+        default="resources.json",
+        help="Path to resources catalog JSON file (default: resources.json).",
+    )
+    parser.add_argument(
+        "--resources",
+        nargs="+",
+        default=[],
+        help="Optional resource list override for test runs.",
+    )
+    parser.add_argument(
+        "--output-dir",
+        default="tenant_state",
+        help="Output folder for parsed tenant state (default: tenant_state)",
+    )
+    parser.add_argument(
+        "--no-clean",
+        action="store_false",
+        dest="clean",
+        help="Disable pruning of stale YAML files.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Skip rendering resource types whose payload is unchanged.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes used for YAML serialization (default: 1, no process pool).",
+    )
+    parser.add_argument(
+        "--git-commit",
+        action="store_true",
+        help="Commit the changed files in the git repository containing the output folder.",
+    )
+    parser.add_argument(
+        "--git-push",
+        action="store_true",
+        help="Push the commit made by --git-commit.",
+    )
+    parser.add_argument(
+        "--timeout-seconds",
+        type=int,
+        default=7200,
+        help="Snapshot polling timeout in seconds (default: 7200).",
+    )
+    parser.add_argument(
+        "--poll-history-file",
+        default=".utcm_state/poll_history.json",
+        help="Poll history file (default: .utcm_state/poll_history.json). Pass '' to disable.",
+    )
+    parser.add_argument(
+        "--journal-file",
+        default=".utcm_state/journal.json",
+        help=(
+            "Pipeline journal used to resume interrupted runs "
+            "(default: .utcm_state/journal.json). Pass '' to disable."
+        ),
+    )
+    parser.add_argument(
+        "--download-dir",
+        default=".utcm_state/downloads",
+        help="Where journaled runs keep the downloaded snapshot until committed.",
+    )
+    parser.add_argument(
+        "--partial-retries",
+        type=int,
+        default=2,
+        help=(
+            "Follow-up jobs for resource types a partially successful job failed "
+            "(default: 2). Pass 0 to accept the gap."
+        ),
+    )
+    parser.add_argument(
+        "--unsupported-cache-file",
+        default=".utcm_state/unsupported_resources.json",
+        help=(
+            "Resource types createSnapshot rejected as unsupported, skipped until their "
+            "re-probe (default: .utcm_state/unsupported_resources.json). Pass '' to disable."
+        ),
+    )
+    parser.add_argument(
+        "--unsupported-ttl-hours",
+        type=float,
+        default=168,
+        help="Hours before a cached unsupported resource type is re-probed (default: 168).",
+    )
+    parser.add_argument(
+        "--resource-stats-file",
+        default=".utcm_state/resource_stats.json",
+        help=(
+            "Record observed job durations and instance counts per resource type as cost "
+            "hints for shard planning (default: .utcm_state/resource_stats.json). "
+            "Pass '' to disable."
+        ),
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        default="",
+        help="Write Prometheus metrics here when the run ends (node_exporter textfile collector).",
+    )
+
+
+def _run_all(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    from utcm_exporter.journal import PipelineJournal
+    from utcm_exporter.metrics import REGISTRY
+    from utcm_exporter.pipeline import run_snapshot_pipeline
+    from utcm_exporter.polling import PollHistory
+    from utcm_exporter.resources_catalog import (
+        ResourceStats,
+        UnsupportedResourceCache,
+        load_resources_from_file,
+    )
+
+    if args.git_push and not args.git_commit:
+        parser.error("--git-push requires --git-commit")
+
+    if args.resources:
+        resources = sorted({item.strip() for item in args.resources if item.strip()})
+    else:
+        resources = load_resources_from_file(args.resources_file)
+    LOGGER.info("Running pipeline for %d resource(s)", len(resources))
+
+    try:
+        result = run_snapshot_pipeline(
+            resources=resources,
+            output_root=args.output_dir,
+            clean=args.clean,
+            incremental=args.incremental,
+            workers=args.workers,
+            git_commit=args.git_commit,
+            git_push=args.git_push,
+            timeout_seconds=args.timeout_seconds,
+            poll_history=PollHistory(args.poll_history_file) if args.poll_history_file else None,
+            journal=PipelineJournal(args.journal_file) if args.journal_file else None,
+            download_dir=args.download_dir,
+            partial_retries=args.partial_retries,
+            unsupported_cache=(
+                UnsupportedResourceCache(
+                    args.unsupported_cache_file,
+                    ttl_seconds=args.unsupported_ttl_hours * 3600,
+                )
+                if args.unsupported_cache_file
+                else None
+            ),
+            resource_stats=(
+                ResourceStats(args.resource_stats_file) if args.resource_stats_file else None
+            ),
+        )
+    finally:
+        if args.metrics_textfile:
+            REGISTRY.write_textfile(args.metrics_textfile)
+    LOGGER.info(
+        "Pipeline finished for job %s. Files created: %d, updated: %d, removed: %d",
+        result.job_id,
+        result.summary.created,
+        result.summary.updated,
+        result.summary.removed,
+    )
+    if result.failed_resources:
+        LOGGER.warning(
+            "Resource types kept from the previous export after failing: %s",
+            ", ".join(result.failed_resources),
+        )
+
+
+def _add_serve_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--config",
+        default="schedules.json",
+        help="Schedule config JSON (default: schedules.json).",
+    )
+
+
+def _run_serve(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    from utcm_exporter.daemon import serve
+
+    serve(args.config)
+
+
+_COMMANDS: tuple[tuple[str, str, str, Callable[[argparse.ArgumentParser], None], _Handler], ...] = (
+    (
+        "snapshot",
+        "Run a UTCM snapshot job and print its resourceLocation.",
+        "Run a UTCM snapshot job. By default resources are loaded from resources.json.",
+        _add_snapshot_arguments,
+        _run_snapshot,
+    ),
+    (
+        "parse",
+        "Write YAML files from a snapshot URL, local file or archive.",
+        "Download a UTCM snapshot JSON from resourceLocation (or read a local or "
+        "archived snapshot) and write YAML files.",
+        _add_parse_arguments,
+        _run_parse,
+    ),
+    (
+        "cleanup",
+        "Delete old UTCM snapshot jobs.",
+        "Delete old UTCM snapshot jobs based on age and status.",
+        _add_cleanup_arguments,
+        _run_cleanup,
+    ),
+    (
+        "catalog",
+        "Build resources.json from the UTCM docs.",
+        "Build resources.json from official UTCM Microsoft Graph docs pages.",
+        _add_catalog_arguments,
+        _run_catalog,
+    ),
+    (
+        "run-all",
+        "Snapshot, download, parse and commit as one resumable run.",
+        "Run snapshot -> download -> YAML (-> git commit) as one resumable pipeline. "
+        "A rerun after a crash continues the recorded job instead of creating a new one.",
+        _add_run_all_arguments,
+        _run_all,
+    ),
+    (
+        "serve",
+        "Run scheduled snapshot -> YAML exports until stopped (SIGINT/SIGTERM).",
+        "Run scheduled snapshot -> YAML exports until stopped (SIGINT/SIGTERM).",
+        _add_serve_arguments,
+        _run_serve,
+    ),
+)
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="utcm-exporter",
+        description="Export Microsoft 365 tenant configuration through the UTCM Graph APIs.",
+    )
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    for name, help_text, description, add_arguments, handler in _COMMANDS:
+        command = subparsers.add_parser(name, help=help_text, description=description)
+        add_arguments(command)
+        command.set_defaults(handler=handler, command_parser=command)
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s - %(message)s",
+    )
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return
+    args.handler(args, args.command_parser)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+from pathlib import Path
+from typing import Any
+
+from utcm_exporter.resources_catalog import load_resources_from_file
+
+
+class ScheduleConfigError(ValueError):
+    """Raised when the daemon schedule configuration is invalid."""
+
+
+def resolve_group_resources(entry: dict[str, Any], base_dir: Path) -> list[str]:
+    """Resource types of a daemon or tenant group config entry.
+
+    Takes ``resources`` or else the list in ``resourcesFile`` (relative to ``base_dir``),
+    minus ``excludeResources`` (case-insensitive), sorted and de-duplicated.
+    """
+    if entry.get("resources"):
+        resources = [str(item).strip() for item in entry["resources"] if str(item).strip()]
+    elif entry.get("resourcesFile"):
+        resources = load_resources_from_file(base_dir / str(entry["resourcesFile"]))
+    else:
+        raise ScheduleConfigError(
+            f"Schedule group '{entry.get('name')}' needs 'resources' or 'resourcesFile'"
+        )
+    excluded = {str(item).strip().lower() for item in entry.get("excludeResources", [])}
+    return sorted({item for item in resources if item.lower() not in excluded})
@@ -0,0 +1,366 @@
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from utcm_exporter.config import ScheduleConfigError, resolve_group_resources
+from utcm_exporter.graph_session import GraphSession
+from utcm_exporter.journal import PipelineJournal, journal_key
+from utcm_exporter.metrics import REGISTRY, start_http_server
+from utcm_exporter.pipeline import run_snapshot_pipeline
+from utcm_exporter.polling import PollHistory
+from utcm_exporter.resources_catalog import (
+    DEFAULT_UNSUPPORTED_TTL_SECONDS,
+    ResourceStats,
+    UnsupportedResourceCache,
+)
+from utcm_exporter.utcm_client import SnapshotJobConflictError, SnapshotWaitInterrupted
+
+LOGGER = logging.getLogger(__name__)
+
+_STATE_VERSION = 1
+# Upper bound for one scheduler sleep, so config-independent housekeeping (and
+# clock jumps) are noticed reasonably quickly.
+_MAX_IDLE_SECONDS = 30.0
+
+_GROUP_RUNS = REGISTRY.counter(
+    "utcm_daemon_group_runs_total",
+    "Schedule group runs by outcome: succeeded, conflict, interrupted or failed.",
+    ("group", "outcome"),
+)
+_GROUP_LAST_SUCCESS = REGISTRY.gauge(
+    "utcm_daemon_group_last_success_timestamp_seconds",
+    "Unix time at which each schedule group last completed successfully.",
+    ("group",),
+)
+
+
+@dataclass(frozen=True)
+class ScheduleGroup:
+    """A set of resource types snapshotted together on a fixed interval."""
+
+    name: str
+    interval_seconds: float
+    resources: tuple[str, ...]
+    output_dir: Path
+
+
+@dataclass(frozen=True)
+class DaemonConfig:
+    groups: tuple[ScheduleGroup, ...]
+    state_file: Path
+    journal_file: Path
+    download_dir: Path
+    poll_history_file: Path | None
+    unsupported_cache_file: Path | None = None
+    unsupported_ttl_seconds: float = DEFAULT_UNSUPPORTED_TTL_SECONDS
+    resource_stats_file: Path | None = None
+    max_concurrent_groups: int = 1
+    conflict_retry_seconds: float = 300
+    timeout_seconds: int = 7200
+    incremental: bool = True
+    workers: int = 1
+    git_commit: bool = False
+    git_push: bool = False
+    partial_retries: int = 2
+    metrics_port: int | None = None
+    metrics_address: str = "127.0.0.1"
+    metrics_textfile: Path | None = None
+
+
+def load_schedule_config(path: Path | str) -> DaemonConfig:
+    """Load the daemon's JSON schedule file.
+
+    Relative paths in the file are resolved against the file's directory. Each group
+    writes to its own ``outputDir`` (default ``<outputRoot>/<name>``), so pruning one
+    group never removes another group's files.
+    """
+    config_path = Path(path)
+    try:
+        data = json.loads(config_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        raise ScheduleConfigError(
+            f"Could not read schedule config {config_path}: {exc}"
+        ) from exc
+    groups_data = data.get("groups") if isinstance(data, dict) else None
+    if not isinstance(groups_data, list) or not groups_data:
+        raise ScheduleConfigError("Schedule config must contain a non-empty 'groups' list")
+
+    base_dir = config_path.parent
+    output_root = base_dir / str(data.get("outputRoot", "tenant_state"))
+    groups: list[ScheduleGroup] = []
+    for entry in groups_data:
+        name = str(entry.get("name", "")).strip()
+        if not name or name in {group.name for group in groups}:
+            raise ScheduleConfigError(f"Schedule groups need unique names, got '{name}'")
+        interval_minutes = float(entry.get("intervalMinutes", 0))
+        if interval_minutes <= 0:
+            raise ScheduleConfigError(
+                f"Schedule group '{name}' needs a positive intervalMinutes"
+            )
+        resources = resolve_group_resources(entry, base_dir)
+        if not resources:
+            raise ScheduleConfigError(f"Schedule group '{name}' has no resources")
+        output_dir = entry.get("outputDir")
+        groups.append(
+            ScheduleGroup(
+                name=name,
+                interval_seconds=interval_minutes * 60,
+                resources=tuple(resources),
+                output_dir=base_dir / str(output_dir) if output_dir else output_root / name,
+            )
+        )
+
+    poll_history_file = data.get("pollHistoryFile", ".utcm_state/poll_history.json")
+    unsupported_cache_file = data.get(
+        "unsupportedCacheFile", ".utcm_state/unsupported_resources.json"
+    )
+    resource_stats_file = data.get("resourceStatsFile", ".utcm_state/resource_stats.json")
+    metrics_port = data.get("metricsPort")
+    metrics_textfile = data.get("metricsTextfile")
+    return DaemonConfig(
+        groups=tuple(groups),
+        state_file=base_dir / str(data.get("stateFile", ".utcm_state/daemon_state.json")),
+        journal_file=base_dir / str(data.get("journalFile", ".utcm_state/journal.json")),
+        download_dir=base_dir / str(data.get("downloadDir", ".utcm_state/downloads")),
+        poll_history_file=base_dir / str(poll_history_file) if poll_history_file else None,
+        unsupported_cache_file=(
+            base_dir / str(unsupported_cache_file) if unsupported_cache_file else None
+        ),
+        unsupported_ttl_seconds=float(
+            data.get("unsupportedCacheTtlHours", DEFAULT_UNSUPPORTED_TTL_SECONDS / 3600)
+        )
+        * 3600,
+        resource_stats_file=base_dir / str(resource_stats_file) if resource_stats_file else None,
+        max_concurrent_groups=max(1, int(data.get("maxConcurrentGroups", 1))),
+        conflict_retry_seconds=float(data.get("conflictRetryMinutes", 5)) * 60,
+        timeout_seconds=int(data.get("timeoutSeconds", 7200)),
+        incremental=bool(data.get("incremental", True)),
+        workers=max(1, int(data.get("workers", 1))),
+        git_commit=bool(data.get("gitCommit", False)),
+        git_push=bool(data.get("gitPush", False)),
+        partial_retries=max(0, int(data.get("partialRetries", 2))),
+        metrics_port=int(metrics_port) if metrics_port is not None else None,
+        metrics_address=str(data.get("metricsAddress", "127.0.0.1")),
+        metrics_textfile=base_dir / str(metrics_textfile) if metrics_textfile else None,
+    )
+
+
+class _DaemonState:
+    """Per-group run times, persisted across restarts."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._groups: dict[str, dict[str, Any]] = {}
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if isinstance(data, dict) and isinstance(data.get("groups"), dict):
+                self._groups = data["groups"]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as exc:
+            LOGGER.warning("Ignoring unreadable daemon state %s: %s", path, exc)
+
+    def get(self, group: str, key: str) -> Any:
+        with self._lock:
+            return self._groups.get(group, {}).get(key)
+
+    def update(self, group: str, **values: Any) -> None:
+        with self._lock:
+            entry = self._groups.setdefault(group, {})
+            for key, value in values.items():
+                if value is None:
+                    entry.pop(key, None)
+                else:
+                    entry[key] = value
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+            payload = {"version": _STATE_VERSION, "groups": self._groups}
+            tmp_path.write_text(
+                json.dumps(payload, indent=2, sort_keys=True) + "\n",
+                encoding="utf-8",
+            )
+            os.replace(tmp_path, self.path)
+
+
+class SnapshotDaemon:
+    """Runs each schedule group's snapshot pipeline on its interval.
+
+    One GraphSession (and so one warm token and connection pool) serves every run. A
+    group never overlaps itself; a 409 from createSnapshot (another job active in the
+    tenant) postpones the group by ``conflict_retry_seconds``. On stop, polling waits
+    are interrupted and in-flight runs stay in the pipeline journal, so the next start
+    resumes those jobs instead of creating new ones.
+    """
+
+    def __init__(self, config: DaemonConfig, *, session: GraphSession | None = None) -> None:
+        self.config = config
+        self._session = session or GraphSession(pool_size=max(10, config.max_concurrent_groups))
+        self._state = _DaemonState(config.state_file)
+        self._journal = PipelineJournal(config.journal_file)
+        self._poll_history = (
+            PollHistory(config.poll_history_file) if config.poll_history_file else None
+        )
+        self._unsupported_cache = (
+            UnsupportedResourceCache(
+                config.unsupported_cache_file,
+                ttl_seconds=config.unsupported_ttl_seconds,
+            )
+            if config.unsupported_cache_file
+            else None
+        )
+        self._resource_stats = (
+            ResourceStats(config.resource_stats_file) if config.resource_stats_file else None
+        )
+        self._stop_event = threading.Event()
+        self._commit_lock = threading.Lock()
+        self._next_due: dict[str, float] = {}
+        self._running: dict[str, Future[None]] = {}
+
+    def stop(self) -> None:
+        if not self._stop_event.is_set():
+            LOGGER.info("Stopping daemon; in-flight snapshot jobs will be resumed on restart")
+        self._stop_event.set()
+
+    def _initial_due(self, group: ScheduleGroup) -> float:
+        if self._journal.get(journal_key(list(group.resources), group.output_dir)):
+            return time.time()
+        last_started = self._state.get(group.name, "lastStartedAt")
+        if not last_started:
+            return time.time()
+        started = datetime.fromisoformat(last_started).timestamp()
+        return max(time.time(), started + group.interval_seconds)
+
+    def _write_metrics(self) -> None:
+        if self.config.metrics_textfile is None:
+            return
+        try:
+            REGISTRY.write_textfile(self.config.metrics_textfile)
+        except OSError as exc:
+            LOGGER.warning("Could not write metrics to %s: %s", self.config.metrics_textfile, exc)
+
+    def run(self) -> None:
+        metrics_server = (
+            start_http_server(self.config.metrics_port, address=self.config.metrics_address)
+            if self.config.metrics_port is not None
+            else None
+        )
+        LOGGER.info("Warming up Graph token for %d schedule group(s)", len(self.config.groups))
+        self._session.token_provider.get_token()
+        for group in self.config.groups:
+            self._next_due[group.name] = self._initial_due(group)
+
+        with ThreadPoolExecutor(
+            max_workers=self.config.max_concurrent_groups,
+            thread_name_prefix="utcm-group",
+        ) as executor:
+            while not self._stop_event.is_set():
+                now = time.time()
+                for name, future in list(self._running.items()):
+                    if future.done():
+                        del self._running[name]
+                for group in self.config.groups:
+                    if group.name in self._running or self._next_due[group.name] > now:
+                        continue
+                    if len(self._running) >= self.config.max_concurrent_groups:
+                        break
+                    self._next_due[group.name] = now + group.interval_seconds
+                    self._running[group.name] = executor.submit(self._run_group, group)
+
+                idle = min(self._next_due.values()) - time.time()
+                self._stop_event.wait(min(_MAX_IDLE_SECONDS, max(1.0, idle)))
+
+            LOGGER.info("Waiting for %d running group(s) to wind down", len(self._running))
+        self._session.close()
+        self._write_metrics()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        LOGGER.info("Daemon stopped")
+
+    def _run_group(self, group: ScheduleGroup) -> None:
+        outcome = "failed"
+        try:
+            outcome = self._run_group_pipeline(group)
+        finally:
+            _GROUP_RUNS.inc(group=group.name, outcome=outcome)
+            if outcome == "succeeded":
+                _GROUP_LAST_SUCCESS.set(time.time(), group=group.name)
+            self._write_metrics()
+
+    def _run_group_pipeline(self, group: ScheduleGroup) -> str:
+        started_at = datetime.now(UTC)
+        self._state.update(group.name, lastStartedAt=started_at.isoformat())
+        LOGGER.info("Running schedule group %s (%d resources)", group.name, len(group.resources))
+        try:
+            result = run_snapshot_pipeline(
+                resources=list(group.resources),
+                output_root=group.output_dir,
+                display_name=f"GitBackup {group.name}",
+                incremental=self.config.incremental,
+                workers=self.config.workers,
+                git_commit=self.config.git_commit,
+                git_push=self.config.git_push,
+                partial_retries=self.config.partial_retries,
+                timeout_seconds=self.config.timeout_seconds,
+                poll_history=self._poll_history,
+                unsupported_cache=self._unsupported_cache,
+                resource_stats=self._resource_stats,
+                journal=self._journal,
+                download_dir=self.config.download_dir,
+                stop_event=self._stop_event,
+                commit_lock=self._commit_lock,
+                session=self._session,
+            )
+        except SnapshotWaitInterrupted:
+            LOGGER.info("Schedule group %s interrupted; job left to resume", group.name)
+            return "interrupted"
+        except SnapshotJobConflictError as exc:
+            retry_at = time.time() + self.config.conflict_retry_seconds
+            self._next_due[group.name] = min(self._next_due[group.name], retry_at)
+            LOGGER.warning(
+                "Schedule group %s skipped, another snapshot job is active (%s); retry in %.0fs",
+                group.name,
+                exc,
+                self.config.conflict_retry_seconds,
+            )
+            return "conflict"
+        except Exception:
+            # A failed run must not take the scheduler down; the next interval retries.
+            LOGGER.exception("Schedule group %s failed", group.name)
+            return "failed"
+
+        self._state.update(
+            group.name,
+            lastCompletedAt=datetime.now(UTC).isoformat(),
+            lastJobId=result.job_id,
+        )
+        LOGGER.info(
+            "Schedule group %s finished in %.0fs: %d created, %d updated, %d removed",
+            group.name,
+            (datetime.now(UTC) - started_at).total_seconds(),
+            result.summary.created,
+            result.summary.updated,
+            result.summary.removed,
+        )
+        return "succeeded"
+
+
+def serve(config_path: Path | str) -> None:
+    """Run the snapshot daemon until SIGINT or SIGTERM."""
+    daemon = SnapshotDaemon(load_schedule_config(config_path))
+
+    def _handle_signal(signum: int, _frame: object) -> None:
+        LOGGER.info("Received %s", signal.Signals(signum).name)
+        daemon.stop()
+
+    signal.signal(signal.SIGINT, _handle_signal)
+    signal.signal(signal.SIGTERM, _handle_signal)
+    daemon.run()
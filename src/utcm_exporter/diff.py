@@ -0,0 +1,338 @@
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+import yaml
+
+from utcm_exporter.parser import (
+    MANIFEST_FILE_NAME,
+    NAME_KEYS,
+    derive_folder_names,
+    extract_instances,
+    iter_resource_entries,
+    load_manifest,
+    load_snapshot_file,
+    normalize_resource_display_name,
+    sanitize_filename,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+# Values longer than this are summarized in markdown reports.
+_MARKDOWN_VALUE_LIMIT = 80
+
+# (resource type as "workload/folder", instance identity)
+_InstanceKey = tuple[str, str]
+
+
+class SnapshotDiffError(RuntimeError):
+    """Raised when a snapshot or tenant_state tree cannot be compared."""
+
+
+@dataclass(frozen=True)
+class FieldChange:
+    """One changed field inside a modified instance; ``path`` uses dots and [index]."""
+
+    path: str
+    change: str
+    old: Any = None
+    new: Any = None
+
+    def as_dict(self) -> dict[str, Any]:
+        result: dict[str, Any] = {"path": self.path, "change": self.change}
+        if self.change != "added":
+            result["old"] = self.old
+        if self.change != "removed":
+            result["new"] = self.new
+        return result
+
+
+@dataclass(frozen=True)
+class InstanceChange:
+    resource_type: str
+    identity: str
+    fields: tuple[FieldChange, ...] = ()
+
+    def as_dict(self) -> dict[str, Any]:
+        result: dict[str, Any] = {"resourceType": self.resource_type, "identity": self.identity}
+        if self.fields:
+            result["fields"] = [item.as_dict() for item in self.fields]
+        return result
+
+
+@dataclass
+class DiffReport:
+    """Instance-level differences between two snapshots."""
+
+    added: list[InstanceChange] = field(default_factory=list)
+    removed: list[InstanceChange] = field(default_factory=list)
+    modified: list[InstanceChange] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.removed or self.modified)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "summary": {
+                "added": len(self.added),
+                "removed": len(self.removed),
+                "modified": len(self.modified),
+                "unchanged": self.unchanged,
+            },
+            "added": [item.as_dict() for item in self.added],
+            "removed": [item.as_dict() for item in self.removed],
+            "modified": [item.as_dict() for item in self.modified],
+        }
+
+
+@dataclass
+class _IndexedInstance:
+    digest: str
+    instance: dict[str, Any]
+
+
+def _content_digest(instance: Any) -> str:
+    canonical = json.dumps(instance, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _name_key_identity(instance: dict[str, Any]) -> str | None:
+    for key in NAME_KEYS:
+        value = instance.get(key)
+        if value is not None and str(value).strip():
+            return str(value)
+    return None
+
+
+def _add_instance(
+    index: dict[_InstanceKey, _IndexedInstance],
+    resource_type: str,
+    identity: str,
+    instance: dict[str, Any],
+) -> None:
+    # The same identity twice in one snapshot collapses to the last instance, as it
+    # does in the YAML export, so payloads and exported trees compare equal.
+    index[(resource_type, identity)] = _IndexedInstance(
+        digest=_content_digest(instance),
+        instance=instance,
+    )
+
+
+def index_payload(payload: dict[str, Any]) -> dict[_InstanceKey, _IndexedInstance]:
+    """Index every instance of a snapshot payload by (resource type, identity).
+
+    Identity is the first non-empty ``NAME_KEYS`` value, falling back to the same
+    names the YAML export uses for file names, so payloads and trees line up.
+    """
+    resources = payload.get("resources", [])
+    if not isinstance(resources, list):
+        raise SnapshotDiffError("Snapshot JSON does not contain a list at 'resources'")
+
+    index: dict[_InstanceKey, _IndexedInstance] = {}
+    for resource in iter_resource_entries(resources):
+        resource_type = "/".join(
+            derive_folder_names(str(resource.get("resourceType", "unknown.unknown")))
+        )
+        resource_name = normalize_resource_display_name(
+            str(resource.get("displayName", "")).strip() or None
+        )
+        for idx, (instance, suggested_name) in enumerate(extract_instances(resource), start=1):
+            identity = _name_key_identity(instance)
+            if identity is None:
+                fallback = next(
+                    (name for name in (suggested_name, resource_name) if name and name.strip()),
+                    f"item_{idx:03d}",
+                )
+                identity = sanitize_filename(fallback)
+            _add_instance(index, resource_type, identity, instance)
+    return index
+
+
+def _tree_digests(root: Path) -> dict[str, str]:
+    """Relative YAML path -> sha256, from the export manifest when it is present."""
+    manifest = load_manifest(root)
+    if manifest is not None:
+        return manifest["files"]
+    return {
+        path.relative_to(root).as_posix(): hashlib.sha256(path.read_bytes()).hexdigest()
+        for path in root.rglob("*.yaml")
+        if path.name != MANIFEST_FILE_NAME and "_debug" not in path.relative_to(root).parts
+    }
+
+
+def _index_tree_files(
+    root: Path,
+    rel_paths: Iterable[str],
+) -> dict[_InstanceKey, _IndexedInstance]:
+    index: dict[_InstanceKey, _IndexedInstance] = {}
+    for rel_path in sorted(rel_paths):
+        parts = rel_path.split("/")
+        if len(parts) != 3:
+            continue
+        file_path = root / rel_path
+        try:
+            instance = yaml.load(file_path.read_text(encoding="utf-8"), Loader=_YAML_LOADER)
+        except (OSError, yaml.YAMLError) as exc:
+            raise SnapshotDiffError(f"Could not read {file_path}: {exc}") from exc
+        if not isinstance(instance, dict):
+            LOGGER.warning("Skipping non-mapping YAML file %s", file_path)
+            continue
+        identity = _name_key_identity(instance) or Path(parts[2]).stem
+        _add_instance(index, f"{parts[0]}/{parts[1]}", identity, instance)
+    return index
+
+
+def index_tree(root: Path | str) -> dict[_InstanceKey, _IndexedInstance]:
+    """Index every instance of a tenant_state tree by (resource type, identity)."""
+    tree_root = Path(root)
+    return _index_tree_files(tree_root, list(_tree_digests(tree_root)))
+
+
+def diff_trees(old_root: Path | str, new_root: Path | str) -> DiffReport:
+    """Compare two tenant_state trees.
+
+    Files whose digests (from ``.manifest.json`` when available) match at the same
+    path are counted unchanged without being opened; only the rest are loaded and
+    matched by identity.
+    """
+    old_base, new_base = Path(old_root), Path(new_root)
+    old_digests = _tree_digests(old_base)
+    new_digests = _tree_digests(new_base)
+    same = {
+        rel_path
+        for rel_path, digest in old_digests.items()
+        if new_digests.get(rel_path) == digest
+    }
+    report = compare_indexes(
+        _index_tree_files(old_base, [path for path in old_digests if path not in same]),
+        _index_tree_files(new_base, [path for path in new_digests if path not in same]),
+    )
+    report.unchanged += len(same)
+    return report
+
+
+def diff_payloads(old_payload: dict[str, Any], new_payload: dict[str, Any]) -> DiffReport:
+    return compare_indexes(index_payload(old_payload), index_payload(new_payload))
+
+
+def diff_snapshots(old_source: Path | str, new_source: Path | str) -> DiffReport:
+    """Compare two snapshots given as tenant_state directories or snapshot files."""
+    old_path, new_path = Path(old_source), Path(new_source)
+    if old_path.is_dir() and new_path.is_dir():
+        return diff_trees(old_path, new_path)
+    return compare_indexes(_index_source(old_path), _index_source(new_path))
+
+
+def _index_source(path: Path) -> dict[_InstanceKey, _IndexedInstance]:
+    if path.is_dir():
+        return index_tree(path)
+    if not path.exists():
+        raise SnapshotDiffError(f"Snapshot source not found: {path}")
+    return index_payload(load_snapshot_file(path))
+
+
+def compare_indexes(
+    old_index: dict[_InstanceKey, _IndexedInstance],
+    new_index: dict[_InstanceKey, _IndexedInstance],
+) -> DiffReport:
+    """Compare two instance indexes; only instances with differing digests are walked."""
+    report = DiffReport()
+    for key in sorted(old_index.keys() | new_index.keys()):
+        old_entry = old_index.get(key)
+        new_entry = new_index.get(key)
+        resource_type, identity = key
+        if old_entry is None:
+            report.added.append(InstanceChange(resource_type=resource_type, identity=identity))
+        elif new_entry is None:
+            report.removed.append(InstanceChange(resource_type=resource_type, identity=identity))
+        elif old_entry.digest == new_entry.digest:
+            report.unchanged += 1
+        else:
+            report.modified.append(
+                InstanceChange(
+                    resource_type=resource_type,
+                    identity=identity,
+                    fields=tuple(_diff_values(old_entry.instance, new_entry.instance, "")),
+                )
+            )
+    return report
+
+
+def _same_value(old: Any, new: Any) -> bool:
+    """Equality that also tells JSON types apart: ``True == 1`` and ``1 == 1.0`` are changes."""
+    if type(old) is not type(new):
+        return False
+    if isinstance(old, dict):
+        return old.keys() == new.keys() and all(_same_value(old[key], new[key]) for key in old)
+    if isinstance(old, list):
+        return len(old) == len(new) and all(map(_same_value, old, new))
+    return old == new
+
+
+def _diff_values(old: Any, new: Any, path: str) -> Iterator[FieldChange]:
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in sorted(old.keys() | new.keys(), key=str):
+            child = f"{path}.{key}" if path else str(key)
+            if key not in new:
+                yield FieldChange(path=child, change="removed", old=old[key])
+            elif key not in old:
+                yield FieldChange(path=child, change="added", new=new[key])
+            elif not _same_value(old[key], new[key]):
+                yield from _diff_values(old[key], new[key], child)
+        return
+    if isinstance(old, list) and isinstance(new, list):
+        for idx in range(max(len(old), len(new))):
+            child = f"{path}[{idx}]"
+            if idx >= len(new):
+                yield FieldChange(path=child, change="removed", old=old[idx])
+            elif idx >= len(old):
+                yield FieldChange(path=child, change="added", new=new[idx])
+            elif not _same_value(old[idx], new[idx]):
+                yield from _diff_values(old[idx], new[idx], child)
+        return
+    yield FieldChange(path=path or "$", change="modified", old=old, new=new)
+
+
+def _markdown_value(value: Any) -> str:
+    text = json.dumps(value, sort_keys=True, ensure_ascii=False)
+    if len(text) > _MARKDOWN_VALUE_LIMIT:
+        text = text[: _MARKDOWN_VALUE_LIMIT - 3] + "..."
+    return "`" + text.replace("`", "'") + "`"
+
+
+def render_markdown(report: DiffReport) -> str:
+    """Render a report as a markdown change summary grouped by resource type."""
+    lines = [
+        "# Snapshot diff",
+        "",
+        f"- Added: {len(report.added)}",
+        f"- Removed: {len(report.removed)}",
+        f"- Modified: {len(report.modified)}",
+        f"- Unchanged: {report.unchanged}",
+    ]
+    sections = (("Added", report.added), ("Removed", report.removed), ("Modified", report.modified))
+    for title, changes in sections:
+        if not changes:
+            continue
+        lines += ["", f"## {title}"]
+        current_type = None
+        for change in changes:
+            if change.resource_type != current_type:
+                current_type = change.resource_type
+                lines += ["", f"### {current_type}", ""]
+            lines.append(f"- {change.identity}")
+            for item in change.fields:
+                if item.change == "added":
+                    detail = f"added {_markdown_value(item.new)}"
+                elif item.change == "removed":
+                    detail = f"removed (was {_markdown_value(item.old)})"
+                else:
+                    detail = f"{_markdown_value(item.old)} -> {_markdown_value(item.new)}"
+                lines.append(f"  - `{item.path}`: {detail}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,209 @@
+import logging
+import subprocess
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Mapping
+
+from utcm_exporter.parser import MANIFEST_FILE_NAME
+
+LOGGER = logging.getLogger(__name__)
+
+_CHANGE_ORDER = ("created", "updated", "removed")
+# Snapshot dumps written next to the export by --debug; never committed.
+_DEBUG_DIR_NAME = "_debug"
+
+
+class GitHistoryError(RuntimeError):
+    """Raised when staging, committing or pushing the exported tree fails."""
+
+
+@dataclass(frozen=True)
+class CommitResult:
+    committed: bool
+    commit_sha: str | None = None
+    staged_paths: int = 0
+    message: str = ""
+    pushed: bool = False
+
+
+def _run_git(
+    args: list[str],
+    *,
+    cwd: Path,
+    input_text: str | None = None,
+    check: bool = True,
+) -> subprocess.CompletedProcess[str]:
+    try:
+        completed = subprocess.run(
+            ["git", *args],
+            cwd=cwd,
+            input=input_text,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+    except FileNotFoundError as exc:
+        raise GitHistoryError("git executable not found") from exc
+    if check and completed.returncode != 0:
+        raise GitHistoryError(
+            f"git {args[0]} failed (exit {completed.returncode}): {completed.stderr.strip()}"
+        )
+    return completed
+
+
+def _unstaged_paths(repo_root: Path, pathspec: str) -> dict[str, str]:
+    """Repo paths under ``pathspec`` whose work-tree state differs from the index."""
+    output = _run_git(
+        ["status", "--porcelain", "-z", "--untracked-files=all", "--", pathspec],
+        cwd=repo_root,
+    ).stdout
+    entries = iter(output.split("\0"))
+    unstaged: dict[str, str] = {}
+    for entry in entries:
+        if len(entry) < 4:
+            continue
+        index_state, worktree_state, path = entry[0], entry[1], entry[3:]
+        if index_state in "RC":
+            next(entries, None)  # the rename/copy source follows as its own entry
+        if worktree_state == " ":
+            continue
+        if worktree_state == "?":
+            unstaged[path] = "created"
+        elif worktree_state == "D":
+            unstaged[path] = "removed"
+        else:
+            unstaged[path] = "updated"
+    return unstaged
+
+
+def _format_counts(counts: Counter[str]) -> str:
+    return ", ".join(f"{counts[change]} {change}" for change in _CHANGE_ORDER if counts[change])
+
+
+def build_commit_message(
+    changed_paths: Mapping[str, str],
+    *,
+    timestamp: datetime | None = None,
+) -> str:
+    """Summarise changed export paths by workload and resource type.
+
+    ``changed_paths`` maps paths relative to the output root (``workload/type/name``)
+    to "created", "updated" or "removed", as in ExportSummary.changed_paths.
+    """
+    timestamp = timestamp or datetime.now(UTC)
+    totals: Counter[str] = Counter()
+    by_type: dict[str, Counter[str]] = defaultdict(Counter)
+    for rel_path, change in changed_paths.items():
+        parts = rel_path.split("/")
+        type_key = "/".join(parts[:2]) if len(parts) > 2 else parts[0]
+        by_type[type_key][change] += 1
+        totals[change] += 1
+
+    stamp = f"{timestamp.astimezone(UTC):%Y-%m-%dT%H:%M:%SZ}"
+    lines = [f"UTCM export {stamp}: {_format_counts(totals)}", ""]
+    lines.extend(
+        f"{type_key}: {_format_counts(by_type[type_key])}" for type_key in sorted(by_type)
+    )
+    return "\n".join(lines) + "\n"
+
+
+def commit_export(
+    *,
+    output_root: Path | str,
+    changed_paths: Mapping[str, str],
+    message: str | None = None,
+    author: str | None = None,
+    push: bool = False,
+    remote: str = "origin",
+    stage_untracked: bool = False,
+) -> CommitResult:
+    """Stage exactly the changed export paths and commit them.
+
+    ``output_root`` must be inside a git work tree. Paths are written to the index in
+    one ``git update-index --add --remove`` call, so no work-tree scan happens and
+    deletions are staged alongside additions. No git process is started at all when
+    nothing changed, and no commit is made when the staged paths match HEAD. The commit
+    takes the whole index, so the repository is expected to be dedicated to the export.
+
+    Pass ``stage_untracked`` (ExportSummary.manifest_incomplete) when the export could
+    not tell new files from ones already on disk: a ``git status`` of the output root
+    then stages every difference under it, except ``_debug`` dumps, even if the export
+    reported no change.
+    """
+    if not changed_paths and not stage_untracked:
+        LOGGER.info("No exported files changed; skipping git commit")
+        return CommitResult(committed=False)
+
+    output_base = Path(output_root).resolve()
+    repo_root = Path(
+        _run_git(["rev-parse", "--show-toplevel"], cwd=output_base).stdout.strip()
+    ).resolve()
+    try:
+        prefix = output_base.relative_to(repo_root).as_posix()
+    except ValueError as exc:
+        raise GitHistoryError(f"{output_base} is not inside git work tree {repo_root}") from exc
+
+    def _repo_path(rel_path: str) -> str:
+        return rel_path if prefix == "." else f"{prefix}/{rel_path}"
+
+    repo_paths = [_repo_path(rel_path) for rel_path in sorted(changed_paths)]
+    manifest_path = _repo_path(MANIFEST_FILE_NAME)
+    manifest_ignored = (
+        _run_git(["check-ignore", "-q", manifest_path], cwd=repo_root, check=False).returncode
+        == 0
+    )
+    if not manifest_ignored:
+        repo_paths.append(manifest_path)
+
+    _run_git(
+        ["update-index", "--add", "--remove", "-z", "--stdin"],
+        cwd=repo_root,
+        input_text="".join(f"{path}\0" for path in repo_paths),
+    )
+    unreported: dict[str, str] = {}
+    if stage_untracked:
+        unreported = {
+            path: change
+            for path, change in _unstaged_paths(repo_root, prefix).items()
+            if _DEBUG_DIR_NAME not in path.split("/")
+        }
+    if unreported:
+        LOGGER.warning("Staging %d export paths the export did not report", len(unreported))
+        _run_git(
+            ["update-index", "--add", "--remove", "-z", "--stdin"],
+            cwd=repo_root,
+            input_text="".join(f"{path}\0" for path in sorted(unreported)),
+        )
+        repo_paths.extend(sorted(unreported))
+        changed_paths = dict(changed_paths)
+        for path, change in unreported.items():
+            rel_path = path if prefix == "." else path[len(prefix) + 1 :]
+            if rel_path != MANIFEST_FILE_NAME:
+                changed_paths[rel_path] = change
+    if _run_git(["diff", "--cached", "--quiet"], cwd=repo_root, check=False).returncode == 0:
+        LOGGER.info("Staged export matches HEAD; skipping git commit")
+        return CommitResult(committed=False, staged_paths=len(repo_paths))
+
+    commit_message = message or build_commit_message(changed_paths)
+    commit_args = ["commit", "--quiet", "--file", "-"]
+    if author:
+        commit_args.append(f"--author={author}")
+    _run_git(commit_args, cwd=repo_root, input_text=commit_message)
+    commit_sha = _run_git(["rev-parse", "HEAD"], cwd=repo_root).stdout.strip()
+    LOGGER.info("Committed %d exported paths as %s", len(repo_paths), commit_sha[:12])
+
+    pushed = False
+    if push:
+        _run_git(["push", "--quiet", remote, "HEAD"], cwd=repo_root)
+        pushed = True
+        LOGGER.info("Pushed %s to %s", commit_sha[:12], remote)
+
+    return CommitResult(
+        committed=True,
+        commit_sha=commit_sha,
+        staged_paths=len(repo_paths),
+        message=commit_message,
+        pushed=pushed,
+    )
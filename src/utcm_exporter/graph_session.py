@@ -0,0 +1,297 @@
+import asyncio
+import functools
+import logging
+import random
+import re
+import threading
+import time
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, TypeVar
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utcm_exporter.auth import TokenProvider, get_token_provider
+from utcm_exporter.metrics import REGISTRY
+
+LOGGER = logging.getLogger(__name__)
+
+_RETRYABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+_IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "DELETE", "PUT"})
+_DEFAULT_POOL_SIZE = 10
+_DEFAULT_MAX_RETRIES = 5
+_DEFAULT_BACKOFF_BASE_SECONDS = 1.0
+_DEFAULT_BACKOFF_MAX_SECONDS = 60.0
+_MAX_RETRY_AFTER_SECONDS = 300.0
+
+_GRAPH_HOST = "graph.microsoft.com"
+# Path segments that identify one object (GUIDs, numeric ids) are collapsed in metric labels.
+_ID_SEGMENT = re.compile(r"^(?:[0-9a-fA-F-]{16,}|\d+)$")
+
+_REQUESTS = REGISTRY.counter(
+    "utcm_graph_requests_total",
+    "HTTP attempts by endpoint, method and status code ('error' for connection failures).",
+    ("endpoint", "method", "status"),
+)
+_REQUEST_SECONDS = REGISTRY.histogram(
+    "utcm_graph_request_seconds",
+    "Latency of single HTTP attempts until response headers, by endpoint and method.",
+    ("endpoint", "method"),
+)
+_RETRIES = REGISTRY.counter(
+    "utcm_graph_retries_total",
+    "Retried attempts by endpoint and reason (HTTP status, connection error or token refresh).",
+    ("endpoint", "reason"),
+)
+
+_T = TypeVar("_T")
+
+_DEFAULT_SESSION: "GraphSession | None" = None
+_DEFAULT_SESSION_LOCK = threading.Lock()
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=UTC)
+    return max(0.0, (retry_at - datetime.now(UTC)).total_seconds())
+
+
+@functools.lru_cache(maxsize=1024)
+def _endpoint_label(url: str) -> str:
+    """Low-cardinality endpoint name: the Graph path without ids and query, else the host."""
+    parts = urlsplit(url)
+    if parts.hostname != _GRAPH_HOST:
+        return parts.hostname or "unknown"
+    segments = [
+        "{id}" if _ID_SEGMENT.match(segment) else segment
+        for segment in parts.path.split("/")
+        if segment
+    ]
+    return "/" + "/".join(segments)
+
+
+class GraphSession:
+    """Pooled HTTP session for Microsoft Graph with throttling-aware retries.
+
+    Requests share keep-alive connections through one ``requests.Session``, negotiate
+    gzip/deflate responses, and are retried on 429/502/503/504 (non-idempotent methods
+    such as POST only on 429). ``Retry-After`` is honoured when Graph sends it;
+    otherwise retries use exponential backoff with full jitter. Authenticated requests
+    get a bearer token from ``token_provider``, refreshed once after a 401.
+    """
+
+    def __init__(
+        self,
+        token_provider: TokenProvider | None = None,
+        *,
+        pool_size: int = _DEFAULT_POOL_SIZE,
+        max_retries: int = _DEFAULT_MAX_RETRIES,
+        backoff_base_seconds: float = _DEFAULT_BACKOFF_BASE_SECONDS,
+        backoff_max_seconds: float = _DEFAULT_BACKOFF_MAX_SECONDS,
+    ) -> None:
+        self._token_provider = token_provider
+        self.pool_size = pool_size
+        self._max_retries = max_retries
+        self._backoff_base_seconds = backoff_base_seconds
+        self._backoff_max_seconds = backoff_max_seconds
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._session.headers.update(
+            {
+                "Accept": "application/json",
+                "Accept-Encoding": "gzip, deflate",
+            }
+        )
+
+    @property
+    def token_provider(self) -> TokenProvider:
+        if self._token_provider is None:
+            self._token_provider = get_token_provider()
+        return self._token_provider
+
+    def close(self) -> None:
+        self._session.close()
+
+    def __enter__(self) -> "GraphSession":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        json: Any = None,
+        headers: dict[str, str] | None = None,
+        timeout: float = 30,
+        stream: bool = False,
+        authenticated: bool = True,
+    ) -> requests.Response:
+        """Send a request, retrying throttled and transient failures.
+
+        The final response is returned as-is once retries are exhausted so callers keep
+        their own status handling (``raise_for_status`` or Graph error extraction).
+        """
+        method = method.upper()
+        endpoint = _endpoint_label(url)
+        attempt = 0
+        refreshed_token = False
+
+        while True:
+            request_headers = dict(headers or {})
+            if authenticated:
+                request_headers["Authorization"] = f"Bearer {self.token_provider.get_token()}"
+
+            started = time.perf_counter()
+            try:
+                response = self._session.request(
+                    method,
+                    url,
+                    json=json,
+                    headers=request_headers,
+                    timeout=timeout,
+                    stream=stream,
+                )
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                _REQUESTS.inc(endpoint=endpoint, method=method, status="error")
+                if method not in _IDEMPOTENT_METHODS or attempt >= self._max_retries:
+                    raise
+                _RETRIES.inc(endpoint=endpoint, reason=exc.__class__.__name__)
+                attempt += 1
+                delay = self._backoff_delay(attempt)
+                LOGGER.warning(
+                    "%s %s failed (%s); retrying in %.1fs (attempt %d/%d)",
+                    method,
+                    url,
+                    exc.__class__.__name__,
+                    delay,
+                    attempt,
+                    self._max_retries,
+                )
+                time.sleep(delay)
+                continue
+            elapsed = time.perf_counter() - started
+            _REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, method=method)
+            _REQUESTS.inc(endpoint=endpoint, method=method, status=response.status_code)
+
+            if response.status_code == 401 and authenticated and not refreshed_token:
+                # A cached token can be revoked or rotated before its nominal expiry.
+                _RETRIES.inc(endpoint=endpoint, reason="token_refresh")
+                refreshed_token = True
+                response.close()
+                self.token_provider.invalidate()
+                continue
+
+            if response.status_code not in _RETRYABLE_STATUS_CODES or attempt >= self._max_retries:
+                return response
+            if method not in _IDEMPOTENT_METHODS and response.status_code != 429:
+                # A 5xx can arrive after the request was processed; retrying a POST such
+                # as createSnapshot could then create a second job. 429 means it was not.
+                return response
+
+            attempt += 1
+            _RETRIES.inc(endpoint=endpoint, reason=response.status_code)
+            retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                delay = min(retry_after, _MAX_RETRY_AFTER_SECONDS) + random.uniform(0, 1)
+            else:
+                delay = self._backoff_delay(attempt)
+            LOGGER.warning(
+                "%s %s returned HTTP %d; retrying in %.1fs (attempt %d/%d)",
+                method,
+                url,
+                response.status_code,
+                delay,
+                attempt,
+                self._max_retries,
+            )
+            response.close()
+            time.sleep(delay)
+
+    def _backoff_delay(self, attempt: int) -> float:
+        ceiling = min(self._backoff_max_seconds, self._backoff_base_seconds * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+def get_graph_session() -> GraphSession:
+    """Return the process-wide Graph session using the default token provider."""
+    global _DEFAULT_SESSION
+    with _DEFAULT_SESSION_LOCK:
+        if _DEFAULT_SESSION is None:
+            _DEFAULT_SESSION = GraphSession()
+        return _DEFAULT_SESSION
+
+
+class AsyncGraphSession:
+    """asyncio front end for a GraphSession.
+
+    Requests run in worker threads (``asyncio.to_thread``) on the wrapped session's
+    connection pool, so they keep its retries, token refresh and keep-alive. At most
+    ``max_concurrency`` requests (default: the pool size) are in flight at once; time
+    spent between requests costs no thread, so one event loop can hold thousands of
+    pending waits. An instance belongs to the event loop that first uses it.
+    """
+
+    def __init__(
+        self,
+        session: GraphSession | None = None,
+        *,
+        max_concurrency: int | None = None,
+    ) -> None:
+        self.session = session or get_graph_session()
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency or self.session.pool_size))
+
+    @property
+    def pool_size(self) -> int:
+        return self.session.pool_size
+
+    async def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs: Any) -> requests.Response:
+        return await self.request("DELETE", url, **kwargs)
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        return await self.run(self.session.request, method, url, **kwargs)
+
+    async def run(self, func: Callable[..., _T], /, *args: Any, **kwargs: Any) -> _T:
+        """Run a blocking call that uses ``self.session`` under the same concurrency limit."""
+        async with self._semaphore:
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+
+def as_async_session(session: "AsyncGraphSession | GraphSession | None") -> AsyncGraphSession:
+    """Wrap a GraphSession (default: the process-wide one) unless it already is async."""
+    if isinstance(session, AsyncGraphSession):
+        return session
+    return AsyncGraphSession(session)
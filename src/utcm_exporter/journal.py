@@ -0,0 +1,173 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+from utcm_exporter.locking import file_lock, sidecar_lock_path
+from utcm_exporter.polling import resource_set_key
+
+LOGGER = logging.getLogger(__name__)
+
+_JOURNAL_VERSION = 1
+PHASES = ("created", "polling", "downloaded", "parsed")
+
+
+def journal_key(resources: list[str], output_root: Path | str) -> str:
+    """Identify a pipeline run by its resource set and output folder."""
+    output = str(Path(output_root).resolve())
+    digest = hashlib.sha256(output.encode("utf-8")).hexdigest()[:8]
+    return f"{resource_set_key(resources)}-{digest}"
+
+
+@dataclass
+class FollowUpJob:
+    """A snapshot job re-exporting the resource types an earlier job failed for.
+
+    ``status`` is ``pending`` until the job is terminal, then the job's final status.
+    """
+
+    job_id: str
+    resources: list[str]
+    status: str = "pending"
+    resource_location: str | None = None
+    failed_resources: list[str] = field(default_factory=list)
+    download_path: str | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "jobId": self.job_id,
+            "resources": self.resources,
+            "status": self.status,
+            "resourceLocation": self.resource_location,
+            "failedResources": self.failed_resources,
+            "downloadPath": self.download_path,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "FollowUpJob":
+        return cls(
+            job_id=str(data["jobId"]),
+            resources=[str(item) for item in data.get("resources", [])],
+            status=str(data.get("status", "pending")),
+            resource_location=data.get("resourceLocation"),
+            failed_resources=[str(item) for item in data.get("failedResources", [])],
+            download_path=data.get("downloadPath"),
+        )
+
+
+@dataclass
+class JournalEntry:
+    """Progress of one snapshot pipeline run; ``phase`` is the last completed phase."""
+
+    job_id: str
+    resources: list[str]
+    output_root: str
+    phase: str = "created"
+    # Types the job was created with, after the unsupported cache; empty in old entries.
+    submitted_resources: list[str] = field(default_factory=list)
+    resource_location: str | None = None
+    download_path: str | None = None
+    changed_paths: dict[str, str] = field(default_factory=dict)
+    manifest_incomplete: bool = False
+    failed_resources: list[str] = field(default_factory=list)
+    follow_ups: list[FollowUpJob] = field(default_factory=list)
+    updated_at: str = ""
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "jobId": self.job_id,
+            "resources": self.resources,
+            "outputRoot": self.output_root,
+            "phase": self.phase,
+            "submittedResources": self.submitted_resources,
+            "resourceLocation": self.resource_location,
+            "downloadPath": self.download_path,
+            "changedPaths": self.changed_paths,
+            "manifestIncomplete": self.manifest_incomplete,
+            "failedResources": self.failed_resources,
+            "followUps": [follow_up.as_dict() for follow_up in self.follow_ups],
+            "updatedAt": self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "JournalEntry":
+        phase = str(data.get("phase", "created"))
+        if phase not in PHASES:
+            raise ValueError(f"Unknown journal phase: {phase}")
+        return cls(
+            job_id=str(data["jobId"]),
+            resources=[str(item) for item in data.get("resources", [])],
+            output_root=str(data.get("outputRoot", "")),
+            phase=phase,
+            submitted_resources=[str(item) for item in data.get("submittedResources", [])],
+            resource_location=data.get("resourceLocation"),
+            download_path=data.get("downloadPath"),
+            changed_paths=dict(data.get("changedPaths") or {}),
+            manifest_incomplete=bool(data.get("manifestIncomplete", False)),
+            failed_resources=[str(item) for item in data.get("failedResources", [])],
+            follow_ups=[FollowUpJob.from_dict(item) for item in data.get("followUps", [])],
+            updated_at=str(data.get("updatedAt", "")),
+        )
+
+
+class PipelineJournal:
+    """On-disk record of in-progress pipeline runs, so a rerun resumes instead of restarting.
+
+    Entries are keyed by journal_key and rewritten atomically after every phase. A run
+    that reaches its final phase is removed from the journal. Several processes (the
+    daemon and run-all, say) may share one file: each update re-reads it under a lock
+    file and changes only its own key.
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock, file_lock(sidecar_lock_path(self.path)):
+            self._entries = self._load()
+            yield
+
+    def _load(self) -> dict[str, JournalEntry]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            return {key: JournalEntry.from_dict(value) for key, value in data["runs"].items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as exc:
+            LOGGER.warning("Ignoring unreadable pipeline journal %s: %s", self.path, exc)
+            return {}
+
+    def get(self, key: str) -> JournalEntry | None:
+        with self._locked():
+            return self._entries.get(key)
+
+    def save(self, key: str, entry: JournalEntry) -> None:
+        entry.updated_at = datetime.now(UTC).isoformat()
+        with self._locked():
+            self._entries[key] = entry
+            self._write()
+        LOGGER.debug("Journal %s: job %s reached phase %s", key, entry.job_id, entry.phase)
+
+    def clear(self, key: str) -> None:
+        with self._locked():
+            if self._entries.pop(key, None) is not None:
+                self._write()
+
+    def _write(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        data = {
+            "version": _JOURNAL_VERSION,
+            "runs": {key: entry.as_dict() for key, entry in sorted(self._entries.items())},
+        }
+        tmp_path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,135 @@
+import codecs
+import json
+from typing import Any, Iterable, Iterator
+
+_WHITESPACE = " \t\n\r"
+# Characters that can continue a JSON number, e.g. "12" -> "12.5e-3".
+_NUMBER_CHARS = frozenset("0123456789+-.eE")
+
+
+class JSONStreamError(ValueError):
+    """Raised when a streamed JSON document is malformed or truncated."""
+
+
+class _ChunkReader:
+    """Text buffer over an iterable of byte chunks that drops consumed input."""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._text = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, min_new_chars: int = 1) -> bool:
+        """Read until at least ``min_new_chars`` characters were added or input ends."""
+        if self._pos:
+            self._text = self._text[self._pos :]
+            self._pos = 0
+        added = 0
+        while added < min_new_chars and not self._eof:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self._eof = True
+                tail = self._decoder.decode(b"", final=True)
+                self._text += tail
+                added += len(tail)
+                break
+            if chunk:
+                text = self._decoder.decode(chunk)
+                self._text += text
+                added += len(text)
+        return added > 0
+
+    def peek(self) -> str:
+        while True:
+            while self._pos < len(self._text) and self._text[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._text):
+                return self._text[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise JSONStreamError(f"Expected {char!r} but found {found or 'end of input'!r}")
+        self._pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                obj, end = self._json.raw_decode(self._text, self._pos)
+            except json.JSONDecodeError as exc:
+                if self._eof:
+                    raise JSONStreamError(f"Invalid JSON in stream: {exc}") from exc
+                # Grow the buffer geometrically so a large value is re-scanned O(log n)
+                # times rather than once per chunk.
+                self._fill(min_new_chars=max(1, len(self._text) - self._pos))
+                continue
+            if not self._eof and self._may_continue(obj, end):
+                if self._fill():
+                    continue
+            self._pos = end
+            return obj
+
+    def _may_continue(self, obj: Any, end: int) -> bool:
+        """Whether ``obj`` may be a prefix of a value cut at the buffer edge."""
+        if end == len(self._text):
+            return True
+        # raw_decode reads "12." or "1e" as 12 and 1, stopping before the dangling
+        # part of a number that continues in the next chunk.
+        return (
+            isinstance(obj, (int, float))
+            and not isinstance(obj, bool)
+            and all(char in _NUMBER_CHARS for char in self._text[end:])
+        )
+
+
+def iter_json_object_array(
+    chunks: Iterable[bytes],
+    *,
+    array_key: str,
+    metadata: dict[str, Any] | None = None,
+) -> Iterator[Any]:
+    """Yield the items of ``document[array_key]`` from a streamed JSON object.
+
+    Only one array item is held in memory at a time. Other top-level members are decoded
+    whole and stored in ``metadata`` when a dict is given, otherwise discarded.
+    """
+    reader = _ChunkReader(chunks)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+
+    while True:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise JSONStreamError("Expected a string object key")
+        reader.expect(":")
+
+        if key == array_key and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.expect("]")
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.peek() == ",":
+                        reader.expect(",")
+                        continue
+                    reader.expect("]")
+                    break
+        else:
+            value = reader.value()
+            if metadata is not None:
+                metadata[key] = value
+
+        if reader.peek() == ",":
+            reader.expect(",")
+            continue
+        reader.expect("}")
+        return
@@ -0,0 +1,31 @@
+import contextlib
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock; only the in-process locks apply.
+    fcntl = None
+
+# Whether file_lock actually excludes other processes on this platform.
+FILE_LOCKS_SUPPORTED = fcntl is not None
+
+
+@contextlib.contextmanager
+def file_lock(path: Path, *, shared: bool = False) -> Iterator[None]:
+    """flock ``path`` for the duration of the block (no-op where fcntl is missing)."""
+    if fcntl is None:
+        yield
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a+b") as handle:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def sidecar_lock_path(path: Path) -> Path:
+    """Lock file guarding read-modify-write cycles of the state file ``path``."""
+    return path.with_name(f"{path.name}.lock")
@@ -1,23 +1,107 @@
+import gzip
+import hashlib
+import json
 import logging
+import os
 import re
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any
+from typing import Any, Collection, Iterable, Iterator
 
-import requests
 import yaml
 
-from utcm_exporter.auth import get_access_token
+from utcm_exporter.graph_session import (
+    AsyncGraphSession,
+    GraphSession,
+    as_async_session,
+    get_graph_session,
+)
+from utcm_exporter.json_stream import JSONStreamError, iter_json_object_array
+from utcm_exporter.metrics import REGISTRY
 
 LOGGER = logging.getLogger(__name__)
 
 _INVALID_FILENAME_CHARS = re.compile(r"[\\/:*?\"<>|]")
-_NAME_KEYS = ("displayName", "name", "id", "DisplayName", "Name", "Id", "ID")
+NAME_KEYS = ("displayName", "name", "id", "DisplayName", "Name", "Id", "ID")
+_STREAM_CHUNK_SIZE = 64 * 1024
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+MANIFEST_FILE_NAME = ".manifest.json"
+_MANIFEST_VERSION = 1
+# libyaml's emitter is several times faster; fall back to pure Python when PyYAML was
+# built without it.
+_YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+_MAX_ENTRIES_PER_TASK = 64
+# Part of every resource-type fingerprint: bump when naming or YAML layout changes so
+# incremental runs re-render everything once.
+_RENDER_VERSION = 1
+
+_DOWNLOAD_BYTES = REGISTRY.counter(
+    "utcm_snapshot_download_bytes_total",
+    "Snapshot JSON bytes received from resourceLocation, by mode (json, stream, file).",
+    ("mode",),
+)
+_DOWNLOAD_SECONDS = REGISTRY.histogram(
+    "utcm_snapshot_download_seconds",
+    "Time to receive a snapshot body; in stream mode this includes parsing and writing.",
+    ("mode",),
+)
+_EXPORT_INSTANCES = REGISTRY.gauge(
+    "utcm_export_instances",
+    "YAML files (instances) per resource type in each output folder after its last export.",
+    ("output", "resource_type"),
+)
+_EXPORT_FILE_CHANGES = REGISTRY.counter(
+    "utcm_export_file_changes_total",
+    "Exported YAML files by change: created, updated, unchanged or removed.",
+    ("change",),
+)
+_YAML_WRITE_SECONDS = REGISTRY.counter(
+    "utcm_yaml_write_seconds_total",
+    "Time spent hashing, comparing and writing YAML files, by resource type.",
+    ("resource_type",),
+)
+_EXPORT_SECONDS = REGISTRY.histogram(
+    "utcm_export_duration_seconds",
+    "Wall time of one YAML export, including reading its (possibly streamed) input.",
+)
 
 
 class SnapshotParserError(RuntimeError):
     """Raised when snapshot download or parse operations fail."""
 
 
+@dataclass
+class ExportSummary:
+    """File-level outcome of writing a snapshot to the YAML tree."""
+
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    changed_resource_types: list[str] = field(default_factory=list)
+    skipped_resource_types: int = 0
+    # Relative path under the output root -> "created", "updated" or "removed".
+    changed_paths: dict[str, str] = field(default_factory=dict)
+    # "<workload>/<resource folder>" -> YAML files (instances) now in the output tree.
+    instance_counts: dict[str, int] = field(default_factory=dict)
+    # The previous manifest was missing, or did not list files already on disk (left by
+    # a run that died before writing it), so changed_paths may omit files git lacks.
+    manifest_incomplete: bool = False
+
+    @property
+    def total_files(self) -> int:
+        return self.created + self.updated + self.unchanged
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.created or self.updated or self.removed)
+
+
 def sanitize_filename(value: str) -> str:
     sanitized = _INVALID_FILENAME_CHARS.sub("_", value).strip()
     sanitized = re.sub(r"\s+", "_", sanitized)
@@ -25,16 +109,19 @@ def sanitize_filename(value: str) -> str:
     return sanitized or "unnamed"
 
 
-def download_snapshot_json(resource_location: str) -> dict[str, Any]:
-    access_token = get_access_token()
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Accept": "application/json",
-    }
+def download_snapshot_json(
+    resource_location: str,
+    *,
+    session: GraphSession | None = None,
+) -> dict[str, Any]:
+    graph = session or get_graph_session()
 
     LOGGER.info("Downloading snapshot JSON from resourceLocation")
-    response = requests.get(resource_location, headers=headers, timeout=60)
+    started = time.perf_counter()
+    response = graph.get(resource_location, timeout=60)
     response.raise_for_status()
+    _DOWNLOAD_BYTES.inc(len(response.content), mode="json")
+    _DOWNLOAD_SECONDS.observe(time.perf_counter() - started, mode="json")
 
     payload = response.json()
     if not isinstance(payload, dict):
@@ -44,7 +131,206 @@ def download_snapshot_json(resource_location: str) -> dict[str, Any]:
     return payload
 
 
-def _derive_folder_names(resource_type: str) -> tuple[str, str]:
+def stream_snapshot_resources(
+    resource_location: str,
+    *,
+    session: GraphSession | None = None,
+    metadata: dict[str, Any] | None = None,
+) -> Iterator[Any]:
+    """Yield ``resources[*]`` entries while the snapshot is still downloading.
+
+    The response body is read in chunks and parsed incrementally, so memory is bounded
+    by the largest single resource entry rather than by the whole snapshot. Other
+    top-level members are collected into ``metadata`` when given.
+    """
+    graph = session or get_graph_session()
+
+    LOGGER.info("Streaming snapshot JSON from resourceLocation")
+    response = graph.get(resource_location, timeout=60, stream=True)
+    try:
+        response.raise_for_status()
+        yield from iter_snapshot_resources(
+            _metered_chunks(response.iter_content(chunk_size=_STREAM_CHUNK_SIZE), "stream"),
+            metadata=metadata,
+        )
+    finally:
+        response.close()
+
+
+def _metered_chunks(chunks: Iterable[bytes], mode: str) -> Iterator[bytes]:
+    started = time.perf_counter()
+    received = 0
+    try:
+        for chunk in chunks:
+            received += len(chunk)
+            yield chunk
+    finally:
+        _DOWNLOAD_BYTES.inc(received, mode=mode)
+        _DOWNLOAD_SECONDS.observe(time.perf_counter() - started, mode=mode)
+
+
+def download_snapshot_file(
+    resource_location: str,
+    destination: Path | str,
+    *,
+    session: GraphSession | None = None,
+) -> Path:
+    """Stream the raw snapshot JSON to a gzip file without holding it in memory.
+
+    The file is written under a temporary name and renamed once complete, so a
+    partial download is never mistaken for a finished one.
+    """
+    graph = session or get_graph_session()
+    target = Path(destination)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(f".{target.name}.tmp")
+
+    LOGGER.info("Downloading snapshot JSON from resourceLocation to %s", target)
+    response = graph.get(resource_location, timeout=60, stream=True)
+    try:
+        response.raise_for_status()
+        with gzip.open(tmp_path, "wb") as handle:
+            chunks = response.iter_content(chunk_size=_STREAM_CHUNK_SIZE)
+            for chunk in _metered_chunks(chunks, "file"):
+                handle.write(chunk)
+    finally:
+        response.close()
+    os.replace(tmp_path, target)
+    return target
+
+
+async def download_snapshot_file_async(
+    resource_location: str,
+    destination: Path | str,
+    *,
+    session: AsyncGraphSession | GraphSession | None = None,
+) -> Path:
+    """Async download_snapshot_file; the streaming copy runs in a worker thread."""
+    graph = as_async_session(session)
+    return await graph.run(
+        download_snapshot_file,
+        resource_location,
+        destination,
+        session=graph.session,
+    )
+
+
+def iter_snapshot_resources(
+    chunks: Iterable[bytes],
+    *,
+    metadata: dict[str, Any] | None = None,
+) -> Iterator[Any]:
+    """Incrementally parse ``resources[*]`` from raw snapshot JSON byte chunks."""
+    collected = metadata if metadata is not None else {}
+    try:
+        yield from iter_json_object_array(chunks, array_key="resources", metadata=collected)
+    except JSONStreamError as exc:
+        raise SnapshotParserError(f"Snapshot JSON could not be parsed: {exc}") from exc
+    if "resources" in collected:
+        raise SnapshotParserError("Snapshot JSON does not contain a list at 'resources'")
+
+
+def _iter_file_chunks(path: Path) -> Iterator[bytes]:
+    with path.open("rb") as raw:
+        magic = raw.read(4)
+        raw.seek(0)
+        if magic.startswith(_GZIP_MAGIC):
+            handle: Any = gzip.GzipFile(fileobj=raw)
+        elif magic == _ZSTD_MAGIC:
+            # zstandard is optional and only needed for .zst snapshot files.
+            try:
+                import zstandard
+            except ImportError as exc:
+                raise SnapshotParserError(
+                    f"{path} is zstd-compressed; install 'zstandard' to read it"
+                ) from exc
+            handle = zstandard.ZstdDecompressor().stream_reader(raw)
+        else:
+            handle = raw
+        with handle:
+            while chunk := handle.read(_STREAM_CHUNK_SIZE):
+                yield chunk
+
+
+def stream_snapshot_file_resources(
+    path: Path | str,
+    *,
+    metadata: dict[str, Any] | None = None,
+) -> Iterator[Any]:
+    """Yield ``resources[*]`` entries from a local snapshot file.
+
+    Plain, gzip and zstd JSON are detected from the file's magic bytes, so raw
+    downloads, ``_debug/snapshot_*.json`` dumps and archive exports all work. The file
+    is read in chunks through the same incremental parser as live downloads.
+    """
+    snapshot_path = Path(path)
+    LOGGER.info("Reading snapshot JSON from %s", snapshot_path)
+    try:
+        yield from iter_snapshot_resources(_iter_file_chunks(snapshot_path), metadata=metadata)
+    except (OSError, EOFError) as exc:
+        raise SnapshotParserError(
+            f"Snapshot file {snapshot_path} could not be read: {exc}"
+        ) from exc
+
+
+def load_snapshot_file(path: Path | str) -> dict[str, Any]:
+    """Load a local snapshot file (plain, gzip or zstd JSON) as a full payload."""
+    metadata: dict[str, Any] = {}
+    resources = list(stream_snapshot_file_resources(path, metadata=metadata))
+    return {**metadata, "resources": resources}
+
+
+def merge_snapshot_payloads(payloads: list[dict[str, Any]]) -> dict[str, Any]:
+    """Combine snapshot payloads from sharded jobs into one payload.
+
+    Top-level metadata is taken from the first payload; ``resources`` lists are
+    concatenated in payload order.
+    """
+    if not payloads:
+        raise SnapshotParserError("At least one snapshot payload is required to merge")
+
+    merged_resources: list[Any] = []
+    for payload in payloads:
+        resources = payload.get("resources", [])
+        if not isinstance(resources, list):
+            raise SnapshotParserError("Snapshot JSON does not contain a list at 'resources'")
+        merged_resources.extend(resources)
+
+    return {**payloads[0], "resources": merged_resources}
+
+
+def overlay_snapshot_resources(
+    layers: list[tuple[Iterable[Any], Collection[str] | None]],
+) -> Iterator[Any]:
+    """Yield resource entries from several snapshots, later layers overriding earlier ones.
+
+    Each layer is ``(resources, provided_types)``. Entries whose resourceType is
+    provided by a later layer are dropped from earlier ones, so a follow-up job that
+    re-exported a few failed resource types replaces whatever the first job returned
+    for them. ``provided_types`` of None (the base snapshot) overrides nothing. Layers
+    are consumed one after another, so lazy streams stay lazy.
+    """
+    owners: dict[str, int] = {}
+    for index, (_, provided_types) in enumerate(layers):
+        for resource_type in provided_types or ():
+            owners[resource_type.lower()] = index
+
+    for index, (resources, _) in enumerate(layers):
+        for resource in resources:
+            resource_type = (
+                str(resource.get("resourceType", "")).lower() if isinstance(resource, dict) else ""
+            )
+            if owners.get(resource_type, index) == index:
+                yield resource
+
+
+def resource_output_folder(resource_type: str) -> str:
+    """Folder (``<workload>/<resource>``) that a resource type's YAML files go to."""
+    return "/".join(derive_folder_names(resource_type))
+
+
+def derive_folder_names(resource_type: str) -> tuple[str, str]:
+    """Split ``microsoft.<workload>.<resource>`` into (workload, resource) folder names."""
     parts = resource_type.lower().split(".")
     workload = parts[1] if len(parts) > 1 else "unknown"
     resource_folder = parts[-1] if parts else "unknown"
@@ -52,10 +338,11 @@ def _derive_folder_names(resource_type: str) -> tuple[str, str]:
 
 
 def _looks_like_instance(candidate: dict[str, Any]) -> bool:
-    return any(key in candidate for key in _NAME_KEYS)
+    return any(key in candidate for key in NAME_KEYS)
 
 
-def _extract_instances(resource: dict[str, Any]) -> list[tuple[dict[str, Any], str | None]]:
+def extract_instances(resource: dict[str, Any]) -> list[tuple[dict[str, Any], str | None]]:
+    """Return (instance, suggested file name) pairs found in a resource's properties."""
     properties = resource.get("properties")
     instances: list[tuple[dict[str, Any], str | None]] = []
 
@@ -103,7 +390,7 @@ def _resolve_instance_name(
     resource_name: str | None,
     default_name: str,
 ) -> str:
-    for key in _NAME_KEYS:
+    for key in NAME_KEYS:
         value = instance.get(key)
         if value is not None and str(value).strip():
             return str(value)
@@ -114,7 +401,8 @@ def _resolve_instance_name(
     return default_name
 
 
-def _normalize_resource_display_name(resource_display_name: str | None) -> str | None:
+def normalize_resource_display_name(resource_display_name: str | None) -> str | None:
+    """Strip the resource type prefix UTCM puts in front of display names."""
     if not resource_display_name:
         return None
     # Example: TeamsMeetingPolicy-Global -> Global
@@ -126,92 +414,581 @@ def _normalize_resource_display_name(resource_display_name: str | None) -> str |
     return resource_display_name.strip() or None
 
 
+def _render_yaml(instance: dict[str, Any]) -> bytes:
+    return yaml.dump(
+        instance,
+        Dumper=_YAML_DUMPER,
+        sort_keys=True,
+        indent=2,
+        default_flow_style=False,
+        allow_unicode=False,
+    ).encode("utf-8")
+
+
+def load_manifest(output_base: Path) -> dict[str, Any] | None:
+    """Return the previous run's manifest, or None if it is missing or unusable.
+
+    ``files`` maps relative path -> sha256; ``resourceTypes`` holds the payload
+    fingerprint and file list of each resource-type group from incremental runs.
+    """
+    manifest_path = output_base / MANIFEST_FILE_NAME
+    try:
+        payload = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exc:
+        LOGGER.warning("Ignoring unreadable manifest %s: %s", manifest_path, exc)
+        return None
+
+    files = payload.get("files") if isinstance(payload, dict) else None
+    if not isinstance(files, dict) or not all(
+        isinstance(key, str) and isinstance(value, str) for key, value in files.items()
+    ):
+        LOGGER.warning("Ignoring manifest with unexpected format: %s", manifest_path)
+        return None
+
+    groups = payload.get("resourceTypes")
+    if not isinstance(groups, dict):
+        groups = {}
+    return {"files": files, "resourceTypes": groups}
+
+
+def _atomic_write_bytes(path: Path, content: bytes) -> None:
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_bytes(content)
+    os.replace(tmp_path, path)
+
+
+def _fingerprint_resources(resources: list[dict[str, Any]]) -> str:
+    digest = hashlib.sha256(f"{_RENDER_VERSION}:{_YAML_DUMPER.__name__}".encode("ascii"))
+    for resource in resources:
+        canonical = json.dumps(resource, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        digest.update(b"\0")
+        digest.update(canonical.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class _YamlTreeWriter:
+    """Writes rendered YAML files, skipping those whose content hash is unchanged.
+
+    The sha256 of every file is kept in ``.manifest.json`` at the output root. A file is
+    only rewritten (atomically, via temp file + rename) when its rendered bytes differ
+    from the previous run, so unchanged files keep their mtime and git's stat cache.
+    In incremental mode the manifest also records a payload fingerprint per
+    resource-type group, so a group whose payload is unchanged is not rendered at all.
+    """
+
+    def __init__(self, output_base: Path) -> None:
+        self.output_base = output_base
+        previous = load_manifest(output_base)
+        self.has_previous_manifest = previous is not None
+        self.previous: dict[str, str] = previous["files"] if previous else {}
+        self.previous_groups: dict[str, Any] = previous["resourceTypes"] if previous else {}
+        self.current: dict[str, str] = {}
+        self.current_groups: dict[str, dict[str, Any]] = {}
+        self._rendered_groups: set[str] = set()
+        self._existed_before: dict[str, bool] = {}
+        self._written: set[str] = set()
+        self._found_unlisted = False
+        self._created_dirs: set[Path] = set()
+
+    def reuse_group(self, group_key: str, resource_type: str, fingerprint: str) -> bool:
+        """Carry a group's files over unchanged if its payload fingerprint matches."""
+        previous_group = self.previous_groups.get(group_key)
+        if not isinstance(previous_group, dict) or previous_group.get("fingerprint") != fingerprint:
+            return False
+        group_files = previous_group.get("files")
+        if not isinstance(group_files, list) or not all(
+            rel_path in self.previous for rel_path in group_files
+        ):
+            return False
+
+        for rel_path in group_files:
+            if rel_path not in self.current:
+                self.current[rel_path] = self.previous[rel_path]
+                self._existed_before[rel_path] = True
+        self.current_groups[group_key] = {
+            "resourceType": resource_type,
+            "fingerprint": fingerprint,
+            "files": list(group_files),
+        }
+        return True
+
+    def start_group(self, group_key: str, resource_type: str, fingerprint: str) -> None:
+        self._rendered_groups.add(group_key)
+        self.current_groups[group_key] = {
+            "resourceType": resource_type,
+            "fingerprint": fingerprint,
+            "files": [],
+        }
+
+    def write(
+        self,
+        target_dir: Path,
+        file_name: str,
+        content: bytes,
+        group_key: str | None = None,
+    ) -> None:
+        file_path = target_dir / file_name
+        rel_path = file_path.relative_to(self.output_base).as_posix()
+        digest = hashlib.sha256(content).hexdigest()
+        if group_key is not None:
+            self.current_groups[group_key]["files"].append(rel_path)
+
+        if rel_path in self.current:
+            # Another instance in this run resolved to the same file name; the last
+            # one wins, as it always has.
+            if self.current[rel_path] == digest:
+                return
+        else:
+            exists = file_path.exists()
+            self._existed_before[rel_path] = exists
+            if exists and rel_path not in self.previous:
+                self._found_unlisted = True
+            if exists and self._matches_previous(rel_path, file_path, digest):
+                self.current[rel_path] = digest
+                return
+
+        if target_dir not in self._created_dirs:
+            target_dir.mkdir(parents=True, exist_ok=True)
+            self._created_dirs.add(target_dir)
+        _atomic_write_bytes(file_path, content)
+        self.current[rel_path] = digest
+        self._written.add(rel_path)
+
+    def _matches_previous(self, rel_path: str, file_path: Path, digest: str) -> bool:
+        previous_digest = self.previous.get(rel_path)
+        if previous_digest is not None:
+            return previous_digest == digest
+        # No manifest entry (first run or manifest lost): compare with the bytes on disk.
+        try:
+            return hashlib.sha256(file_path.read_bytes()).hexdigest() == digest
+        except OSError:
+            return False
+
+    def finish(
+        self,
+        *,
+        clean: bool,
+        incremental: bool,
+        preserve_resource_types: Collection[str] = (),
+    ) -> ExportSummary:
+        summary = ExportSummary(
+            manifest_incomplete=not self.has_previous_manifest or self._found_unlisted
+        )
+        preserved_types = {resource_type.lower() for resource_type in preserve_resource_types}
+        preserved_prefixes = tuple(
+            "/".join(derive_folder_names(resource_type)) + "/" for resource_type in preserved_types
+        )
+        changes: dict[str, str] = {}
+        for rel_path in self.current:
+            if rel_path not in self._written:
+                summary.unchanged += 1
+            elif self._existed_before[rel_path]:
+                summary.updated += 1
+                changes[rel_path] = "updated"
+            else:
+                summary.created += 1
+                changes[rel_path] = "created"
+
+        if clean:
+            # Files of preserved resource types (whose export failed this run) are kept
+            # as they were instead of being pruned as stale.
+            kept = {
+                rel_path: digest
+                for rel_path, digest in self.previous.items()
+                if preserved_prefixes
+                and rel_path not in self.current
+                and rel_path.startswith(preserved_prefixes)
+            }
+            if self.has_previous_manifest:
+                removed_paths = _prune_from_manifest(
+                    output_base=self.output_base,
+                    stale_paths=self.previous.keys() - self.current.keys() - kept.keys(),
+                )
+            else:
+                removed_paths = _prune_stale_yaml_files(
+                    output_base=self.output_base,
+                    written_files=[self.output_base / rel_path for rel_path in self.current],
+                    keep_prefixes=preserved_prefixes,
+                )
+            summary.removed = len(removed_paths)
+            changes.update((rel_path, "removed") for rel_path in removed_paths)
+            manifest_files = {**kept, **self.current}
+        else:
+            manifest_files = {**self.previous, **self.current}
+
+        if incremental:
+            changed_types = {
+                group["resourceType"]
+                for key, group in self.current_groups.items()
+                if key in self._rendered_groups
+            }
+            kept_groups = {
+                key: group
+                for key, group in self.previous_groups.items()
+                if key not in self.current_groups
+                and isinstance(group, dict)
+                and str(group.get("resourceType", key)).lower() in preserved_types
+            }
+            changed_types.update(
+                str(group.get("resourceType", key))
+                for key, group in self.previous_groups.items()
+                if key not in self.current_groups
+                and key not in kept_groups
+                and isinstance(group, dict)
+            )
+            summary.changed_resource_types = sorted(changed_types)
+            summary.skipped_resource_types = len(self.current_groups) - len(self._rendered_groups)
+        summary.changed_paths = dict(sorted(changes.items()))
+        folders = Counter("/".join(rel_path.split("/")[:2]) for rel_path in manifest_files)
+        summary.instance_counts = dict(sorted(folders.items()))
+        _record_export_metrics(self.output_base, summary)
+
+        if manifest_files or self.previous:
+            self.output_base.mkdir(parents=True, exist_ok=True)
+            manifest: dict[str, Any] = {
+                "version": _MANIFEST_VERSION,
+                "files": dict(sorted(manifest_files.items())),
+            }
+            # Fingerprints are only trustworthy when this run was incremental: a full
+            # run does not track which group produced which file.
+            if incremental:
+                groups = (
+                    {**kept_groups, **self.current_groups}
+                    if clean
+                    else {**self.previous_groups, **self.current_groups}
+                )
+                manifest["resourceTypes"] = dict(sorted(groups.items()))
+            manifest_path = self.output_base / MANIFEST_FILE_NAME
+            content = (json.dumps(manifest, indent=2) + "\n").encode("utf-8")
+            # An unchanged run leaves the manifest alone too, so it writes nothing at all.
+            if not manifest_path.is_file() or manifest_path.read_bytes() != content:
+                _atomic_write_bytes(manifest_path, content)
+        return summary
+
+
+def _record_export_metrics(output_base: Path, summary: ExportSummary) -> None:
+    for change in ("created", "updated", "unchanged", "removed"):
+        _EXPORT_FILE_CHANGES.inc(getattr(summary, change), change=change)
+    output = output_base.as_posix()
+    _EXPORT_INSTANCES.remove_matching(output=output)
+    for resource_type, count in summary.instance_counts.items():
+        _EXPORT_INSTANCES.set(count, output=output, resource_type=resource_type)
+
+
 def parse_snapshot_to_yaml(
     snapshot_payload: dict[str, Any],
     output_root: Path | str = Path("tenant_state"),
     clean: bool = False,
-) -> list[Path]:
-    output_base = Path(output_root)
+    workers: int = 1,
+    incremental: bool = False,
+) -> ExportSummary:
     resources = snapshot_payload.get("resources", [])
     if not isinstance(resources, list):
         raise SnapshotParserError("Snapshot JSON does not contain a list at 'resources'")
+    return write_resources_to_yaml(
+        resources,
+        output_root=output_root,
+        clean=clean,
+        workers=workers,
+        incremental=incremental,
+    )
 
-    written_files: list[Path] = []
-    if not resources:
-        LOGGER.warning("Snapshot payload contains no resources")
-        if clean:
-            _prune_stale_yaml_files(output_base=output_base, written_files=written_files)
-        return written_files
 
+_RenderedResource = tuple[str, str, list[tuple[str, bytes]]]
+
+
+def _render_resource(resource: dict[str, Any]) -> _RenderedResource | None:
+    """Render one resource entry to (workload, folder, [(file name, YAML bytes)])."""
+    resource_type = str(resource.get("resourceType", "unknown.unknown"))
+    resource_level_name = normalize_resource_display_name(
+        str(resource.get("displayName", "")).strip() or None
+    )
+    workload, resource_folder = derive_folder_names(resource_type)
+
+    instances = extract_instances(resource)
+    if not instances:
+        LOGGER.warning("No parseable instances for resourceType=%s", resource_type)
+        return None
+
+    files: list[tuple[str, bytes]] = []
+    for idx, (instance, suggested_name) in enumerate(instances, start=1):
+        default_name = f"item_{idx:03d}"
+        raw_name = _resolve_instance_name(
+            instance=instance,
+            suggested_name=suggested_name,
+            resource_name=resource_level_name,
+            default_name=default_name,
+        )
+        files.append((f"{sanitize_filename(raw_name)}.yaml", _render_yaml(instance)))
+    return workload, resource_folder, files
+
+
+def _render_resource_batch(resources: list[dict[str, Any]]) -> list[_RenderedResource | None]:
+    return [_render_resource(resource) for resource in resources]
+
+
+def iter_resource_entries(resources: Iterable[Any]) -> Iterator[dict[str, Any]]:
+    """Yield the dict entries of ``resources``, logging and skipping anything else."""
     for resource in resources:
         if not isinstance(resource, dict):
             LOGGER.warning("Skipping non-object resource entry")
             continue
+        yield resource
 
+
+def _iter_resource_batches(
+    resources: Iterable[Any],
+    max_entries: int,
+) -> Iterator[list[dict[str, Any]]]:
+    """Group consecutive entries of the same resourceType into bounded batches."""
+    batch: list[dict[str, Any]] = []
+    batch_type: str | None = None
+    for resource in iter_resource_entries(resources):
         resource_type = str(resource.get("resourceType", "unknown.unknown"))
-        resource_level_name = _normalize_resource_display_name(
-            str(resource.get("displayName", "")).strip() or None
-        )
-        workload, resource_folder = _derive_folder_names(resource_type)
-        target_dir = output_base / workload / resource_folder
-        target_dir.mkdir(parents=True, exist_ok=True)
+        if batch and (resource_type != batch_type or len(batch) >= max_entries):
+            yield batch
+            batch = []
+        batch.append(resource)
+        batch_type = resource_type
+    if batch:
+        yield batch
 
-        instances = _extract_instances(resource)
-        if not instances:
-            LOGGER.warning("No parseable instances for resourceType=%s", resource_type)
-            continue
 
-        for idx, (instance, suggested_name) in enumerate(instances, start=1):
-            default_name = f"item_{idx:03d}"
-            raw_name = _resolve_instance_name(
-                instance=instance,
-                suggested_name=suggested_name,
-                resource_name=resource_level_name,
-                default_name=default_name,
-            )
-            file_name = f"{sanitize_filename(raw_name)}.yaml"
-            file_path = target_dir / file_name
-
-            with file_path.open("w", encoding="utf-8") as handle:
-                yaml.safe_dump(
-                    instance,
-                    handle,
-                    sort_keys=True,
-                    indent=2,
-                    default_flow_style=False,
-                    allow_unicode=False,
-                )
+def _iter_resource_groups(
+    resources: Iterable[Any],
+) -> Iterator[tuple[str, str, list[dict[str, Any]]]]:
+    """Yield (group key, resourceType, entries) for each run of same-type entries.
 
-            written_files.append(file_path)
+    A resource type that appears in several separate runs gets ``#<n>`` suffixed keys,
+    which keeps keys stable as long as the service keeps its ordering.
+    """
+    occurrences: dict[str, int] = {}
+    for batch in _iter_resource_batches(resources, max_entries=sys.maxsize):
+        resource_type = str(batch[0].get("resourceType", "unknown.unknown"))
+        occurrence = occurrences.get(resource_type, 0)
+        occurrences[resource_type] = occurrence + 1
+        group_key = resource_type if not occurrence else f"{resource_type}#{occurrence}"
+        yield group_key, resource_type, batch
 
-    if clean:
-        _prune_stale_yaml_files(output_base=output_base, written_files=written_files)
 
-    LOGGER.info("Wrote %d YAML resource files under %s", len(written_files), output_base)
-    return written_files
+_WorkItem = tuple[str | None, list[dict[str, Any]]]
+
+
+def _iter_work_items(
+    resources: Iterable[Any],
+    *,
+    writer: _YamlTreeWriter,
+    incremental: bool,
+    batch_size: int,
+) -> Iterator[_WorkItem]:
+    if not incremental:
+        for batch in _iter_resource_batches(resources, max_entries=batch_size):
+            yield None, batch
+        return
+
+    for group_key, resource_type, entries in _iter_resource_groups(resources):
+        fingerprint = _fingerprint_resources(entries)
+        if writer.reuse_group(group_key, resource_type, fingerprint):
+            LOGGER.debug("Skipping unchanged resource type %s", group_key)
+            continue
+        writer.start_group(group_key, resource_type, fingerprint)
+        for idx in range(0, len(entries), _MAX_ENTRIES_PER_TASK):
+            yield group_key, entries[idx : idx + _MAX_ENTRIES_PER_TASK]
+
+
+def _render_work_items(
+    work_items: Iterable[_WorkItem],
+    workers: int,
+) -> Iterator[tuple[str | None, list[_RenderedResource | None]]]:
+    """Render work items, on a process pool when ``workers`` > 1, in input order.
+
+    Results are consumed in submission order so the parent applies writes in the same
+    sequence as a serial run, keeping same-name collisions deterministic. At most a few
+    batches per worker are in flight, so streamed input stays bounded in memory.
+    """
+    if workers <= 1:
+        for group_key, batch in work_items:
+            yield group_key, _render_resource_batch(batch)
+        return
+
+    max_pending = workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: deque[tuple[str | None, Future[list[_RenderedResource | None]]]] = deque()
+        for group_key, batch in work_items:
+            pending.append((group_key, executor.submit(_render_resource_batch, batch)))
+            if len(pending) >= max_pending:
+                group_key, future = pending.popleft()
+                yield group_key, future.result()
+        while pending:
+            group_key, future = pending.popleft()
+            yield group_key, future.result()
+
+
+def write_resources_to_yaml(
+    resources: Iterable[Any],
+    output_root: Path | str = Path("tenant_state"),
+    clean: bool = False,
+    workers: int = 1,
+    incremental: bool = False,
+    preserve_resource_types: Collection[str] = (),
+) -> ExportSummary:
+    """Write each resource entry's instances to YAML as the entries arrive.
+
+    ``resources`` may be any iterable, including the lazy stream returned by
+    stream_snapshot_resources, so entries are never all held in memory at once.
+    Files whose content did not change since the last run are left untouched.
+
+    With ``workers`` > 1, YAML serialization runs on a process pool per batch of
+    same-type entries; the parent process compares hashes and writes files in input
+    order, so the output is byte-identical to a serial run.
+
+    With ``incremental``, each run of same-type entries is fingerprinted (canonical
+    JSON sha256) and skipped entirely when it matches the previous run; memory is then
+    bounded by the largest resource-type group instead of the largest entry.
+
+    Files of ``preserve_resource_types`` that are missing from ``resources`` are not
+    pruned by ``clean``; use it for types whose export failed in this snapshot.
+    """
+    started = time.perf_counter()
+    output_base = Path(output_root)
+    writer = _YamlTreeWriter(output_base)
+    resource_count = 0
+    write_seconds: Counter[str] = Counter()
+
+    def _counted(items: Iterable[Any]) -> Iterator[Any]:
+        nonlocal resource_count
+        for item in items:
+            resource_count += 1
+            yield item
+
+    work_items = _iter_work_items(
+        _counted(resources),
+        writer=writer,
+        incremental=incremental,
+        batch_size=_MAX_ENTRIES_PER_TASK if workers > 1 else 1,
+    )
+    for group_key, rendered_batch in _render_work_items(work_items, workers):
+        for rendered in rendered_batch:
+            if rendered is None:
+                continue
+            workload, resource_folder, files = rendered
+            target_dir = output_base / workload / resource_folder
+            write_started = time.perf_counter()
+            for file_name, content in files:
+                writer.write(target_dir, file_name, content, group_key=group_key)
+            write_seconds[f"{workload}/{resource_folder}"] += time.perf_counter() - write_started
+
+    if not resource_count:
+        LOGGER.warning("Snapshot payload contains no resources")
+
+    summary = writer.finish(
+        clean=clean,
+        incremental=incremental,
+        preserve_resource_types=preserve_resource_types,
+    )
+    for resource_type, seconds in write_seconds.items():
+        _YAML_WRITE_SECONDS.inc(seconds, resource_type=resource_type)
+    _EXPORT_SECONDS.observe(time.perf_counter() - started)
+    LOGGER.info(
+        "YAML export under %s: %d created, %d updated, %d unchanged, %d removed",
+        output_base,
+        summary.created,
+        summary.updated,
+        summary.unchanged,
+        summary.removed,
+    )
+    if incremental:
+        LOGGER.info(
+            "Resource types changed: %d (%s); skipped unchanged: %d",
+            len(summary.changed_resource_types),
+            ", ".join(summary.changed_resource_types) or "none",
+            summary.skipped_resource_types,
+        )
+    return summary
 
 
 def download_and_parse_snapshot(
     resource_location: str,
     output_root: Path | str = Path("tenant_state"),
     clean: bool = False,
-) -> list[Path]:
-    payload = download_snapshot_json(resource_location)
-    return parse_snapshot_to_yaml(payload, output_root=output_root, clean=clean)
+    session: GraphSession | None = None,
+    stream: bool = False,
+    workers: int = 1,
+    incremental: bool = False,
+) -> ExportSummary:
+    if stream:
+        resources = stream_snapshot_resources(resource_location, session=session)
+        return write_resources_to_yaml(
+            resources,
+            output_root=output_root,
+            clean=clean,
+            workers=workers,
+            incremental=incremental,
+        )
+    payload = download_snapshot_json(resource_location, session=session)
+    return parse_snapshot_to_yaml(
+        payload,
+        output_root=output_root,
+        clean=clean,
+        workers=workers,
+        incremental=incremental,
+    )
+
+
+def _prune_from_manifest(*, output_base: Path, stale_paths: Iterable[str]) -> list[str]:
+    """Remove files listed in the previous manifest but not written in this run.
+
+    Only the difference between the two path sets is touched, and only the parents of
+    removed files are checked for emptiness, so a run with no removals costs no
+    filesystem calls at all. Returns the removed paths relative to ``output_base``.
+    """
+    removed: list[str] = []
+    parents: set[Path] = set()
+    for rel_path in sorted(stale_paths):
+        stale_file = output_base / rel_path
+        try:
+            stale_file.unlink()
+        except FileNotFoundError:
+            continue
+        removed.append(rel_path)
+        parents.add(stale_file.parent)
+        LOGGER.info("Removed stale file: %s", stale_file)
+
+    # Deepest first, so a directory emptied by its child's removal is removed as well.
+    for directory in sorted(parents, key=lambda path: len(path.parts), reverse=True):
+        while directory != output_base and output_base in directory.parents:
+            try:
+                directory.rmdir()
+            except OSError:
+                break
+            directory = directory.parent
+
+    if removed:
+        LOGGER.info("Removed %d stale YAML files under %s", len(removed), output_base)
+    return removed
 
 
-def _prune_stale_yaml_files(*, output_base: Path, written_files: list[Path]) -> None:
+def _prune_stale_yaml_files(
+    *,
+    output_base: Path,
+    written_files: list[Path],
+    keep_prefixes: tuple[str, ...] = (),
+) -> list[str]:
+    """Full-scan pruning, used when no usable manifest from a previous run exists."""
     if not output_base.exists():
-        return
+        return []
 
-    written_resolved = {path.resolve() for path in written_files}
-    removed_count = 0
+    written_relative = {path.relative_to(output_base).as_posix() for path in written_files}
+    removed: list[str] = []
 
     for existing in output_base.rglob("*.yaml"):
-        if existing.resolve() in written_resolved:
+        rel_path = existing.relative_to(output_base).as_posix()
+        if rel_path in written_relative or (keep_prefixes and rel_path.startswith(keep_prefixes)):
             continue
         existing.unlink()
-        removed_count += 1
+        removed.append(rel_path)
         LOGGER.info("Removed stale file: %s", existing)
 
     # Remove empty directories from deepest to shallowest so parents can be removed
@@ -222,5 +999,6 @@ def _prune_stale_yaml_files(*, output_base: Path, written_files: list[Path]) ->
         if not any(directory.iterdir()):
             directory.rmdir()
 
-    if removed_count:
-        LOGGER.info("Removed %d stale YAML files under %s", removed_count, output_base)
+    if removed:
+        LOGGER.info("Removed %d stale YAML files under %s", len(removed), output_base)
+    return removed
@@ -0,0 +1,397 @@
+import contextlib
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+import requests
+
+from utcm_exporter.git_history import CommitResult, commit_export
+from utcm_exporter.graph_session import GraphSession, get_graph_session
+from utcm_exporter.journal import FollowUpJob, JournalEntry, PipelineJournal, journal_key
+from utcm_exporter.metrics import REGISTRY
+from utcm_exporter.parser import (
+    ExportSummary,
+    download_snapshot_file,
+    overlay_snapshot_resources,
+    resource_output_folder,
+    stream_snapshot_file_resources,
+    stream_snapshot_resources,
+    write_resources_to_yaml,
+)
+from utcm_exporter.polling import PollHistory
+from utcm_exporter.resources_catalog import ResourceStats, UnsupportedResourceCache
+from utcm_exporter.utcm_client import (
+    SnapshotJobFailedError,
+    submit_snapshot_job_result,
+    wait_for_snapshot_job_result,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+_DEFAULT_DOWNLOAD_DIR = Path(".utcm_state/downloads")
+
+_FOLLOW_UP_JOBS = REGISTRY.counter(
+    "utcm_snapshot_follow_up_jobs_total",
+    "Follow-up snapshot jobs for resource types a partial job failed, by final status.",
+    ("status",),
+)
+
+
+@dataclass(frozen=True)
+class PipelineResult:
+    """Outcome of one snapshot -> YAML (-> git) run."""
+
+    job_id: str
+    resource_location: str
+    summary: ExportSummary
+    commit: CommitResult | None = None
+    failed_resources: tuple[str, ...] = ()
+    follow_up_job_ids: tuple[str, ...] = ()
+
+
+def _summary_from_changes(entry: JournalEntry) -> ExportSummary:
+    # Rebuilt when resuming after the parse phase; unchanged files were not recorded.
+    changed_paths = entry.changed_paths
+    counts = Counter(changed_paths.values())
+    return ExportSummary(
+        created=counts["created"],
+        updated=counts["updated"],
+        removed=counts["removed"],
+        changed_paths=dict(changed_paths),
+        manifest_incomplete=entry.manifest_incomplete,
+    )
+
+
+def _job_is_gone(exc: Exception) -> bool:
+    """Whether a wait error means the job will never finish, rather than a failed poll."""
+    if isinstance(exc, SnapshotJobFailedError):
+        return True
+    response = getattr(exc, "response", None)
+    return response is not None and response.status_code == 404
+
+
+def _outstanding_failures(entry: JournalEntry) -> list[str]:
+    """Resource types still missing after the primary job and its finished follow-ups."""
+    finished = [follow_up for follow_up in entry.follow_ups if follow_up.status != "pending"]
+    if not finished:
+        return list(entry.failed_resources)
+    last = finished[-1]
+    if last.resource_location is None:
+        return list(last.resources)
+    return list(last.failed_resources)
+
+
+def _run_follow_up_jobs(
+    *,
+    entry: JournalEntry,
+    key: str,
+    journal: PipelineJournal | None,
+    max_attempts: int,
+    display_name: str,
+    description: str,
+    poll_interval_seconds: float,
+    max_poll_interval_seconds: float,
+    timeout_seconds: int,
+    poll_history: PollHistory | None,
+    stop_event: threading.Event | None,
+    unsupported_cache: UnsupportedResourceCache | None,
+    session: GraphSession,
+) -> None:
+    """Re-export failed resource types in new jobs until they succeed or attempts run out."""
+    while True:
+        pending = entry.follow_ups[-1] if entry.follow_ups else None
+        if pending is None or pending.status != "pending":
+            outstanding = _outstanding_failures(entry)
+            if not outstanding or len(entry.follow_ups) >= max_attempts:
+                return
+            LOGGER.info(
+                "Retrying %d failed resource type(s) in follow-up job %d/%d: %s",
+                len(outstanding),
+                len(entry.follow_ups) + 1,
+                max_attempts,
+                ", ".join(outstanding),
+            )
+            submitted = submit_snapshot_job_result(
+                display_name=f"{display_name} retry",
+                description=description,
+                resources=outstanding,
+                reuse_active_job=False,
+                unsupported_cache=unsupported_cache,
+                session=session,
+            )
+            # Types the cache left out are not in the follow-up's snapshot, so the
+            # follow-up must not claim them when its layer replaces entries.
+            pending = FollowUpJob(job_id=submitted.job_id, resources=list(submitted.resources))
+            entry.follow_ups.append(pending)
+            if journal:
+                journal.save(key, entry)
+
+        try:
+            result = wait_for_snapshot_job_result(
+                pending.job_id,
+                poll_interval_seconds=poll_interval_seconds,
+                max_poll_interval_seconds=max_poll_interval_seconds,
+                timeout_seconds=timeout_seconds,
+                resources=pending.resources,
+                poll_history=poll_history,
+                stop_event=stop_event,
+                session=session,
+            )
+        except (SnapshotJobFailedError, requests.HTTPError) as exc:
+            if not _job_is_gone(exc):
+                # The job may still be running; a rerun resumes polling it.
+                raise
+            LOGGER.warning("Follow-up snapshot job %s failed: %s", pending.job_id, exc)
+            pending.status = "failed"
+        else:
+            pending.status = result.status
+            pending.resource_location = result.resource_location
+            pending.failed_resources = list(result.failed_resources)
+        _FOLLOW_UP_JOBS.inc(status=pending.status)
+        if journal:
+            journal.save(key, entry)
+
+
+def _snapshot_layers(
+    entry: JournalEntry,
+    open_snapshot: Callable[[str, str | None], Iterable[Any]],
+) -> list[tuple[Iterable[Any], set[str] | None]]:
+    """Primary snapshot first, then each follow-up overriding the types it recovered.
+
+    A final empty layer owns the types that never succeeded, so their partial entries
+    are dropped and the previous export of them is preserved instead.
+    """
+    layers: list[tuple[Iterable[Any], set[str] | None]] = [
+        (open_snapshot(entry.resource_location or "", entry.download_path), None)
+    ]
+    for follow_up in entry.follow_ups:
+        if follow_up.resource_location is None:
+            continue
+        recovered = set(follow_up.resources) - set(follow_up.failed_resources)
+        layers.append(
+            (open_snapshot(follow_up.resource_location, follow_up.download_path), recovered)
+        )
+    unresolved = set(_outstanding_failures(entry))
+    if unresolved:
+        layers.append(([], unresolved))
+    return layers
+
+
+def run_snapshot_pipeline(
+    *,
+    resources: list[str],
+    output_root: Path | str,
+    display_name: str = "GitBackup",
+    description: str = "Automated Backup",
+    clean: bool = True,
+    incremental: bool = False,
+    workers: int = 1,
+    git_commit: bool = False,
+    git_push: bool = False,
+    poll_interval_seconds: float = 5,
+    max_poll_interval_seconds: float = 60,
+    timeout_seconds: int = 7200,
+    poll_history: PollHistory | None = None,
+    journal: PipelineJournal | None = None,
+    download_dir: Path | str = _DEFAULT_DOWNLOAD_DIR,
+    stop_event: threading.Event | None = None,
+    commit_lock: contextlib.AbstractContextManager[Any] | None = None,
+    partial_retries: int = 2,
+    unsupported_cache: UnsupportedResourceCache | None = None,
+    resource_stats: ResourceStats | None = None,
+    session: GraphSession | None = None,
+) -> PipelineResult:
+    """Create a snapshot job, wait for it, write the YAML tree and optionally commit.
+
+    The job is submitted without reusing other active jobs, so a 409 surfaces as
+    SnapshotJobConflictError rather than silently exporting another job's resources.
+
+    With a ``journal``, each phase (created, polling, downloaded, parsed) is recorded
+    and a rerun for the same resources and output folder picks up where the last one
+    stopped: it resumes polling the existing job, or re-parses the payload already
+    downloaded to ``download_dir``. Committed runs are dropped from the journal.
+    Without one, the snapshot is streamed straight into the parser.
+
+    Concurrent runs committing to the same repository should share ``commit_lock`` so
+    their index updates do not race.
+
+    When the job is ``partiallySuccessful``, up to ``partial_retries`` follow-up jobs
+    re-export only the resource types named in its errorDetails, and their results
+    replace the first job's entries for those types before parsing. Types that still
+    fail keep their previously exported files instead of being pruned.
+
+    With ``resource_stats``, the job's duration and the exported instance count of
+    each resource type are recorded for cost-based job planning.
+    """
+    graph = session or get_graph_session()
+    key = journal_key(resources, output_root)
+    entry = journal.get(key) if journal else None
+    job_duration: float | None = None
+    if entry is not None:
+        LOGGER.info("Resuming snapshot job %s after phase '%s'", entry.job_id, entry.phase)
+    else:
+        submitted = submit_snapshot_job_result(
+            display_name=display_name,
+            description=description,
+            resources=resources,
+            reuse_active_job=False,
+            unsupported_cache=unsupported_cache,
+            session=graph,
+        )
+        entry = JournalEntry(
+            job_id=submitted.job_id,
+            resources=list(resources),
+            output_root=str(output_root),
+            submitted_resources=list(submitted.resources),
+        )
+        if journal:
+            journal.save(key, entry)
+
+    if entry.phase in ("created", "polling"):
+        if journal and entry.phase == "created":
+            entry.phase = "polling"
+            journal.save(key, entry)
+        try:
+            job = wait_for_snapshot_job_result(
+                entry.job_id,
+                poll_interval_seconds=poll_interval_seconds,
+                max_poll_interval_seconds=max_poll_interval_seconds,
+                timeout_seconds=timeout_seconds,
+                resources=resources,
+                poll_history=poll_history,
+                stop_event=stop_event,
+                session=graph,
+            )
+        except (SnapshotJobFailedError, requests.HTTPError) as exc:
+            # Only a failed or vanished job is forgotten. After any other poll error
+            # (5xx, 401, 403) the job may still be running and holding the tenant's job
+            # slot, so the entry stays and the next run resumes polling it.
+            if journal and _job_is_gone(exc):
+                journal.clear(key)
+            raise
+        entry.resource_location = job.resource_location
+        entry.failed_resources = list(job.failed_resources)
+        job_duration = job.duration_seconds
+        if partial_retries > 0 and _outstanding_failures(entry):
+            _run_follow_up_jobs(
+                entry=entry,
+                key=key,
+                journal=journal,
+                max_attempts=partial_retries,
+                display_name=display_name,
+                description=description,
+                poll_interval_seconds=poll_interval_seconds,
+                max_poll_interval_seconds=max_poll_interval_seconds,
+                timeout_seconds=timeout_seconds,
+                poll_history=poll_history,
+                stop_event=stop_event,
+                unsupported_cache=unsupported_cache,
+                session=graph,
+            )
+
+    unresolved = _outstanding_failures(entry)
+    if unresolved:
+        LOGGER.warning(
+            "Keeping the previous export of %d resource type(s) that failed: %s",
+            len(unresolved),
+            ", ".join(unresolved),
+        )
+
+    if journal is None:
+        summary = write_resources_to_yaml(
+            overlay_snapshot_resources(
+                _snapshot_layers(
+                    entry,
+                    lambda location, _: stream_snapshot_resources(location, session=graph),
+                )
+            ),
+            output_root=output_root,
+            clean=clean,
+            workers=workers,
+            incremental=incremental,
+            preserve_resource_types=unresolved,
+        )
+    else:
+        if entry.phase == "polling":
+            entry.download_path = str(
+                download_snapshot_file(
+                    entry.resource_location,
+                    Path(download_dir) / f"{entry.job_id}.json.gz",
+                    session=graph,
+                )
+            )
+            for follow_up in entry.follow_ups:
+                if follow_up.resource_location:
+                    follow_up.download_path = str(
+                        download_snapshot_file(
+                            follow_up.resource_location,
+                            Path(download_dir) / f"{follow_up.job_id}.json.gz",
+                            session=graph,
+                        )
+                    )
+            entry.phase = "downloaded"
+            journal.save(key, entry)
+
+        if entry.phase == "downloaded":
+            summary = write_resources_to_yaml(
+                overlay_snapshot_resources(
+                    _snapshot_layers(
+                        entry,
+                        lambda _, path: stream_snapshot_file_resources(path or ""),
+                    )
+                ),
+                output_root=output_root,
+                clean=clean,
+                workers=workers,
+                incremental=incremental,
+                preserve_resource_types=unresolved,
+            )
+            entry.changed_paths = summary.changed_paths
+            entry.manifest_incomplete = summary.manifest_incomplete
+            entry.phase = "parsed"
+            journal.save(key, entry)
+        else:
+            summary = _summary_from_changes(entry)
+
+    if resource_stats is not None and summary.instance_counts:
+        # Types the unsupported cache kept out of the job were never observed.
+        submitted = entry.submitted_resources or entry.resources
+        observed = [resource for resource in submitted if resource not in unresolved]
+        resource_stats.record_run(
+            observed,
+            duration_seconds=job_duration,
+            instance_counts={
+                resource.lower(): summary.instance_counts.get(resource_output_folder(resource), 0)
+                for resource in observed
+            },
+        )
+
+    commit = None
+    if git_commit:
+        with commit_lock or contextlib.nullcontext():
+            commit = commit_export(
+                output_root=output_root,
+                changed_paths=summary.changed_paths,
+                push=git_push,
+                stage_untracked=summary.manifest_incomplete,
+            )
+    if journal:
+        # Fully committed runs leave the journal, so the next run starts a new job.
+        journal.clear(key)
+        download_paths = [entry.download_path]
+        download_paths.extend(follow_up.download_path for follow_up in entry.follow_ups)
+        for download_path in download_paths:
+            if download_path:
+                Path(download_path).unlink(missing_ok=True)
+
+    return PipelineResult(
+        job_id=entry.job_id,
+        resource_location=entry.resource_location or "",
+        summary=summary,
+        commit=commit,
+        failed_resources=tuple(unresolved),
+        follow_up_job_ids=tuple(follow_up.job_id for follow_up in entry.follow_ups),
+    )
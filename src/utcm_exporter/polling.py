@@ -0,0 +1,149 @@
+import hashlib
+import json
+import logging
+import os
+import statistics
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+LOGGER = logging.getLogger(__name__)
+
+_HISTORY_VERSION = 1
+_HISTORY_MAX_SAMPLES = 20
+# Poll quickly again once a job is this close to its typical duration.
+_EXPECTED_DURATION_WINDOW = 0.8
+
+
+def resource_set_key(resources: list[str]) -> str:
+    """Stable key for a resource list, independent of order and case."""
+    normalized = sorted({item.strip().lower() for item in resources if item.strip()})
+    return hashlib.sha256("\n".join(normalized).encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class PollMetrics:
+    """Structured telemetry for one snapshot job wait."""
+
+    job_id: str
+    poll_count: int = 0
+    final_status: str = "unknown"
+    time_to_terminal_seconds: float | None = None
+    status_dwell_seconds: dict[str, float] = field(default_factory=dict)
+    _last_status: str | None = field(default=None, repr=False)
+    _last_elapsed: float = field(default=0.0, repr=False)
+
+    def record_poll(self, status: str, elapsed_seconds: float) -> None:
+        self.poll_count += 1
+        if self._last_status is not None:
+            dwell = self.status_dwell_seconds.get(self._last_status, 0.0)
+            self.status_dwell_seconds[self._last_status] = dwell + (
+                elapsed_seconds - self._last_elapsed
+            )
+        self._last_status = status
+        self._last_elapsed = elapsed_seconds
+        self.final_status = status
+
+    def finish(self, elapsed_seconds: float) -> None:
+        self.time_to_terminal_seconds = elapsed_seconds
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "jobId": self.job_id,
+            "pollCount": self.poll_count,
+            "finalStatus": self.final_status,
+            "timeToTerminalSeconds": (
+                round(self.time_to_terminal_seconds, 3)
+                if self.time_to_terminal_seconds is not None
+                else None
+            ),
+            "statusDwellSeconds": {
+                status: round(seconds, 3)
+                for status, seconds in sorted(self.status_dwell_seconds.items())
+            },
+        }
+
+
+class PollHistory:
+    """Local record of observed snapshot durations per resource set.
+
+    Stored as JSON so typical job durations survive between cron runs and can seed
+    the adaptive poll schedule of the next run.
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    def _load(self) -> dict[str, Any]:
+        if not self.path.exists():
+            return {"version": _HISTORY_VERSION, "resourceSets": {}}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as exc:
+            LOGGER.warning("Ignoring unreadable poll history %s: %s", self.path, exc)
+            return {"version": _HISTORY_VERSION, "resourceSets": {}}
+        if not isinstance(data, dict) or not isinstance(data.get("resourceSets"), dict):
+            return {"version": _HISTORY_VERSION, "resourceSets": {}}
+        return data
+
+    def expected_duration(self, key: str) -> float | None:
+        with self._lock:
+            entry = self._data["resourceSets"].get(key)
+            samples = entry.get("durationsSeconds") if isinstance(entry, dict) else None
+            if not samples:
+                return None
+            return float(statistics.median(samples))
+
+    def record(self, key: str, duration_seconds: float, *, resource_count: int | None = None) -> None:
+        with self._lock:
+            entry = self._data["resourceSets"].setdefault(key, {"durationsSeconds": []})
+            samples = [*entry.get("durationsSeconds", []), round(duration_seconds, 3)]
+            entry["durationsSeconds"] = samples[-_HISTORY_MAX_SAMPLES:]
+            if resource_count is not None:
+                entry["resourceCount"] = resource_count
+            self._save()
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        tmp_path.write_text(json.dumps(self._data, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+class AdaptivePollSchedule:
+    """Poll delays that start fast and grow exponentially up to a cap.
+
+    Jobs that are still queued (``notStarted``) back off one step faster. When a typical
+    duration is known from history, the schedule waits out most of it in long sleeps
+    and then drops back to fast polls around the expected completion time.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial_interval_seconds: float = 5,
+        max_interval_seconds: float = 60,
+        multiplier: float = 1.5,
+        expected_duration_seconds: float | None = None,
+    ) -> None:
+        self.initial_interval_seconds = max(0.0, initial_interval_seconds)
+        self.max_interval_seconds = max(self.initial_interval_seconds, max_interval_seconds)
+        self.multiplier = max(1.0, multiplier)
+        self.expected_duration_seconds = expected_duration_seconds
+        self._step = 0
+
+    def next_delay(self, *, elapsed_seconds: float, status: str) -> float:
+        if self.expected_duration_seconds:
+            fast_window_start = self.expected_duration_seconds * _EXPECTED_DURATION_WINDOW
+            if elapsed_seconds < fast_window_start:
+                return min(self.max_interval_seconds, fast_window_start - elapsed_seconds)
+            if elapsed_seconds <= self.expected_duration_seconds:
+                self._step = 0
+                return self.initial_interval_seconds
+
+        self._step += 2 if status.lower() == "notstarted" else 1
+        delay = self.initial_interval_seconds * (self.multiplier ** (self._step - 1))
+        return min(self.max_interval_seconds, delay)
@@ -1,10 +1,19 @@
+import contextlib
 import json
 import logging
+import os
+import posixpath
 import re
-from datetime import UTC, datetime
+import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
+from typing import Any, Callable, Iterator
 
-import requests
+from utcm_exporter.graph_session import GraphSession
+from utcm_exporter.locking import file_lock, sidecar_lock_path
 
 LOGGER = logging.getLogger(__name__)
 
@@ -18,16 +27,353 @@ _DEFAULT_DOC_PAGES = [
     "concepts/utcm-teams-resources.md",
 ]
 _INCLUDE_PATTERN = re.compile(r"\[!INCLUDE \[[^\]]+\]\(([^)]+)\)\]")
+_HEADING_PATTERN = re.compile(r"^\s{0,3}#{1,6}\s+(.*)$")
+# Microsoft Graph permission names, e.g. Policy.Read.All or DeviceManagementApps.ReadWrite.All.
+_PERMISSION_PATTERN = re.compile(
+    r"\b[A-Z][A-Za-z]+(?:\.[A-Z][A-Za-z]+)*\.(?:Read|ReadWrite|Write|Manage)(?:\.[A-Z][A-Za-z]+)*\b"
+)
+# Directory and workload admin roles, e.g. Exchange Administrator or Global Reader.
+_ROLE_PATTERN = re.compile(r"\b(?:[A-Z][A-Za-z]*\s){0,3}(?:Administrator|Admin|Reader|Operator)\b")
+_CATALOG_VERSION = 2
+_UNSUPPORTED_CACHE_VERSION = 1
+_DOCS_CACHE_VERSION = 1
+# Bump when _scan_doc_page or _scan_include_page change, so cached scans are not reused.
+_DOCS_SCAN_VERSION = 2
+_STATS_VERSION = 1
+# Weight of the newest sample in the moving averages kept by ResourceStats.
+_STATS_SMOOTHING = 0.3
+_DEFAULT_FETCH_WORKERS = 6
+DEFAULT_UNSUPPORTED_TTL_SECONDS = 7 * 24 * 3600
 
 
 class ResourceCatalogError(RuntimeError):
     """Raised when UTCM resource catalog operations fail."""
 
 
-def _fetch_text(url: str) -> str:
-    response = requests.get(url, timeout=60)
-    response.raise_for_status()
-    return response.text
+def resource_workload(resource: str) -> str:
+    """Workload segment of a ``microsoft.<workload>.<type>`` resource id."""
+    parts = resource.lower().split(".")
+    return parts[1] if len(parts) > 1 else "unknown"
+
+
+@dataclass(frozen=True)
+class ResourceInfo:
+    """Catalog metadata and observed cost of one resource type.
+
+    ``average_duration_seconds`` is the resource's estimated share of snapshot job
+    time (see ResourceStats); None until a run including it has been observed.
+    """
+
+    resource: str
+    workload: str
+    permissions: tuple[str, ...] = ()
+    roles: tuple[str, ...] = ()
+    average_instances: float | None = None
+    average_duration_seconds: float | None = None
+
+
+@dataclass(frozen=True)
+class ResourceCatalog:
+    """Resource types from ``resources.json`` with their metadata, keyed by id."""
+
+    entries: dict[str, ResourceInfo]
+
+    @property
+    def resources(self) -> list[str]:
+        return sorted(self.entries)
+
+    def by_workload(self) -> dict[str, list[str]]:
+        workloads: dict[str, list[str]] = {}
+        for resource in self.resources:
+            workloads.setdefault(self.entries[resource].workload, []).append(resource)
+        return workloads
+
+    def costs(self, resources: list[str] | None = None) -> dict[str, float]:
+        """Estimated job seconds per resource for shard planning.
+
+        Resources without observations (or not in the catalog) get the median of the
+        observed costs, or 1.0 when nothing has been observed yet.
+        """
+        observed = [
+            info.average_duration_seconds
+            for info in self.entries.values()
+            if info.average_duration_seconds is not None
+        ]
+        default = statistics.median(observed) if observed else 1.0
+        costs: dict[str, float] = {}
+        for resource in resources if resources is not None else self.resources:
+            info = self.entries.get(resource)
+            cost = info.average_duration_seconds if info else None
+            costs[resource] = cost if cost is not None else default
+        return costs
+
+    def workload_costs(self) -> dict[str, float]:
+        """Total estimated seconds per workload, to schedule expensive ones separately."""
+        costs = self.costs()
+        totals: dict[str, float] = {}
+        for resource, cost in costs.items():
+            workload = self.entries[resource].workload
+            totals[workload] = totals.get(workload, 0.0) + cost
+        ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+        return {workload: round(total, 3) for workload, total in ranked}
+
+
+class ResourceStats:
+    """Observed per-resource-type cost of past snapshot runs.
+
+    Keeps moving averages of each type's exported instance count and of its share of
+    job duration. UTCM reports no per-type timings, so a job's duration is split
+    across its resource types in proportion to ``1 + average instances``.
+    Each update re-reads the file under a lock file, so processes sharing it (the
+    daemon and run-all, say) do not drop each other's observations.
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock, file_lock(sidecar_lock_path(self.path)):
+            self._entries = self._load()
+            yield
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as exc:
+            LOGGER.warning("Ignoring unreadable resource stats %s: %s", self.path, exc)
+            return {}
+        entries = data.get("resources") if isinstance(data, dict) else None
+        if not isinstance(entries, dict):
+            return {}
+        return {str(key): value for key, value in entries.items() if isinstance(value, dict)}
+
+    def get(self, resource: str) -> dict[str, Any] | None:
+        with self._lock:
+            entry = self._entries.get(resource.strip().lower())
+            return dict(entry) if entry else None
+
+    def record_run(
+        self,
+        resources: list[str],
+        *,
+        duration_seconds: float | None = None,
+        instance_counts: dict[str, int] | None = None,
+    ) -> None:
+        """Fold one job's observations into the averages.
+
+        ``instance_counts`` maps lower-case resource type -> exported instances; types
+        missing from it count as zero. Either argument may be omitted.
+        """
+        if duration_seconds is None and instance_counts is None:
+            return
+        now = datetime.now(UTC).isoformat()
+        with self._locked():
+            weights: dict[str, float] = {}
+            for resource in resources:
+                key = resource.strip().lower()
+                entry = self._entries.setdefault(key, {})
+                if instance_counts is not None:
+                    entry["averageInstances"] = _smooth(
+                        entry.get("averageInstances"),
+                        instance_counts.get(key, 0),
+                    )
+                weights[key] = 1.0 + float(entry.get("averageInstances") or 0.0)
+                entry["lastObservedAt"] = now
+            if duration_seconds is not None and weights:
+                total_weight = sum(weights.values())
+                for key, weight in weights.items():
+                    entry = self._entries[key]
+                    entry["averageDurationSeconds"] = _smooth(
+                        entry.get("averageDurationSeconds"),
+                        duration_seconds * weight / total_weight,
+                    )
+                    entry["durationSamples"] = int(entry.get("durationSamples", 0)) + 1
+            self._save()
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        data = {"version": _STATS_VERSION, "resources": dict(sorted(self._entries.items()))}
+        tmp_path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+def _smooth(previous: Any, sample: float) -> float:
+    if not isinstance(previous, (int, float)):
+        return round(float(sample), 3)
+    return round(previous + _STATS_SMOOTHING * (sample - previous), 3)
+
+
+class UnsupportedResourceCache:
+    """Per-tenant record of resource types that createSnapshot rejected as unsupported.
+
+    Rejected types are left out of the first createSnapshot request, so it does not
+    need a 400 round trip per run to rediscover them. An entry expires ``ttl_seconds``
+    after its last rejection; the type is then requested again (re-probed) and either
+    rejected again, which renews the entry, or accepted, which drops it. Updates re-read
+    the file under a lock file, so processes sharing it keep each other's entries.
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        *,
+        ttl_seconds: float = DEFAULT_UNSUPPORTED_TTL_SECONDS,
+    ) -> None:
+        self.path = Path(path)
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock, file_lock(sidecar_lock_path(self.path)):
+            self._entries = self._load()
+            yield
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as exc:
+            LOGGER.warning("Ignoring unreadable unsupported-resource cache %s: %s", self.path, exc)
+            return {}
+        entries = data.get("resources") if isinstance(data, dict) else None
+        if not isinstance(entries, dict):
+            return {}
+        return {
+            str(resource).lower(): entry
+            for resource, entry in entries.items()
+            if isinstance(entry, dict) and _parse_timestamp(entry.get("lastRejectedAt"))
+        }
+
+    def _is_active(self, entry: dict[str, Any], now: datetime) -> bool:
+        last_rejected = _parse_timestamp(entry.get("lastRejectedAt"))
+        return last_rejected is not None and now - last_rejected < self.ttl
+
+    def rejected(self) -> list[str]:
+        """Resource types currently skipped; expired entries are due for a re-probe."""
+        now = datetime.now(UTC)
+        with self._lock:
+            return sorted(
+                resource for resource, entry in self._entries.items() if self._is_active(entry, now)
+            )
+
+    def filter(self, resources: list[str]) -> tuple[list[str], list[str]]:
+        """Split ``resources`` into (to request, skipped as known unsupported)."""
+        rejected = set(self.rejected())
+        kept = [resource for resource in resources if resource.strip().lower() not in rejected]
+        skipped = [resource for resource in resources if resource.strip().lower() in rejected]
+        if skipped:
+            LOGGER.info(
+                "Skipping %d resource type(s) cached as unsupported until their re-probe: %s",
+                len(skipped),
+                ", ".join(skipped),
+            )
+        return kept, skipped
+
+    def record_rejected(self, resources: list[str]) -> None:
+        now = datetime.now(UTC).isoformat()
+        with self._locked():
+            for resource in resources:
+                key = resource.strip().lower()
+                entry = self._entries.setdefault(key, {"firstRejectedAt": now, "rejections": 0})
+                entry["lastRejectedAt"] = now
+                entry["rejections"] = int(entry.get("rejections", 0)) + 1
+            self._save()
+
+    def record_accepted(self, resources: list[str]) -> None:
+        """Drop entries for resource types that createSnapshot accepted."""
+        with self._locked():
+            accepted = [
+                key for key in (resource.strip().lower() for resource in resources)
+                if key in self._entries
+            ]
+            if not accepted:
+                return
+            for key in accepted:
+                del self._entries[key]
+            LOGGER.info(
+                "Resource type(s) accepted again after re-probe: %s",
+                ", ".join(sorted(accepted)),
+            )
+            self._save()
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        data = {
+            "version": _UNSUPPORTED_CACHE_VERSION,
+            "resources": dict(sorted(self._entries.items())),
+        }
+        tmp_path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+def _parse_timestamp(value: Any) -> datetime | None:
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=UTC)
+
+
+class DocsPageCache:
+    """On-disk ETag cache of docs pages and what was scanned from each.
+
+    Refetches send ``If-None-Match``; a page answered with 304 Not Modified reuses
+    its cached scan result without being downloaded or scanned again. Call ``save``
+    once the catalog is built.
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._pages = self._load()
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as exc:
+            LOGGER.warning("Ignoring unreadable docs cache %s: %s", self.path, exc)
+            return {}
+        if not isinstance(data, dict) or data.get("scanVersion") != _DOCS_SCAN_VERSION:
+            return {}
+        pages = data.get("pages")
+        return pages if isinstance(pages, dict) else {}
+
+    def get(self, url: str) -> dict[str, Any] | None:
+        with self._lock:
+            entry = self._pages.get(url)
+        if not isinstance(entry, dict) or not isinstance(entry.get("data"), dict):
+            return None
+        return entry
+
+    def put(self, url: str, *, etag: str, data: dict[str, Any]) -> None:
+        with self._lock:
+            self._pages[url] = {"etag": etag, "data": data}
+
+    def save(self) -> None:
+        with self._lock:
+            data = {
+                "version": _DOCS_CACHE_VERSION,
+                "scanVersion": _DOCS_SCAN_VERSION,
+                "pages": dict(sorted(self._pages.items())),
+            }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        tmp_path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        os.replace(tmp_path, self.path)
 
 
 def _resource_from_include_path(include_path: str) -> str | None:
@@ -62,47 +408,172 @@ def _normalize_include_path(doc_page: str, include_path: str) -> str:
     return f"{_DOCS_BASE}/{page_dir}/{clean}"
 
 
+def _include_repo_path(doc_page: str, include_path: str) -> str | None:
+    """Repository-relative path of an include, or None for includes hosted elsewhere."""
+    clean = include_path.strip()
+    if clean.startswith("http://") or clean.startswith("https://"):
+        return None
+    if clean.startswith("/"):
+        return clean.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(doc_page), clean))
+
+
+def _scan_doc_page(page: str, markdown: str) -> dict[str, Any]:
+    includes: dict[str, str | None] = {}
+    for include_path in _INCLUDE_PATTERN.findall(markdown):
+        resource_id = _resource_from_include_path(include_path)
+        if resource_id:
+            includes[resource_id] = _include_repo_path(page, include_path)
+        else:
+            LOGGER.debug(
+                "Skipping include that does not map to a UTCM resource id: %s (%s)",
+                include_path,
+                _normalize_include_path(page, include_path),
+            )
+    return {"includes": dict(sorted(includes.items()))}
+
+
+def _scan_include_page(markdown: str) -> dict[str, Any]:
+    """Collect Graph permissions and admin roles named in a resource's include page."""
+    permissions: set[str] = set(_PERMISSION_PATTERN.findall(markdown))
+    roles: set[str] = set()
+    in_role_section = False
+    for line in markdown.splitlines():
+        heading = _HEADING_PATTERN.match(line)
+        if heading:
+            in_role_section = bool(re.search(r"role|permission", heading.group(1), re.IGNORECASE))
+            continue
+        if in_role_section or re.search(r"\brole\b", line, re.IGNORECASE):
+            roles.update(match.strip() for match in _ROLE_PATTERN.findall(line))
+    return {"permissions": sorted(permissions), "roles": sorted(roles)}
+
+
+def _fetch_docs_file(
+    path: str,
+    scan: Callable[[str], dict[str, Any]],
+    *,
+    session: GraphSession,
+    cache: DocsPageCache | None,
+) -> dict[str, Any] | None:
+    url = f"{_DOCS_BASE}/{path}"
+    cached = cache.get(url) if cache else None
+    headers = {"If-None-Match": str(cached["etag"])} if cached else None
+
+    LOGGER.debug("Fetching UTCM docs file: %s", url)
+    response = session.get(url, timeout=60, authenticated=False, headers=headers)
+    if response.status_code == 304 and cached:
+        LOGGER.debug("Docs file unchanged since last build: %s", url)
+        return dict(cached["data"])
+    if response.status_code == 404:
+        LOGGER.warning("Skipping missing docs file: %s", url)
+        return None
+    response.raise_for_status()
+
+    data = scan(response.text)
+    etag = response.headers.get("ETag")
+    if cache and etag:
+        cache.put(url, etag=etag, data=data)
+    return data
+
+
+def _read_local_docs_file(
+    path: str,
+    scan: Callable[[str], dict[str, Any]],
+    *,
+    docs_root: Path,
+) -> dict[str, Any] | None:
+    file_path = docs_root / path
+    try:
+        markdown = file_path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        LOGGER.warning("Skipping missing docs file: %s", file_path)
+        return None
+    return scan(markdown)
+
+
 def build_resource_catalog_from_docs(
     doc_pages: list[str] | None = None,
+    session: GraphSession | None = None,
+    *,
+    docs_root: Path | str | None = None,
+    cache: DocsPageCache | None = None,
+    workers: int = _DEFAULT_FETCH_WORKERS,
+    include_permissions: bool = False,
 ) -> dict[str, object]:
+    """Build the resource catalog from the UTCM docs pages.
+
+    Pages are fetched concurrently (``workers`` at a time) from raw GitHub content,
+    revalidated through ``cache`` when given, or read from a local checkout of
+    microsoft-graph-docs-contrib at ``docs_root`` without any network access.
+
+    ``resources`` stays a flat list of ids; ``resourceDetails`` adds each resource's
+    workload and docs include. With ``include_permissions`` every include page is
+    read as well and the Graph permissions and admin roles it names are recorded.
+
+    The catalog lists every documented type. Unsupported-resource caches are tenant
+    specific and are applied when the list is loaded or submitted, not here.
+    """
     pages = doc_pages or _DEFAULT_DOC_PAGES
-    discovered: set[str] = set()
+    if docs_root is not None:
+        root = Path(docs_root)
 
-    for page in pages:
-        page_url = f"{_DOCS_BASE}/{page}"
-        LOGGER.info("Fetching UTCM docs page: %s", page_url)
-        try:
-            markdown = _fetch_text(page_url)
-        except requests.HTTPError as exc:
-            status_code = getattr(exc.response, "status_code", None)
-            if status_code == 404:
-                LOGGER.warning("Skipping missing docs page: %s", page_url)
-                continue
-            raise
-
-        include_paths = _INCLUDE_PATTERN.findall(markdown)
-        for include_path in include_paths:
-            normalized_url = _normalize_include_path(page, include_path)
-            resource_id = _resource_from_include_path(include_path)
-            if resource_id:
-                discovered.add(resource_id)
-            else:
-                LOGGER.debug(
-                    "Skipping include that does not map to a UTCM resource id: %s (%s)",
-                    include_path,
-                    normalized_url,
-                )
-
-    resources = sorted(discovered)
+        def _load(path: str, scan: Callable[[str], dict[str, Any]]) -> dict[str, Any] | None:
+            return _read_local_docs_file(path, scan, docs_root=root)
+    else:
+        # Docs pages are public; a dedicated session avoids resolving Graph credentials.
+        http = session or GraphSession(pool_size=max(10, workers))
+
+        def _load(path: str, scan: Callable[[str], dict[str, Any]]) -> dict[str, Any] | None:
+            return _fetch_docs_file(path, scan, session=http, cache=cache)
+
+    includes: dict[str, str | None] = {}
+    permissions: dict[str, dict[str, Any]] = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        scanned_pages = executor.map(
+            lambda page: _load(page, lambda markdown: _scan_doc_page(page, markdown)),
+            pages,
+        )
+        for page, scanned in zip(pages, scanned_pages):
+            LOGGER.info("Scanned UTCM docs page: %s", page)
+            if scanned:
+                includes.update(scanned.get("includes", {}))
+
+        if include_permissions:
+            detail_paths = {resource: path for resource, path in includes.items() if path}
+            LOGGER.info("Reading %d resource include page(s) for permissions", len(detail_paths))
+            scanned_details = executor.map(
+                lambda path: _load(path, _scan_include_page),
+                detail_paths.values(),
+            )
+            for resource, scanned in zip(detail_paths, scanned_details):
+                if scanned:
+                    permissions[resource] = scanned
+    if cache is not None:
+        cache.save()
+
+    resources = sorted(includes)
     if not resources:
         raise ResourceCatalogError("No resources were discovered from docs pages")
 
-    return {
+    details: dict[str, dict[str, Any]] = {}
+    for resource in resources:
+        detail: dict[str, Any] = {
+            "workload": resource_workload(resource),
+            "docsInclude": includes[resource],
+        }
+        if include_permissions:
+            detail.update(permissions.get(resource, {"permissions": [], "roles": []}))
+        details[resource] = detail
+
+    catalog: dict[str, object] = {
+        "catalogVersion": _CATALOG_VERSION,
         "generatedFrom": "microsoft-graph-docs-contrib",
         "generatedAtUtc": datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ"),
         "resourceCount": len(resources),
         "resources": resources,
+        "resourceDetails": details,
     }
+    return catalog
 
 
 def write_resource_catalog(output_path: Path | str, catalog: dict[str, object]) -> Path:
@@ -114,8 +585,7 @@ def write_resource_catalog(output_path: Path | str, catalog: dict[str, object])
     return out
 
 
-def load_resources_from_file(path: Path | str = Path("resources.json")) -> list[str]:
-    config_path = Path(path)
+def _read_catalog_payload(config_path: Path) -> dict[str, Any]:
     if not config_path.exists():
         raise ResourceCatalogError(
             f"Resource catalog not found: {config_path}. Run scripts/build_resources_catalog.py first."
@@ -131,8 +601,68 @@ def load_resources_from_file(path: Path | str = Path("resources.json")) -> list[
         raise ResourceCatalogError(
             f"Resource catalog has invalid 'resources' format in {config_path}"
         )
+    return payload
+
+
+def load_resources_from_file(
+    path: Path | str = Path("resources.json"),
+    *,
+    unsupported_cache: UnsupportedResourceCache | None = None,
+) -> list[str]:
+    """Load the resource list, leaving out types ``unsupported_cache`` currently rejects.
+
+    Catalogs that were built with a cache moved its types to ``excludedUnsupported``;
+    those are read back, so they are re-probed once their cache entries expire.
+    """
+    config_path = Path(path)
+    payload = _read_catalog_payload(config_path)
+    resources = list(payload["resources"])
+    excluded = payload.get("excludedUnsupported")
+    if isinstance(excluded, list):
+        resources.extend(item for item in excluded if isinstance(item, str))
 
     cleaned = sorted({item.strip() for item in resources if item.strip()})
     if not cleaned:
         raise ResourceCatalogError(f"Resource catalog contains no resources: {config_path}")
+    if unsupported_cache is not None:
+        cleaned, _ = unsupported_cache.filter(cleaned)
+        if not cleaned:
+            raise ResourceCatalogError(
+                f"Every resource in {config_path} is cached as unsupported "
+                f"({unsupported_cache.path})"
+            )
     return cleaned
+
+
+def load_resource_catalog(
+    path: Path | str = Path("resources.json"),
+    *,
+    stats: ResourceStats | None = None,
+    unsupported_cache: UnsupportedResourceCache | None = None,
+) -> ResourceCatalog:
+    """Load ``resources.json`` with its per-resource metadata and observed costs.
+
+    Catalogs written before ``resourceDetails`` existed still load; their entries
+    only carry the workload derived from the resource id.
+    """
+    config_path = Path(path)
+    resources = load_resources_from_file(config_path, unsupported_cache=unsupported_cache)
+    details = _read_catalog_payload(config_path).get("resourceDetails")
+    if not isinstance(details, dict):
+        details = {}
+
+    entries: dict[str, ResourceInfo] = {}
+    for resource in resources:
+        detail = details.get(resource)
+        if not isinstance(detail, dict):
+            detail = {}
+        observed = (stats.get(resource) if stats else None) or {}
+        entries[resource] = ResourceInfo(
+            resource=resource,
+            workload=str(detail.get("workload") or resource_workload(resource)),
+            permissions=tuple(str(item) for item in detail.get("permissions") or ()),
+            roles=tuple(str(item) for item in detail.get("roles") or ()),
+            average_instances=observed.get("averageInstances"),
+            average_duration_seconds=observed.get("averageDurationSeconds"),
+        )
+    return ResourceCatalog(entries=entries)
@@ -0,0 +1,532 @@
+import json
+import logging
+import os
+import threading
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from utcm_exporter.auth import ClientCredentials, TokenProvider
+from utcm_exporter.config import ScheduleConfigError, resolve_group_resources
+from utcm_exporter.graph_session import GraphSession
+from utcm_exporter.journal import PipelineJournal
+from utcm_exporter.metrics import REGISTRY
+from utcm_exporter.pipeline import run_snapshot_pipeline
+from utcm_exporter.polling import PollHistory
+from utcm_exporter.resources_catalog import (
+    DEFAULT_UNSUPPORTED_TTL_SECONDS,
+    ResourceCatalogError,
+    ResourceStats,
+    UnsupportedResourceCache,
+)
+from utcm_exporter.utcm_client import SnapshotJobConflictError, SnapshotWaitInterrupted
+
+LOGGER = logging.getLogger(__name__)
+
+_REPORT_VERSION = 1
+_TOKEN_CACHE_KEY_ENV = "UTCM_TOKEN_CACHE_KEY"
+
+_TENANT_RUNS = REGISTRY.counter(
+    "utcm_tenant_runs_total",
+    "Multi-tenant pipeline runs by tenant and status.",
+    ("tenant", "status"),
+)
+_TENANT_RUN_SECONDS = REGISTRY.histogram(
+    "utcm_tenant_run_seconds",
+    "Duration of one tenant group's pipeline run.",
+    ("tenant",),
+    buckets=(30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 14400),
+)
+
+
+class TenantConfigError(ValueError):
+    """Raised when the multi-tenant configuration is invalid."""
+
+
+@dataclass(frozen=True)
+class TenantGroup:
+    """One snapshot job's worth of resources for a tenant, with its own output folder."""
+
+    name: str
+    resources: tuple[str, ...]
+    output_dir: Path
+
+
+@dataclass(frozen=True)
+class TenantConfig:
+    name: str
+    credentials: ClientCredentials
+    groups: tuple[TenantGroup, ...]
+    state_dir: Path
+    token_cache_key: str | None = field(default=None, repr=False)
+    max_concurrent_jobs: int = 1
+
+
+@dataclass(frozen=True)
+class MultiTenantConfig:
+    tenants: tuple[TenantConfig, ...]
+    report_file: Path
+    metrics_textfile: Path | None = None
+    max_concurrent_jobs: int = 4
+    timeout_seconds: int = 7200
+    incremental: bool = True
+    workers: int = 1
+    git_commit: bool = False
+    git_push: bool = False
+    partial_retries: int = 2
+    unsupported_ttl_seconds: float = DEFAULT_UNSUPPORTED_TTL_SECONDS
+
+
+def _load_credentials(
+    entry: dict[str, Any],
+    env: dict[str, str | None],
+    name: str,
+) -> ClientCredentials:
+    if entry.get("clientSecret"):
+        raise TenantConfigError(
+            f"Tenant '{name}' has an inline clientSecret; use envFile or clientSecretEnv"
+        )
+    secret_env = entry.get("clientSecretEnv")
+    values = {
+        "tenantId": entry.get("tenantId") or env.get("AZURE_TENANT_ID"),
+        "clientId": entry.get("clientId") or env.get("AZURE_CLIENT_ID"),
+        "clientSecret": (
+            os.getenv(str(secret_env)) if secret_env else env.get("AZURE_CLIENT_SECRET")
+        ),
+    }
+    missing = [key for key, value in values.items() if not value]
+    if missing:
+        raise TenantConfigError(f"Tenant '{name}' is missing {', '.join(missing)}")
+    return ClientCredentials(
+        tenant_id=str(values["tenantId"]),
+        client_id=str(values["clientId"]),
+        client_secret=str(values["clientSecret"]),
+    )
+
+
+def _load_tenant_groups(
+    entry: dict[str, Any],
+    base_dir: Path,
+    output_dir: Path,
+    default_resources_file: str,
+) -> tuple[TenantGroup, ...]:
+    name = entry["name"]
+    groups_data = entry.get("groups")
+    try:
+        if not groups_data:
+            if not entry.get("resources") and not entry.get("resourcesFile"):
+                entry = {**entry, "resourcesFile": default_resources_file}
+            resources = resolve_group_resources(entry, base_dir)
+            if not resources:
+                raise TenantConfigError(f"Tenant '{name}' has no resources")
+            return (TenantGroup(name=name, resources=tuple(resources), output_dir=output_dir),)
+
+        groups: list[TenantGroup] = []
+        for group_entry in groups_data:
+            group_name = str(group_entry.get("name", "")).strip()
+            if not group_name or group_name in {group.name for group in groups}:
+                raise TenantConfigError(
+                    f"Groups of tenant '{name}' need unique names, got '{group_name}'"
+                )
+            resources = resolve_group_resources(group_entry, base_dir)
+            if not resources:
+                raise TenantConfigError(f"Group '{name}/{group_name}' has no resources")
+            group_output = group_entry.get("outputDir")
+            groups.append(
+                TenantGroup(
+                    name=group_name,
+                    resources=tuple(resources),
+                    output_dir=(
+                        base_dir / str(group_output) if group_output else output_dir / group_name
+                    ),
+                )
+            )
+        return tuple(groups)
+    except (ScheduleConfigError, ResourceCatalogError, OSError) as exc:
+        raise TenantConfigError(f"Tenant '{name}': {exc}") from exc
+
+
+def load_tenants_config(path: Path | str) -> MultiTenantConfig:
+    """Load the multi-tenant runner's JSON config.
+
+    Each tenant reads its app credentials from its own ``envFile`` (AZURE_TENANT_ID,
+    AZURE_CLIENT_ID, AZURE_CLIENT_SECRET) or from ``tenantId``/``clientId`` plus the
+    environment variable named by ``clientSecretEnv``; secrets are never read from the
+    config itself. Output goes to ``outputDir`` (default ``<outputRoot>/<name>``) and
+    token cache, journal, poll history and downloads to ``<stateRoot>/<name>``.
+    Relative paths are resolved against the config file's directory.
+    """
+    config_path = Path(path)
+    try:
+        data = json.loads(config_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        raise TenantConfigError(f"Could not read tenants config {config_path}: {exc}") from exc
+    tenants_data = data.get("tenants") if isinstance(data, dict) else None
+    if not isinstance(tenants_data, list) or not tenants_data:
+        raise TenantConfigError("Tenants config must contain a non-empty 'tenants' list")
+
+    # Imported here so importing this module (e.g. for --help) does not load dotenv.
+    from dotenv import dotenv_values, load_dotenv
+
+    load_dotenv()
+    base_dir = config_path.parent
+    output_root = base_dir / str(data.get("outputRoot", "tenant_state"))
+    state_root = base_dir / str(data.get("stateRoot", ".utcm_state/tenants"))
+    default_resources_file = str(data.get("resourcesFile", "resources.json"))
+
+    tenants: list[TenantConfig] = []
+    for entry in tenants_data:
+        name = str(entry.get("name", "")).strip()
+        if not name or name in {tenant.name for tenant in tenants}:
+            raise TenantConfigError(f"Tenants need unique names, got '{name}'")
+        env: dict[str, str | None] = {}
+        if entry.get("envFile"):
+            env_file = base_dir / str(entry["envFile"])
+            if not env_file.is_file():
+                raise TenantConfigError(f"Tenant '{name}': envFile {env_file} not found")
+            env = dotenv_values(env_file)
+        key_env = entry.get("tokenCacheKeyEnv")
+        output_dir = entry.get("outputDir")
+        tenant_output = base_dir / str(output_dir) if output_dir else output_root / name
+        tenants.append(
+            TenantConfig(
+                name=name,
+                credentials=_load_credentials(entry, env, name),
+                groups=_load_tenant_groups(
+                    {**entry, "name": name},
+                    base_dir,
+                    tenant_output,
+                    default_resources_file,
+                ),
+                state_dir=state_root / name,
+                token_cache_key=(
+                    os.getenv(str(key_env))
+                    if key_env
+                    else env.get(_TOKEN_CACHE_KEY_ENV) or os.getenv(_TOKEN_CACHE_KEY_ENV)
+                ),
+                max_concurrent_jobs=max(1, int(entry.get("maxConcurrentJobs", 1))),
+            )
+        )
+
+    report_file = data.get("reportFile", ".utcm_state/tenants/report.json")
+    metrics_textfile = data.get("metricsTextfile")
+    return MultiTenantConfig(
+        tenants=tuple(tenants),
+        report_file=base_dir / str(report_file),
+        metrics_textfile=base_dir / str(metrics_textfile) if metrics_textfile else None,
+        max_concurrent_jobs=max(1, int(data.get("maxConcurrentJobs", 4))),
+        timeout_seconds=int(data.get("timeoutSeconds", 7200)),
+        incremental=bool(data.get("incremental", True)),
+        workers=max(1, int(data.get("workers", 1))),
+        git_commit=bool(data.get("gitCommit", False)),
+        git_push=bool(data.get("gitPush", False)),
+        partial_retries=max(0, int(data.get("partialRetries", 2))),
+        unsupported_ttl_seconds=float(
+            data.get("unsupportedCacheTtlHours", DEFAULT_UNSUPPORTED_TTL_SECONDS / 3600)
+        )
+        * 3600,
+    )
+
+
+@dataclass
+class TenantRunResult:
+    """Outcome of one tenant group's pipeline run.
+
+    ``status`` is "succeeded", "failed", "conflict" (another job was active in the
+    tenant), "interrupted" (stopped while polling; resumable) or "skipped" (never
+    started because the runner was stopped).
+    """
+
+    tenant: str
+    group: str
+    status: str
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    job_id: str | None = None
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    commit_sha: str | None = None
+    error: str | None = None
+
+    @property
+    def duration_seconds(self) -> float:
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return (self.finished_at - self.started_at).total_seconds()
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "tenant": self.tenant,
+            "group": self.group,
+            "status": self.status,
+            "startedAt": self.started_at.isoformat() if self.started_at else None,
+            "finishedAt": self.finished_at.isoformat() if self.finished_at else None,
+            "durationSeconds": round(self.duration_seconds, 3),
+            "jobId": self.job_id,
+            "created": self.created,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "removed": self.removed,
+            "commitSha": self.commit_sha,
+            "error": self.error,
+        }
+
+
+@dataclass
+class MultiTenantReport:
+    started_at: datetime
+    finished_at: datetime | None = None
+    runs: list[TenantRunResult] = field(default_factory=list)
+
+    @property
+    def failed(self) -> bool:
+        """True when any run did not succeed, including conflicts and skipped runs."""
+        return any(run.status != "succeeded" for run in self.runs)
+
+    def tenant_summaries(self) -> dict[str, dict[str, Any]]:
+        """Per-tenant wall time (first start to last finish) and run status counts."""
+        summaries: dict[str, dict[str, Any]] = {}
+        for tenant in sorted({run.tenant for run in self.runs}):
+            runs = [run for run in self.runs if run.tenant == tenant]
+            starts = [run.started_at for run in runs if run.started_at]
+            finishes = [run.finished_at for run in runs if run.finished_at]
+            summaries[tenant] = {
+                "durationSeconds": (
+                    round((max(finishes) - min(starts)).total_seconds(), 3)
+                    if starts and finishes
+                    else 0.0
+                ),
+                "statuses": dict(Counter(run.status for run in runs)),
+                "created": sum(run.created for run in runs),
+                "updated": sum(run.updated for run in runs),
+                "removed": sum(run.removed for run in runs),
+            }
+        return summaries
+
+    def as_dict(self) -> dict[str, Any]:
+        finished_at = self.finished_at or datetime.now(UTC)
+        return {
+            "version": _REPORT_VERSION,
+            "startedAt": self.started_at.isoformat(),
+            "finishedAt": finished_at.isoformat(),
+            "durationSeconds": round((finished_at - self.started_at).total_seconds(), 3),
+            "statuses": dict(Counter(run.status for run in self.runs)),
+            "tenants": self.tenant_summaries(),
+            "runs": [run.as_dict() for run in self.runs],
+        }
+
+
+def write_report(report: MultiTenantReport, path: Path | str) -> Path:
+    report_path = Path(path)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = report_path.with_name(f"{report_path.name}.tmp")
+    tmp_path.write_text(json.dumps(report.as_dict(), indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp_path, report_path)
+    return report_path
+
+
+def render_report_table(report: MultiTenantReport) -> str:
+    """Plain-text table of runs, one line per tenant group."""
+    header = ("TENANT", "GROUP", "STATUS", "SECONDS", "CREATED", "UPDATED", "REMOVED", "JOB")
+    rows = [header] + [
+        (
+            run.tenant,
+            run.group,
+            run.status,
+            f"{run.duration_seconds:.0f}",
+            str(run.created),
+            str(run.updated),
+            str(run.removed),
+            run.job_id or "-",
+        )
+        for run in sorted(report.runs, key=lambda item: (item.tenant, item.group))
+    ]
+    widths = [max(len(row[idx]) for row in rows) for idx in range(len(header))]
+    return "\n".join(
+        "  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip()
+        for row in rows
+    )
+
+
+@dataclass
+class _TenantRuntime:
+    session: GraphSession
+    journal: PipelineJournal
+    poll_history: PollHistory
+    unsupported_cache: UnsupportedResourceCache
+    resource_stats: ResourceStats
+
+
+class MultiTenantRunner:
+    """Runs the snapshot pipeline for many tenants concurrently.
+
+    At most ``max_concurrent_jobs`` runs are in flight overall and at most each tenant's
+    own ``max_concurrent_jobs`` within one tenant; pending runs are taken round-robin
+    across tenants so one large tenant does not hold every slot. Each tenant has its own
+    TokenProvider and GraphSession (so its own MSAL token cache), journal, poll history
+    and download folder. One tenant failing never stops the others.
+    """
+
+    def __init__(
+        self,
+        config: MultiTenantConfig,
+        *,
+        stop_event: threading.Event | None = None,
+    ) -> None:
+        self.config = config
+        self._stop_event = stop_event or threading.Event()
+        self._commit_lock = threading.Lock()
+        self._runtimes_lock = threading.Lock()
+        self._runtimes: dict[str, _TenantRuntime] = {}
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _runtime(self, tenant: TenantConfig) -> _TenantRuntime:
+        token_provider = TokenProvider(
+            tenant.credentials,
+            cache_path=tenant.state_dir / "token_cache.bin" if tenant.token_cache_key else None,
+            cache_key=tenant.token_cache_key,
+        )
+        return _TenantRuntime(
+            session=GraphSession(token_provider, pool_size=max(10, tenant.max_concurrent_jobs)),
+            journal=PipelineJournal(tenant.state_dir / "journal.json"),
+            poll_history=PollHistory(tenant.state_dir / "poll_history.json"),
+            unsupported_cache=UnsupportedResourceCache(
+                tenant.state_dir / "unsupported_resources.json",
+                ttl_seconds=self.config.unsupported_ttl_seconds,
+            ),
+            resource_stats=ResourceStats(tenant.state_dir / "resource_stats.json"),
+        )
+
+    def run(self, tenant_names: list[str] | None = None) -> MultiTenantReport:
+        tenants = list(self.config.tenants)
+        if tenant_names:
+            unknown = set(tenant_names) - {tenant.name for tenant in tenants}
+            if unknown:
+                raise TenantConfigError(f"Unknown tenant(s): {', '.join(sorted(unknown))}")
+            tenants = [tenant for tenant in tenants if tenant.name in tenant_names]
+
+        report = MultiTenantReport(started_at=datetime.now(UTC))
+        pending = _round_robin(tenants)
+        LOGGER.info(
+            "Running %d group(s) across %d tenant(s), up to %d concurrent job(s)",
+            len(pending),
+            len(tenants),
+            self.config.max_concurrent_jobs,
+        )
+        running: dict[Future[TenantRunResult], TenantConfig] = {}
+        active: Counter[str] = Counter()
+        try:
+            with ThreadPoolExecutor(
+                max_workers=self.config.max_concurrent_jobs,
+                thread_name_prefix="utcm-tenant",
+            ) as executor:
+                while pending or running:
+                    if self._stop_event.is_set():
+                        report.runs.extend(
+                            TenantRunResult(tenant=tenant.name, group=group.name, status="skipped")
+                            for tenant, group in pending
+                        )
+                        pending = []
+                    for item in list(pending):
+                        tenant, group = item
+                        if len(running) >= self.config.max_concurrent_jobs:
+                            break
+                        if active[tenant.name] >= tenant.max_concurrent_jobs:
+                            continue
+                        pending.remove(item)
+                        active[tenant.name] += 1
+                        running[executor.submit(self._run_group, tenant, group)] = tenant
+                    if not running:
+                        continue
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        active[running.pop(future).name] -= 1
+                        report.runs.append(future.result())
+        finally:
+            for runtime in self._runtimes.values():
+                runtime.session.close()
+            self._runtimes.clear()
+
+        report.finished_at = datetime.now(UTC)
+        return report
+
+    def _run_group(self, tenant: TenantConfig, group: TenantGroup) -> TenantRunResult:
+        result = TenantRunResult(
+            tenant=tenant.name,
+            group=group.name,
+            status="failed",
+            started_at=datetime.now(UTC),
+        )
+        label = tenant.name if group.name == tenant.name else f"{tenant.name}/{group.name}"
+        LOGGER.info("Tenant %s: running %d resource(s)", label, len(group.resources))
+        try:
+            with self._runtimes_lock:
+                runtime = self._runtimes.get(tenant.name)
+                if runtime is None:
+                    runtime = self._runtimes[tenant.name] = self._runtime(tenant)
+            pipeline = run_snapshot_pipeline(
+                resources=list(group.resources),
+                output_root=group.output_dir,
+                display_name=f"GitBackup {group.name}",
+                incremental=self.config.incremental,
+                workers=self.config.workers,
+                git_commit=self.config.git_commit,
+                git_push=self.config.git_push,
+                partial_retries=self.config.partial_retries,
+                timeout_seconds=self.config.timeout_seconds,
+                poll_history=runtime.poll_history,
+                unsupported_cache=runtime.unsupported_cache,
+                resource_stats=runtime.resource_stats,
+                journal=runtime.journal,
+                download_dir=tenant.state_dir / "downloads",
+                stop_event=self._stop_event,
+                commit_lock=self._commit_lock,
+                session=runtime.session,
+            )
+        except SnapshotWaitInterrupted:
+            result.status = "interrupted"
+            LOGGER.info("Tenant %s interrupted; job left to resume", label)
+        except SnapshotJobConflictError as exc:
+            result.status = "conflict"
+            result.error = str(exc)
+            LOGGER.warning("Tenant %s skipped, another snapshot job is active: %s", label, exc)
+        except Exception as exc:
+            # One tenant's failure (bad credentials, Graph errors) must not stop the rest.
+            result.error = f"{type(exc).__name__}: {exc}"
+            LOGGER.exception("Tenant %s failed", label)
+        else:
+            result.status = "succeeded"
+            result.job_id = pipeline.job_id
+            result.created = pipeline.summary.created
+            result.updated = pipeline.summary.updated
+            result.unchanged = pipeline.summary.unchanged
+            result.removed = pipeline.summary.removed
+            result.commit_sha = pipeline.commit.commit_sha if pipeline.commit else None
+        result.finished_at = datetime.now(UTC)
+        _TENANT_RUNS.inc(tenant=tenant.name, status=result.status)
+        _TENANT_RUN_SECONDS.observe(result.duration_seconds, tenant=tenant.name)
+        LOGGER.info(
+            "Tenant %s %s in %.0fs",
+            label,
+            result.status,
+            result.duration_seconds,
+        )
+        return result
+
+
+def _round_robin(tenants: list[TenantConfig]) -> list[tuple[TenantConfig, TenantGroup]]:
+    """Interleave tenants' groups: first group of every tenant, then the second, ..."""
+    longest = max((len(tenant.groups) for tenant in tenants), default=0)
+    return [
+        (tenant, tenant.groups[idx])
+        for idx in range(longest)
+        for tenant in tenants
+        if idx < len(tenant.groups)
+    ]
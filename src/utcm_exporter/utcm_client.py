@@ -1,12 +1,34 @@
+import asyncio
+import json
 import logging
+import math
 import re
+import threading
 import time
+from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
-from typing import Any
+from typing import Any, Coroutine, TypeVar
 
 import requests
 
-from utcm_exporter.auth import get_access_token
+from utcm_exporter.graph_session import (
+    AsyncGraphSession,
+    GraphSession,
+    as_async_session,
+    get_graph_session,
+)
+from utcm_exporter.metrics import REGISTRY
+from utcm_exporter.polling import (
+    AdaptivePollSchedule,
+    PollHistory,
+    PollMetrics,
+    resource_set_key,
+)
+from utcm_exporter.resources_catalog import (
+    ResourceStats,
+    UnsupportedResourceCache,
+    resource_workload,
+)
 
 LOGGER = logging.getLogger(__name__)
 
@@ -17,6 +39,31 @@ _CREATE_SNAPSHOT_URL = (
 _SNAPSHOT_JOBS_URL = (
     f"{_GRAPH_BETA_BASE}/admin/configurationManagement/configurationSnapshotJobs"
 )
+_SNAPSHOT_JOBS_PATH = "/admin/configurationManagement/configurationSnapshotJobs"
+_GRAPH_BATCH_URL = f"{_GRAPH_BETA_BASE}/$batch"
+_GRAPH_BATCH_LIMIT = 20
+_DEFAULT_SHARD_SIZE = 50
+_SHARD_CONFLICT_RETRY_SECONDS = 30
+# How often a wait checks a threading.Event stop signal without holding a thread.
+_STOP_CHECK_SECONDS = 1.0
+
+_SNAPSHOT_JOBS = REGISTRY.counter(
+    "utcm_snapshot_job_waits_total",
+    "Snapshot job waits by outcome: final job status, timeout or interrupted.",
+    ("outcome",),
+)
+_SNAPSHOT_JOB_SECONDS = REGISTRY.histogram(
+    "utcm_snapshot_job_duration_seconds",
+    "Time from the first poll until a snapshot job reached a terminal status.",
+    buckets=(10, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 14400),
+)
+_SNAPSHOT_JOB_POLLS = REGISTRY.histogram(
+    "utcm_snapshot_job_polls",
+    "Status polls made while waiting for one snapshot job.",
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100, 200),
+)
+
+_T = TypeVar("_T")
 
 _TEST_RESOURCES = [
     "microsoft.entra.conditionalaccesspolicy",
@@ -28,18 +75,81 @@ class UTCMClientError(RuntimeError):
     """Raised when UTCM snapshot operations fail."""
 
 
+class SnapshotJobConflictError(UTCMClientError):
+    """Raised when createSnapshot keeps returning 409 and no job can be reused."""
+
+
+class SnapshotJobFailedError(UTCMClientError):
+    """Raised when a snapshot job ends as failed or cancelled."""
+
+
+class SnapshotWaitInterrupted(UTCMClientError):
+    """Raised when a wait is abandoned via its stop event; the job keeps running."""
+
+
+@dataclass(frozen=True)
+class SnapshotJobCleanupResult:
+    """Outcome of one snapshot job selected by cleanup_snapshot_jobs."""
+
+    job_id: str
+    status: str
+    created_at: datetime
+    deleted: bool
+    error: str | None = None
+
+
+@dataclass(frozen=True)
+class SnapshotJobResult:
+    """Terminal state of one snapshot job.
+
+    ``failed_resources`` lists the requested resource types that a
+    ``partiallySuccessful`` job reported errors for; it is empty for full successes.
+    """
+
+    job_id: str
+    status: str
+    resource_location: str
+    failed_resources: tuple[str, ...] = ()
+    error_details: tuple[str, ...] = ()
+    duration_seconds: float | None = None
+
+
+@dataclass(frozen=True)
+class SubmittedSnapshotJob:
+    """A created snapshot job and the resource types it was actually created with.
+
+    ``resources`` excludes types left out as cached or reported unsupported.
+    """
+
+    job_id: str
+    resources: tuple[str, ...]
+
+
 _UNSUPPORTED_RESOURCE_PATTERN = re.compile(
     r"ResourceType '([^']+)' is not supported\.",
     re.IGNORECASE,
 )
 
 
-def _build_headers(access_token: str) -> dict[str, str]:
-    return {
-        "Authorization": f"Bearer {access_token}",
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-    }
+_RESOURCE_TYPE_PATTERN = re.compile(r"\bmicrosoft\.[a-z0-9]+\.[a-z0-9]+\b", re.IGNORECASE)
+
+
+def _run_blocking(coroutine: Coroutine[Any, Any, _T], async_name: str) -> _T:
+    """Run a blocking wrapper's coroutine with asyncio.run.
+
+    asyncio.run cannot start inside a running event loop, and blocking that loop until
+    the job finishes would stall it anyway, so callers there get a pointer to the
+    ``*_async`` variant instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    coroutine.close()
+    raise UTCMClientError(
+        f"{async_name.removesuffix('_async')}() blocks and cannot be called from a running "
+        f"event loop; use 'await {async_name}(...)' instead"
+    )
 
 
 def _extract_job_id(snapshot_job: dict[str, Any]) -> str:
@@ -52,40 +162,85 @@ def _extract_job_id(snapshot_job: dict[str, Any]) -> str:
     return str(job_id)
 
 
-def _poll_snapshot_job(
+async def _wait_or_stop(
+    delay: float,
+    stop_event: asyncio.Event | threading.Event | None,
+) -> bool:
+    """Sleep for ``delay`` seconds; return True as soon as ``stop_event`` is set."""
+    if stop_event is None:
+        await asyncio.sleep(delay)
+        return False
+    if isinstance(stop_event, asyncio.Event):
+        try:
+            await asyncio.wait_for(stop_event.wait(), delay)
+        except TimeoutError:
+            return False
+        return True
+    deadline = time.monotonic() + delay
+    while not stop_event.is_set():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        await asyncio.sleep(min(_STOP_CHECK_SECONDS, remaining))
+    return True
+
+
+async def _poll_snapshot_job(
     *,
-    headers: dict[str, str],
+    session: AsyncGraphSession,
     job_id: str,
-    poll_interval_seconds: int,
+    schedule: AdaptivePollSchedule,
     timeout_seconds: int,
-) -> dict[str, Any]:
+    stop_event: asyncio.Event | threading.Event | None = None,
+) -> tuple[dict[str, Any], PollMetrics]:
     status_url = (
         f"{_GRAPH_BETA_BASE}/admin/configurationManagement/configurationSnapshotJobs/{job_id}"
     )
-    deadline = time.monotonic() + timeout_seconds
+    started = time.monotonic()
+    deadline = started + timeout_seconds
+    metrics = PollMetrics(job_id=job_id)
 
     while True:
-        response = requests.get(status_url, headers=headers, timeout=30)
+        response = await session.get(status_url, timeout=30)
         response.raise_for_status()
 
         job_payload = response.json()
         status = job_payload.get("status", "unknown")
+        now = time.monotonic()
+        metrics.record_poll(str(status), now - started)
         LOGGER.info("Snapshot job %s status: %s", job_id, status)
 
         if status in {"succeeded", "partiallySuccessful"}:
-            return job_payload
+            metrics.finish(now - started)
+            _record_poll_metrics(metrics)
+            return job_payload, metrics
 
         if status in {"failed", "cancelled", "canceled"}:
-            raise UTCMClientError(
+            metrics.finish(now - started)
+            _record_poll_metrics(metrics)
+            raise SnapshotJobFailedError(
                 f"Snapshot job {job_id} ended with status '{status}': {job_payload}"
             )
 
-        if time.monotonic() >= deadline:
+        if now >= deadline:
+            _record_poll_metrics(metrics, outcome="timeout")
             raise UTCMClientError(
                 f"Timed out waiting for snapshot job {job_id} after {timeout_seconds}s"
             )
 
-        time.sleep(poll_interval_seconds)
+        delay = schedule.next_delay(elapsed_seconds=now - started, status=str(status))
+        delay = min(delay, max(0.0, deadline - now))
+        if await _wait_or_stop(delay, stop_event):
+            _record_poll_metrics(metrics, outcome="interrupted")
+            raise SnapshotWaitInterrupted(f"Stopped waiting for snapshot job {job_id}")
+
+
+def _record_poll_metrics(metrics: PollMetrics, *, outcome: str | None = None) -> None:
+    LOGGER.info("Snapshot job poll metrics: %s", json.dumps(metrics.as_dict(), sort_keys=True))
+    _SNAPSHOT_JOBS.inc(outcome=outcome or metrics.final_status)
+    _SNAPSHOT_JOB_POLLS.observe(metrics.poll_count)
+    if metrics.time_to_terminal_seconds is not None:
+        _SNAPSHOT_JOB_SECONDS.observe(metrics.time_to_terminal_seconds)
 
 
 def _extract_graph_error_text(response: requests.Response) -> str:
@@ -119,6 +274,40 @@ def _extract_graph_error_text(response: requests.Response) -> str:
     return str(payload)
 
 
+def _error_detail_texts(job_payload: dict[str, Any]) -> list[str]:
+    details = job_payload.get("errorDetails")
+    if isinstance(details, (str, dict)):
+        details = [details]
+    if not isinstance(details, list):
+        return []
+    texts: list[str] = []
+    for detail in details:
+        if isinstance(detail, dict):
+            texts.append(json.dumps(detail, sort_keys=True))
+        elif detail:
+            texts.append(str(detail))
+    return texts
+
+
+def extract_failed_resource_types(
+    job_payload: dict[str, Any],
+    resources: list[str] | None = None,
+) -> list[str]:
+    """Return the resource types named in a snapshot job's ``errorDetails``.
+
+    With ``resources``, only those requested types are matched (case-insensitively,
+    as whole identifiers) and returned in their requested spelling; otherwise any
+    ``microsoft.<workload>.<type>`` identifier in the details is returned.
+    """
+    text = "\n".join(_error_detail_texts(job_payload))
+    if not text:
+        return []
+    mentioned = {match.group(0).lower() for match in _RESOURCE_TYPE_PATTERN.finditer(text)}
+    if resources is None:
+        return sorted(mentioned)
+    return sorted({resource for resource in resources if resource.strip().lower() in mentioned})
+
+
 def _extract_unsupported_resource_types(response: requests.Response) -> set[str]:
     try:
         payload = response.json()
@@ -146,9 +335,9 @@ def _extract_unsupported_resource_types(response: requests.Response) -> set[str]
     return unsupported
 
 
-def _find_latest_active_job(headers: dict[str, str]) -> str | None:
+async def _find_latest_active_job(session: AsyncGraphSession) -> str | None:
     jobs_url = f"{_GRAPH_BETA_BASE}/admin/configurationManagement/configurationSnapshotJobs?$top=50"
-    response = requests.get(jobs_url, headers=headers, timeout=30)
+    response = await session.get(jobs_url, timeout=30)
     response.raise_for_status()
 
     payload = response.json()
@@ -173,14 +362,13 @@ def _find_latest_active_job(headers: dict[str, str]) -> str | None:
     return None
 
 
-def _create_snapshot_request(
+async def _create_snapshot_request(
     *,
-    headers: dict[str, str],
+    session: AsyncGraphSession,
     payload: dict[str, Any],
 ) -> requests.Response:
-    return requests.post(
+    return await session.post(
         _CREATE_SNAPSHOT_URL,
-        headers=headers,
         json=payload,
         timeout=30,
     )
@@ -192,10 +380,12 @@ def _sanitize_display_name(value: str) -> str:
     return cleaned
 
 
-def _build_unique_display_name(base_name: str) -> str:
+def _build_unique_display_name(base_name: str, tag: str = "") -> str:
     sanitized_base = _sanitize_display_name(base_name) or "GitBackup"
     timestamp = datetime.now(UTC).strftime("%Y%m%d %H%M%S")
-    suffix = f" {timestamp}"
+    # The tag (e.g. a shard number) sits in the suffix so truncating the base keeps it.
+    sanitized_tag = _sanitize_display_name(tag)
+    suffix = f" {sanitized_tag} {timestamp}" if sanitized_tag else f" {timestamp}"
 
     # UTCM validation constraints: length 8..32 and only letters/numbers/spaces.
     max_base_len = 32 - len(suffix)
@@ -223,15 +413,18 @@ def _parse_graph_datetime(value: str | None) -> datetime | None:
     return parsed.astimezone(UTC)
 
 
-def list_snapshot_jobs(*, max_jobs: int = 500) -> list[dict[str, Any]]:
-    access_token = get_access_token()
-    headers = _build_headers(access_token)
+async def list_snapshot_jobs_async(
+    *,
+    max_jobs: int = 500,
+    session: AsyncGraphSession | GraphSession | None = None,
+) -> list[dict[str, Any]]:
+    graph = as_async_session(session)
 
     jobs: list[dict[str, Any]] = []
     next_url = f"{_SNAPSHOT_JOBS_URL}?$top=50"
 
     while next_url and len(jobs) < max_jobs:
-        response = requests.get(next_url, headers=headers, timeout=30)
+        response = await graph.get(next_url, timeout=30)
         response.raise_for_status()
         payload = response.json()
 
@@ -249,11 +442,29 @@ def list_snapshot_jobs(*, max_jobs: int = 500) -> list[dict[str, Any]]:
     return jobs
 
 
-def delete_snapshot_job(job_id: str) -> None:
-    access_token = get_access_token()
-    headers = _build_headers(access_token)
+def list_snapshot_jobs(
+    *,
+    max_jobs: int = 500,
+    session: GraphSession | None = None,
+) -> list[dict[str, Any]]:
+    """Blocking wrapper around list_snapshot_jobs_async.
+
+    Raises UTCMClientError inside a running event loop; await the async variant there.
+    """
+    return _run_blocking(
+        list_snapshot_jobs_async(max_jobs=max_jobs, session=session),
+        "list_snapshot_jobs_async",
+    )
+
+
+async def delete_snapshot_job_async(
+    job_id: str,
+    *,
+    session: AsyncGraphSession | GraphSession | None = None,
+) -> None:
+    graph = as_async_session(session)
     url = f"{_SNAPSHOT_JOBS_URL}/{job_id}"
-    response = requests.delete(url, headers=headers, timeout=30)
+    response = await graph.delete(url, timeout=30)
     if response.status_code not in (200, 202, 204):
         graph_error = _extract_graph_error_text(response)
         raise UTCMClientError(
@@ -261,19 +472,155 @@ def delete_snapshot_job(job_id: str) -> None:
         )
 
 
+def delete_snapshot_job(job_id: str, *, session: GraphSession | None = None) -> None:
+    """Blocking wrapper around delete_snapshot_job_async.
+
+    Raises UTCMClientError inside a running event loop; await the async variant there.
+    """
+    _run_blocking(
+        delete_snapshot_job_async(job_id, session=session),
+        "delete_snapshot_job_async",
+    )
+
+
+async def _delete_snapshot_jobs_batch(
+    session: AsyncGraphSession,
+    job_ids: list[str],
+) -> dict[str, str | None]:
+    """Delete up to 20 jobs with one Graph JSON $batch call.
+
+    Returns a job_id -> error mapping (None on success). Raises UTCMClientError when the
+    batch endpoint itself rejects the request so the caller can fall back to single
+    deletes. Throttled sub-requests are retried individually through the session.
+    """
+    batch_payload = {
+        "requests": [
+            {"id": str(idx), "method": "DELETE", "url": f"{_SNAPSHOT_JOBS_PATH}/{job_id}"}
+            for idx, job_id in enumerate(job_ids)
+        ]
+    }
+    response = await session.post(_GRAPH_BATCH_URL, json=batch_payload, timeout=60)
+    if not response.ok:
+        raise UTCMClientError(
+            f"$batch request failed with HTTP {response.status_code}: "
+            f"{_extract_graph_error_text(response)}"
+        )
+
+    results: dict[str, str | None] = {}
+    for item in response.json().get("responses", []):
+        if not isinstance(item, dict):
+            continue
+        try:
+            job_id = job_ids[int(item.get("id", -1))]
+        except (ValueError, IndexError):
+            continue
+        status_code = int(item.get("status", 0))
+        if status_code in (200, 202, 204):
+            results[job_id] = None
+        elif status_code in (429, 503, 504):
+            results[job_id] = await _delete_snapshot_job_safely(session, job_id)
+        else:
+            results[job_id] = f"HTTP {status_code}: {item.get('body') or '<no response body>'}"
+
+    for job_id in job_ids:
+        results.setdefault(job_id, "No response returned for job in $batch response")
+    return results
+
+
+async def _delete_snapshot_job_safely(session: AsyncGraphSession, job_id: str) -> str | None:
+    try:
+        await delete_snapshot_job_async(job_id, session=session)
+    except (UTCMClientError, requests.RequestException) as exc:
+        return str(exc)
+    return None
+
+
+async def delete_snapshot_jobs_async(
+    job_ids: list[str],
+    *,
+    concurrency: int = 4,
+    use_batch: bool = True,
+    session: AsyncGraphSession | GraphSession | None = None,
+) -> dict[str, str | None]:
+    """Delete many snapshot jobs in parallel without stopping on the first failure.
+
+    Jobs are grouped into Graph $batch requests of up to 20 deletes, and at most
+    ``concurrency`` requests are in flight at once. If $batch is unavailable the
+    remaining jobs are deleted one request each.
+
+    Returns:
+        dict[str, str | None]: job_id -> error message, or None when deleted.
+    """
+    graph = as_async_session(session)
+    if concurrency > graph.pool_size:
+        LOGGER.warning(
+            "Cleanup concurrency %d exceeds HTTP pool size %d; extra requests will queue",
+            concurrency,
+            graph.pool_size,
+        )
+
+    batch_enabled = use_batch
+    slots = asyncio.Semaphore(max(1, concurrency))
+
+    async def _delete_chunk(chunk: list[str]) -> dict[str, str | None]:
+        nonlocal batch_enabled
+        async with slots:
+            if len(chunk) > 1 and batch_enabled:
+                try:
+                    return await _delete_snapshot_jobs_batch(graph, chunk)
+                except (UTCMClientError, requests.RequestException, ValueError) as exc:
+                    LOGGER.warning("Graph $batch unavailable, deleting jobs individually: %s", exc)
+                    batch_enabled = False
+            return {job_id: await _delete_snapshot_job_safely(graph, job_id) for job_id in chunk}
+
+    chunk_size = _GRAPH_BATCH_LIMIT if use_batch else 1
+    chunks = [job_ids[idx : idx + chunk_size] for idx in range(0, len(job_ids), chunk_size)]
+
+    results: dict[str, str | None] = {}
+    for chunk_results in await asyncio.gather(*(_delete_chunk(chunk) for chunk in chunks)):
+        results.update(chunk_results)
+    return results
+
+
+def delete_snapshot_jobs(
+    job_ids: list[str],
+    *,
+    concurrency: int = 4,
+    use_batch: bool = True,
+    session: GraphSession | None = None,
+) -> dict[str, str | None]:
+    """Blocking wrapper around delete_snapshot_jobs_async.
+
+    Raises UTCMClientError inside a running event loop; await the async variant there.
+    """
+    return _run_blocking(
+        delete_snapshot_jobs_async(
+            job_ids,
+            concurrency=concurrency,
+            use_batch=use_batch,
+            session=session,
+        ),
+        "delete_snapshot_jobs_async",
+    )
+
+
 def cleanup_snapshot_jobs(
     *,
     older_than_days: int = 7,
     statuses: set[str] | None = None,
     dry_run: bool = False,
     max_jobs: int = 500,
-) -> list[str]:
+    concurrency: int = 4,
+    use_batch: bool = True,
+    session: GraphSession | None = None,
+) -> list[SnapshotJobCleanupResult]:
+    graph = session or get_graph_session()
     target_statuses = statuses or {"succeeded", "failed", "cancelled", "canceled"}
     normalized_statuses = {status.lower() for status in target_statuses}
     cutoff = datetime.now(UTC) - timedelta(days=older_than_days)
 
-    jobs = list_snapshot_jobs(max_jobs=max_jobs)
-    deleted_ids: list[str] = []
+    jobs = list_snapshot_jobs(max_jobs=max_jobs, session=graph)
+    selected: list[tuple[str, str, datetime]] = []
 
     for job in jobs:
         status = str(job.get("status", "")).lower()
@@ -287,50 +634,87 @@ def cleanup_snapshot_jobs(
             continue
 
         job_id = _extract_job_id(job)
-        if dry_run:
-            LOGGER.info(
-                "Dry run: would delete snapshot job %s (status=%s, createdDateTime=%s)",
-                job_id,
-                status,
-                created_at.isoformat(),
-            )
-            deleted_ids.append(job_id)
-            continue
-
         LOGGER.info(
-            "Deleting snapshot job %s (status=%s, createdDateTime=%s)",
+            "%s snapshot job %s (status=%s, createdDateTime=%s)",
+            "Dry run: would delete" if dry_run else "Deleting",
             job_id,
             status,
             created_at.isoformat(),
         )
-        delete_snapshot_job(job_id)
-        deleted_ids.append(job_id)
+        selected.append((job_id, status, created_at))
+
+    if dry_run or not selected:
+        return [
+            SnapshotJobCleanupResult(job_id=job_id, status=status, created_at=created_at, deleted=False)
+            for job_id, status, created_at in selected
+        ]
+
+    errors = delete_snapshot_jobs(
+        [job_id for job_id, _, _ in selected],
+        concurrency=concurrency,
+        use_batch=use_batch,
+        session=graph,
+    )
 
-    return deleted_ids
+    results: list[SnapshotJobCleanupResult] = []
+    for job_id, status, created_at in selected:
+        error = errors.get(job_id)
+        if error:
+            LOGGER.error("Failed to delete snapshot job %s: %s", job_id, error)
+        results.append(
+            SnapshotJobCleanupResult(
+                job_id=job_id,
+                status=status,
+                created_at=created_at,
+                deleted=error is None,
+                error=error,
+            )
+        )
+    return results
 
 
-def create_snapshot_and_wait(
+async def submit_snapshot_job_result_async(
     *,
     display_name: str = "GitBackup",
     description: str = "Automated Backup",
     resources: list[str] | None = None,
-    poll_interval_seconds: int = 10,
-    timeout_seconds: int = 900,
-) -> tuple[str, str]:
-    """Create a UTCM snapshot job and wait for completion.
+    reuse_active_job: bool = True,
+    unsupported_cache: UnsupportedResourceCache | None = None,
+    display_name_tag: str = "",
+    session: AsyncGraphSession | GraphSession | None = None,
+) -> SubmittedSnapshotJob:
+    """Create a UTCM snapshot job without waiting for it.
+
+    Resource types that Graph rejects as unsupported are removed and the request is
+    retried. On HTTP 409 the latest active job is reused when ``reuse_active_job`` is
+    set; otherwise a single retry with a fresh displayName is made and a
+    SnapshotJobConflictError is raised if the service still refuses the job.
+
+    With ``unsupported_cache``, types rejected by earlier runs are left out of the
+    first request, new rejections are recorded and re-probed types that the service
+    accepts are dropped from the cache.
+
+    The displayName is ``display_name`` plus a timestamp, cut to UTCM's 32 characters;
+    ``display_name_tag`` (e.g. a shard number) is kept whole by shortening the base.
 
     Returns:
-        tuple[str, str]: (job_id, resource_location)
+        SubmittedSnapshotJob: The job id and the resource types it was created with.
     """
-    access_token = get_access_token()
-    headers = _build_headers(access_token)
+    graph = as_async_session(session)
 
     snapshot_resources = resources or _TEST_RESOURCES
     requested_resources = [item.strip() for item in snapshot_resources if item.strip()]
     if not requested_resources:
         raise UTCMClientError("At least one resource type is required to create a snapshot")
+    if unsupported_cache is not None:
+        requested_resources, _ = unsupported_cache.filter(requested_resources)
+        if not requested_resources:
+            raise UTCMClientError(
+                "All requested resource types are cached as unsupported "
+                f"({unsupported_cache.path})"
+            )
 
-    initial_display_name = _build_unique_display_name(display_name)
+    initial_display_name = _build_unique_display_name(display_name, display_name_tag)
     payload_base = {
         "displayName": initial_display_name,
         "description": description,
@@ -344,7 +728,7 @@ def create_snapshot_and_wait(
             len(active_resources),
             payload_base["displayName"],
         )
-        create_response = _create_snapshot_request(headers=headers, payload=payload)
+        create_response = await _create_snapshot_request(session=graph, payload=payload)
 
         unsupported_resources = set()
         if create_response.status_code == 400:
@@ -358,6 +742,9 @@ def create_snapshot_and_wait(
             ]
             if len(filtered_resources) == len(active_resources):
                 break
+            if unsupported_cache is not None:
+                rejected = set(active_resources) - set(filtered_resources)
+                unsupported_cache.record_rejected(sorted(rejected))
 
             LOGGER.warning(
                 "Removing %d unsupported resource types and retrying createSnapshot: %s",
@@ -372,7 +759,7 @@ def create_snapshot_and_wait(
             active_resources = filtered_resources
             payload_base = {
                 **payload_base,
-                "displayName": _build_unique_display_name(display_name),
+                "displayName": _build_unique_display_name(display_name, display_name_tag),
             }
             continue
 
@@ -381,11 +768,11 @@ def create_snapshot_and_wait(
     if create_response.status_code == 409:
         graph_error = _extract_graph_error_text(create_response)
         LOGGER.warning("createSnapshot returned 409 conflict: %s", graph_error)
-        job_id = _find_latest_active_job(headers)
+        job_id = await _find_latest_active_job(graph) if reuse_active_job else None
         if job_id:
             LOGGER.info("Continuing with existing active snapshot job: %s", job_id)
         else:
-            retry_display_name = _build_unique_display_name(display_name)
+            retry_display_name = _build_unique_display_name(display_name, display_name_tag)
             retry_payload = {
                 **payload_base,
                 "displayName": retry_display_name,
@@ -395,10 +782,15 @@ def create_snapshot_and_wait(
                 "Retrying createSnapshot with unique displayName: %s",
                 retry_display_name,
             )
-            retry_response = _create_snapshot_request(
-                headers=headers,
+            retry_response = await _create_snapshot_request(
+                session=graph,
                 payload=retry_payload,
             )
+            if retry_response.status_code == 409 and not reuse_active_job:
+                raise SnapshotJobConflictError(
+                    "createSnapshot returned 409 after retry with unique displayName: "
+                    f"{_extract_graph_error_text(retry_response)}"
+                )
             if not retry_response.ok:
                 retry_error = _extract_graph_error_text(retry_response)
                 raise UTCMClientError(
@@ -408,6 +800,8 @@ def create_snapshot_and_wait(
             create_payload = retry_response.json()
             job_id = _extract_job_id(create_payload)
             LOGGER.info("Created snapshot job on retry: %s", job_id)
+            if unsupported_cache is not None:
+                unsupported_cache.record_accepted(active_resources)
     else:
         if not create_response.ok:
             graph_error = _extract_graph_error_text(create_response)
@@ -417,13 +811,143 @@ def create_snapshot_and_wait(
         create_payload = create_response.json()
         job_id = _extract_job_id(create_payload)
         LOGGER.info("Created snapshot job: %s", job_id)
+        if unsupported_cache is not None:
+            unsupported_cache.record_accepted(active_resources)
+
+    return SubmittedSnapshotJob(job_id=job_id, resources=tuple(active_resources))
+
+
+def submit_snapshot_job_result(
+    *,
+    display_name: str = "GitBackup",
+    description: str = "Automated Backup",
+    resources: list[str] | None = None,
+    reuse_active_job: bool = True,
+    unsupported_cache: UnsupportedResourceCache | None = None,
+    display_name_tag: str = "",
+    session: GraphSession | None = None,
+) -> SubmittedSnapshotJob:
+    """Blocking wrapper around submit_snapshot_job_result_async.
+
+    Raises UTCMClientError inside a running event loop; await the async variant there.
+    """
+    return _run_blocking(
+        submit_snapshot_job_result_async(
+            display_name=display_name,
+            description=description,
+            resources=resources,
+            reuse_active_job=reuse_active_job,
+            unsupported_cache=unsupported_cache,
+            display_name_tag=display_name_tag,
+            session=session,
+        ),
+        "submit_snapshot_job_result_async",
+    )
+
+
+async def submit_snapshot_job_async(
+    *,
+    display_name: str = "GitBackup",
+    description: str = "Automated Backup",
+    resources: list[str] | None = None,
+    reuse_active_job: bool = True,
+    unsupported_cache: UnsupportedResourceCache | None = None,
+    display_name_tag: str = "",
+    session: AsyncGraphSession | GraphSession | None = None,
+) -> str:
+    """Create a UTCM snapshot job without waiting for it and return its id.
+
+    See submit_snapshot_job_result_async, which also reports the resource types the
+    job was created with.
+    """
+    submitted = await submit_snapshot_job_result_async(
+        display_name=display_name,
+        description=description,
+        resources=resources,
+        reuse_active_job=reuse_active_job,
+        unsupported_cache=unsupported_cache,
+        display_name_tag=display_name_tag,
+        session=session,
+    )
+    return submitted.job_id
+
+
+def submit_snapshot_job(
+    *,
+    display_name: str = "GitBackup",
+    description: str = "Automated Backup",
+    resources: list[str] | None = None,
+    reuse_active_job: bool = True,
+    unsupported_cache: UnsupportedResourceCache | None = None,
+    display_name_tag: str = "",
+    session: GraphSession | None = None,
+) -> str:
+    """Blocking wrapper around submit_snapshot_job_async.
+
+    Raises UTCMClientError inside a running event loop; await the async variant there.
+    """
+    return _run_blocking(
+        submit_snapshot_job_async(
+            display_name=display_name,
+            description=description,
+            resources=resources,
+            reuse_active_job=reuse_active_job,
+            unsupported_cache=unsupported_cache,
+            display_name_tag=display_name_tag,
+            session=session,
+        ),
+        "submit_snapshot_job_async",
+    )
+
 
-    completed_job = _poll_snapshot_job(
-        headers=headers,
+async def wait_for_snapshot_job_result_async(
+    job_id: str,
+    *,
+    poll_interval_seconds: float = 5,
+    max_poll_interval_seconds: float = 60,
+    timeout_seconds: int = 900,
+    resources: list[str] | None = None,
+    poll_history: PollHistory | None = None,
+    stop_event: asyncio.Event | threading.Event | None = None,
+    session: AsyncGraphSession | GraphSession | None = None,
+) -> SnapshotJobResult:
+    """Poll a snapshot job until it is terminal and return its SnapshotJobResult.
+
+    Polls start at ``poll_interval_seconds`` and back off towards
+    ``max_poll_interval_seconds``. With ``poll_history`` and the job's ``resources``,
+    the typical duration of earlier runs of the same resource set shapes the schedule
+    and the new duration is recorded on success. Setting ``stop_event`` (an asyncio or
+    threading Event) ends the wait early with SnapshotWaitInterrupted, leaving the job
+    running so it can be resumed. Sleeping between polls holds no thread.
+
+    For a ``partiallySuccessful`` job the resource types named in its errorDetails
+    are reported in ``failed_resources``.
+    """
+    history_key = resource_set_key(resources) if resources else None
+    expected_duration = (
+        poll_history.expected_duration(history_key) if poll_history and history_key else None
+    )
+    if expected_duration:
+        LOGGER.info("Expecting snapshot job %s to take about %.0fs", job_id, expected_duration)
+
+    schedule = AdaptivePollSchedule(
+        initial_interval_seconds=poll_interval_seconds,
+        max_interval_seconds=max_poll_interval_seconds,
+        expected_duration_seconds=expected_duration,
+    )
+    completed_job, metrics = await _poll_snapshot_job(
+        session=as_async_session(session),
         job_id=job_id,
-        poll_interval_seconds=poll_interval_seconds,
+        schedule=schedule,
         timeout_seconds=timeout_seconds,
+        stop_event=stop_event,
     )
+    if poll_history and history_key and metrics.time_to_terminal_seconds is not None:
+        poll_history.record(
+            history_key,
+            metrics.time_to_terminal_seconds,
+            resource_count=len(resources or []),
+        )
 
     resource_location = completed_job.get("resourceLocation")
     if not resource_location:
@@ -431,5 +955,441 @@ def create_snapshot_and_wait(
             f"Snapshot job {job_id} succeeded but 'resourceLocation' is missing: {completed_job}"
         )
 
+    status = str(completed_job.get("status", "unknown"))
+    failed_resources: list[str] = []
+    error_details = _error_detail_texts(completed_job)
+    if status == "partiallySuccessful":
+        failed_resources = extract_failed_resource_types(completed_job, resources)
+        LOGGER.warning(
+            "Snapshot job %s was only partially successful; failed resource types: %s",
+            job_id,
+            ", ".join(failed_resources) or "none identified in errorDetails",
+        )
+        for detail in error_details:
+            LOGGER.warning("Snapshot job %s error detail: %s", job_id, detail)
+
     LOGGER.info("Snapshot job %s completed", job_id)
-    return job_id, str(resource_location)
+    return SnapshotJobResult(
+        job_id=job_id,
+        status=status,
+        resource_location=str(resource_location),
+        failed_resources=tuple(failed_resources),
+        error_details=tuple(error_details),
+        duration_seconds=metrics.time_to_terminal_seconds,
+    )
+
+
+def wait_for_snapshot_job_result(
+    job_id: str,
+    *,
+    poll_interval_seconds: float = 5,
+    max_poll_interval_seconds: float = 60,
+    timeout_seconds: int = 900,
+    resources: list[str] | None = None,
+    poll_history: PollHistory | None = None,
+    stop_event: threading.Event | None = None,
+    session: GraphSession | None = None,
+) -> SnapshotJobResult:
+    """Blocking wrapper around wait_for_snapshot_job_result_async.
+
+    Raises UTCMClientError inside a running event loop; await the async variant there.
+    """
+    return _run_blocking(
+        wait_for_snapshot_job_result_async(
+            job_id,
+            poll_interval_seconds=poll_interval_seconds,
+            max_poll_interval_seconds=max_poll_interval_seconds,
+            timeout_seconds=timeout_seconds,
+            resources=resources,
+            poll_history=poll_history,
+            stop_event=stop_event,
+            session=session,
+        ),
+        "wait_for_snapshot_job_result_async",
+    )
+
+
+async def wait_for_snapshot_job_async(
+    job_id: str,
+    *,
+    poll_interval_seconds: float = 5,
+    max_poll_interval_seconds: float = 60,
+    timeout_seconds: int = 900,
+    resources: list[str] | None = None,
+    poll_history: PollHistory | None = None,
+    stop_event: asyncio.Event | threading.Event | None = None,
+    session: AsyncGraphSession | GraphSession | None = None,
+) -> str:
+    """Poll a snapshot job until it is terminal and return its resourceLocation.
+
+    See wait_for_snapshot_job_result_async, which also reports the resource types a
+    partially successful job failed for.
+    """
+    result = await wait_for_snapshot_job_result_async(
+        job_id,
+        poll_interval_seconds=poll_interval_seconds,
+        max_poll_interval_seconds=max_poll_interval_seconds,
+        timeout_seconds=timeout_seconds,
+        resources=resources,
+        poll_history=poll_history,
+        stop_event=stop_event,
+        session=session,
+    )
+    return result.resource_location
+
+
+def wait_for_snapshot_job(
+    job_id: str,
+    *,
+    poll_interval_seconds: float = 5,
+    max_poll_interval_seconds: float = 60,
+    timeout_seconds: int = 900,
+    resources: list[str] | None = None,
+    poll_history: PollHistory | None = None,
+    stop_event: threading.Event | None = None,
+    session: GraphSession | None = None,
+) -> str:
+    """Blocking wrapper around wait_for_snapshot_job_async.
+
+    Raises UTCMClientError inside a running event loop; await the async variant there.
+    """
+    return _run_blocking(
+        wait_for_snapshot_job_async(
+            job_id,
+            poll_interval_seconds=poll_interval_seconds,
+            max_poll_interval_seconds=max_poll_interval_seconds,
+            timeout_seconds=timeout_seconds,
+            resources=resources,
+            poll_history=poll_history,
+            stop_event=stop_event,
+            session=session,
+        ),
+        "wait_for_snapshot_job_async",
+    )
+
+
+async def create_snapshot_and_wait_async(
+    *,
+    display_name: str = "GitBackup",
+    description: str = "Automated Backup",
+    resources: list[str] | None = None,
+    poll_interval_seconds: float = 5,
+    max_poll_interval_seconds: float = 60,
+    timeout_seconds: int = 900,
+    poll_history: PollHistory | None = None,
+    unsupported_cache: UnsupportedResourceCache | None = None,
+    session: AsyncGraphSession | GraphSession | None = None,
+) -> tuple[str, str]:
+    """Create a UTCM snapshot job and wait for completion.
+
+    Returns:
+        tuple[str, str]: (job_id, resource_location)
+    """
+    graph = as_async_session(session)
+    job_id = await submit_snapshot_job_async(
+        display_name=display_name,
+        description=description,
+        resources=resources,
+        unsupported_cache=unsupported_cache,
+        session=graph,
+    )
+    resource_location = await wait_for_snapshot_job_async(
+        job_id,
+        poll_interval_seconds=poll_interval_seconds,
+        max_poll_interval_seconds=max_poll_interval_seconds,
+        timeout_seconds=timeout_seconds,
+        resources=resources or _TEST_RESOURCES,
+        poll_history=poll_history,
+        session=graph,
+    )
+    return job_id, resource_location
+
+
+def create_snapshot_and_wait(
+    *,
+    display_name: str = "GitBackup",
+    description: str = "Automated Backup",
+    resources: list[str] | None = None,
+    poll_interval_seconds: float = 5,
+    max_poll_interval_seconds: float = 60,
+    timeout_seconds: int = 900,
+    poll_history: PollHistory | None = None,
+    unsupported_cache: UnsupportedResourceCache | None = None,
+    session: GraphSession | None = None,
+) -> tuple[str, str]:
+    """Blocking wrapper around create_snapshot_and_wait_async.
+
+    Raises UTCMClientError inside a running event loop; await the async variant there.
+    """
+    return _run_blocking(
+        create_snapshot_and_wait_async(
+            display_name=display_name,
+            description=description,
+            resources=resources,
+            poll_interval_seconds=poll_interval_seconds,
+            max_poll_interval_seconds=max_poll_interval_seconds,
+            timeout_seconds=timeout_seconds,
+            poll_history=poll_history,
+            unsupported_cache=unsupported_cache,
+            session=session,
+        ),
+        "create_snapshot_and_wait_async",
+    )
+
+
+def plan_snapshot_shards(
+    resources: list[str],
+    *,
+    strategy: str = "workload",
+    max_resources_per_shard: int | None = None,
+    resource_costs: dict[str, float] | None = None,
+    shard_count: int | None = None,
+) -> list[list[str]]:
+    """Split a resource list into snapshot job shards.
+
+    ``workload`` groups resources by their workload prefix (``microsoft.exchange.*``),
+    further split by ``max_resources_per_shard`` when set. ``size`` cuts the sorted list
+    into chunks of ``max_resources_per_shard`` (default 50). ``cost`` bin-packs
+    resources by ``resource_costs`` (e.g. ResourceCatalog.costs) into ``shard_count``
+    shards of similar total cost, most expensive shard first.
+    """
+    cleaned = sorted({item.strip() for item in resources if item.strip()})
+    if strategy == "cost":
+        return _plan_cost_shards(
+            cleaned,
+            resource_costs=resource_costs or {},
+            max_resources_per_shard=max_resources_per_shard,
+            shard_count=shard_count,
+        )
+    if strategy == "workload":
+        groups: dict[str, list[str]] = {}
+        for resource in cleaned:
+            groups.setdefault(resource_workload(resource), []).append(resource)
+        buckets = [groups[workload] for workload in sorted(groups)]
+    elif strategy == "size":
+        buckets = [cleaned]
+        max_resources_per_shard = max_resources_per_shard or _DEFAULT_SHARD_SIZE
+    else:
+        raise ValueError(f"Unknown shard strategy: {strategy}")
+
+    if not max_resources_per_shard:
+        return buckets
+
+    shards: list[list[str]] = []
+    for bucket in buckets:
+        for idx in range(0, len(bucket), max_resources_per_shard):
+            shards.append(bucket[idx : idx + max_resources_per_shard])
+    return shards
+
+
+def _plan_cost_shards(
+    resources: list[str],
+    *,
+    resource_costs: dict[str, float],
+    max_resources_per_shard: int | None,
+    shard_count: int | None,
+) -> list[list[str]]:
+    if not resources:
+        return []
+    size_limit = max_resources_per_shard or _DEFAULT_SHARD_SIZE
+    count = max(shard_count or 1, math.ceil(len(resources) / size_limit))
+    count = min(count, len(resources))
+    capacity = max_resources_per_shard or math.ceil(len(resources) / count)
+
+    # Longest-processing-time first: the next most expensive resource goes to the
+    # cheapest shard that still has room.
+    by_cost = sorted(resources, key=lambda resource: (-resource_costs.get(resource, 1.0), resource))
+    shards: list[list[str]] = [[] for _ in range(count)]
+    totals = [0.0] * count
+    for resource in by_cost:
+        open_shards = [idx for idx in range(count) if len(shards[idx]) < capacity]
+        target = min(open_shards, key=lambda idx: (totals[idx], idx))
+        shards[target].append(resource)
+        totals[target] += resource_costs.get(resource, 1.0)
+
+    order = sorted(range(count), key=lambda idx: -totals[idx])
+    return [sorted(shards[idx]) for idx in order if shards[idx]]
+
+
+async def _run_snapshot_shard(
+    *,
+    shard_number: int,
+    resources: list[str],
+    display_name: str,
+    description: str,
+    poll_interval_seconds: float,
+    max_poll_interval_seconds: float,
+    timeout_seconds: int,
+    poll_history: PollHistory | None,
+    unsupported_cache: UnsupportedResourceCache | None,
+    resource_stats: ResourceStats | None,
+    session: AsyncGraphSession,
+) -> tuple[str, str]:
+    deadline = time.monotonic() + timeout_seconds
+    while True:
+        try:
+            submitted = await submit_snapshot_job_result_async(
+                display_name=display_name,
+                display_name_tag=f"S{shard_number}",
+                description=description,
+                resources=resources,
+                reuse_active_job=False,
+                unsupported_cache=unsupported_cache,
+                session=session,
+            )
+            break
+        except SnapshotJobConflictError:
+            # Usually the tenant's concurrent job limit: wait for another job to finish.
+            if time.monotonic() + _SHARD_CONFLICT_RETRY_SECONDS >= deadline:
+                raise
+            LOGGER.info(
+                "Shard %d is waiting %ds for a free UTCM job slot",
+                shard_number,
+                _SHARD_CONFLICT_RETRY_SECONDS,
+            )
+            await asyncio.sleep(_SHARD_CONFLICT_RETRY_SECONDS)
+
+    remaining_seconds = max(1, int(deadline - time.monotonic()))
+    job_id = submitted.job_id
+    result = await wait_for_snapshot_job_result_async(
+        job_id,
+        poll_interval_seconds=poll_interval_seconds,
+        max_poll_interval_seconds=max_poll_interval_seconds,
+        timeout_seconds=remaining_seconds,
+        resources=resources,
+        poll_history=poll_history,
+        session=session,
+    )
+    if resource_stats is not None:
+        # Only the types the job ran with; cached-unsupported ones cost it nothing.
+        resource_stats.record_run(
+            list(submitted.resources),
+            duration_seconds=result.duration_seconds,
+        )
+    return job_id, result.resource_location
+
+
+async def create_sharded_snapshots_and_wait_async(
+    *,
+    resources: list[str],
+    strategy: str = "workload",
+    max_resources_per_shard: int | None = None,
+    max_concurrent_jobs: int = 3,
+    display_name: str = "GitBackup",
+    description: str = "Automated Backup",
+    poll_interval_seconds: float = 5,
+    max_poll_interval_seconds: float = 60,
+    timeout_seconds: int = 900,
+    poll_history: PollHistory | None = None,
+    unsupported_cache: UnsupportedResourceCache | None = None,
+    resource_costs: dict[str, float] | None = None,
+    resource_stats: ResourceStats | None = None,
+    session: AsyncGraphSession | GraphSession | None = None,
+) -> list[tuple[str, str]]:
+    """Run one snapshot job per shard, at most ``max_concurrent_jobs`` at a time.
+
+    A 409 on createSnapshot is treated as the tenant's concurrent job limit and the
+    shard waits for a free slot instead of reusing another shard's active job.
+
+    The ``cost`` strategy packs ``resource_costs`` into ``max_concurrent_jobs``
+    balanced shards (more if ``max_resources_per_shard`` requires it). With
+    ``resource_stats``, each shard's duration is recorded to refine those costs.
+
+    Returns:
+        list[tuple[str, str]]: (job_id, resource_location) per shard, in shard order.
+    """
+    graph = as_async_session(session)
+    shards = plan_snapshot_shards(
+        resources,
+        strategy=strategy,
+        max_resources_per_shard=max_resources_per_shard,
+        resource_costs=resource_costs,
+        shard_count=max_concurrent_jobs,
+    )
+    if not shards:
+        raise UTCMClientError("At least one resource type is required to create a snapshot")
+    LOGGER.info(
+        "Running %d snapshot shard(s) with up to %d concurrent job(s)",
+        len(shards),
+        max_concurrent_jobs,
+    )
+
+    slots = asyncio.Semaphore(max(1, max_concurrent_jobs))
+
+    async def _run_shard(shard_number: int, shard: list[str]) -> tuple[str, str]:
+        async with slots:
+            return await _run_snapshot_shard(
+                shard_number=shard_number,
+                resources=shard,
+                display_name=display_name,
+                description=description,
+                poll_interval_seconds=poll_interval_seconds,
+                max_poll_interval_seconds=max_poll_interval_seconds,
+                timeout_seconds=timeout_seconds,
+                poll_history=poll_history,
+                unsupported_cache=unsupported_cache,
+                resource_stats=resource_stats,
+                session=graph,
+            )
+
+    outcomes = await asyncio.gather(
+        *(_run_shard(shard_number, shard) for shard_number, shard in enumerate(shards, start=1)),
+        return_exceptions=True,
+    )
+
+    results: list[tuple[str, str]] = []
+    failures: list[str] = []
+    for shard_number, outcome in enumerate(outcomes, start=1):
+        if isinstance(outcome, UTCMClientError):
+            failures.append(f"shard {shard_number}: {outcome}")
+        elif isinstance(outcome, BaseException):
+            raise outcome
+        else:
+            results.append(outcome)
+    if failures:
+        raise UTCMClientError(
+            f"{len(failures)} of {len(shards)} snapshot shard(s) failed: {'; '.join(failures)}"
+        )
+    return results
+
+
+def create_sharded_snapshots_and_wait(
+    *,
+    resources: list[str],
+    strategy: str = "workload",
+    max_resources_per_shard: int | None = None,
+    max_concurrent_jobs: int = 3,
+    display_name: str = "GitBackup",
+    description: str = "Automated Backup",
+    poll_interval_seconds: float = 5,
+    max_poll_interval_seconds: float = 60,
+    timeout_seconds: int = 900,
+    poll_history: PollHistory | None = None,
+    unsupported_cache: UnsupportedResourceCache | None = None,
+    resource_costs: dict[str, float] | None = None,
+    resource_stats: ResourceStats | None = None,
+    session: GraphSession | None = None,
+) -> list[tuple[str, str]]:
+    """Blocking wrapper around create_sharded_snapshots_and_wait_async.
+
+    Raises UTCMClientError inside a running event loop; await the async variant there.
+    """
+    return _run_blocking(
+        create_sharded_snapshots_and_wait_async(
+            resources=resources,
+            strategy=strategy,
+            max_resources_per_shard=max_resources_per_shard,
+            max_concurrent_jobs=max_concurrent_jobs,
+            display_name=display_name,
+            description=description,
+            poll_interval_seconds=poll_interval_seconds,
+            max_poll_interval_seconds=max_poll_interval_seconds,
+            timeout_seconds=timeout_seconds,
+            poll_history=poll_history,
+            unsupported_cache=unsupported_cache,
+            resource_costs=resource_costs,
+            resource_stats=resource_stats,
+            session=session,
+        ),
+        "create_sharded_snapshots_and_wait_async",
+    )
@@ -0,0 +1,56 @@
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from utcm_exporter.archive import SnapshotArchive
+
+
+class RetentionLockTests(unittest.TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.root = Path(temp_dir.name)
+
+    def test_retention_waits_for_an_in_flight_snapshot(self) -> None:
+        writer = SnapshotArchive(self.root, codec="gzip")
+        collector = SnapshotArchive(self.root, codec="gzip")
+        resources = [{"id": index, "value": "x" * index} for index in range(5)]
+        stream = writer.archive_resources(resources, job_ids=["job-1"])
+        for _ in range(3):
+            next(stream)
+
+        finished = threading.Event()
+        outcome: list[object] = []
+
+        def run_retention() -> None:
+            outcome.append(collector.apply_retention())
+            finished.set()
+
+        thread = threading.Thread(target=run_retention, daemon=True)
+        thread.start()
+        self.assertFalse(finished.wait(0.3), "retention ran while a snapshot was in flight")
+
+        self.assertEqual(list(stream), resources[3:])
+        self.assertTrue(finished.wait(5))
+        thread.join()
+
+        self.assertEqual(outcome[0].removed_objects, 0)
+        snapshot = writer.find(job_id="job-1")
+        self.assertIsNotNone(snapshot)
+        self.assertEqual(writer.load_payload(snapshot.snapshot_id)["resources"], resources)
+
+    def test_retention_collects_objects_of_an_abandoned_snapshot(self) -> None:
+        archive = SnapshotArchive(self.root, codec="gzip")
+        stream = archive.archive_resources([{"id": 1}, {"id": 2}])
+        next(stream)
+        stream.close()
+
+        result = archive.apply_retention()
+
+        self.assertEqual(result.removed_objects, 1)
+        self.assertEqual(archive.list_snapshots(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+from utcm_exporter.diff import diff_payloads
+
+
+def _payload(**properties: object) -> dict[str, object]:
+    return {
+        "resources": [
+            {
+                "resourceType": "microsoft.entra.conditionalaccesspolicy",
+                "displayName": "ConditionalAccessPolicy-Block legacy auth",
+                "properties": {"displayName": "Block legacy auth", **properties},
+            }
+        ]
+    }
+
+
+class DiffValueTypeTests(unittest.TestCase):
+    def _changes(self, old: dict[str, object], new: dict[str, object]) -> list[dict[str, object]]:
+        report = diff_payloads(old, new)
+        self.assertEqual(len(report.modified), 1)
+        return [change.as_dict() for change in report.modified[0].fields]
+
+    def test_bool_and_int_with_equal_value_are_a_change(self) -> None:
+        changes = self._changes(_payload(enabled=True), _payload(enabled=1))
+
+        self.assertEqual(
+            changes,
+            [{"path": "enabled", "change": "modified", "old": True, "new": 1}],
+        )
+
+    def test_type_change_inside_a_list_is_reported_at_the_element(self) -> None:
+        changes = self._changes(_payload(levels=[1, False]), _payload(levels=[1, 0]))
+
+        self.assertEqual(
+            changes,
+            [{"path": "levels[1]", "change": "modified", "old": False, "new": 0}],
+        )
+
+    def test_int_and_float_are_a_change(self) -> None:
+        changes = self._changes(_payload(limits={"max": 5}), _payload(limits={"max": 5.0}))
+
+        self.assertEqual(
+            changes,
+            [{"path": "limits.max", "change": "modified", "old": 5, "new": 5.0}],
+        )
+
+    def test_identical_payloads_are_unchanged(self) -> None:
+        report = diff_payloads(_payload(enabled=True), _payload(enabled=True))
+
+        self.assertEqual((report.modified, report.unchanged), ([], 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+from utcm_exporter.git_history import commit_export
+
+
+def _git(*args: str, cwd: Path) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout
+
+
+class CommitExportTests(unittest.TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        base = Path(temp_dir.name)
+        self.remote = base / "remote.git"
+        self.work = base / "work"
+        _git("init", "--quiet", "--bare", str(self.remote), cwd=base)
+        _git("init", "--quiet", str(self.work), cwd=base)
+        for key, value in (("user.name", "Exporter"), ("user.email", "exporter@example.com")):
+            _git("config", key, value, cwd=self.work)
+        _git("remote", "add", "origin", str(self.remote), cwd=self.work)
+        self.output = self.work / "tenant_state"
+
+    def _write(self, rel_path: str, content: str) -> None:
+        path = self.output / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+    def _remote_files(self) -> list[str]:
+        return _git("ls-tree", "-r", "--name-only", "HEAD", cwd=self.remote).split()
+
+    def test_commits_and_pushes_changed_paths(self) -> None:
+        self._write("entra/conditionalaccesspolicy/Block.yaml", "state: enabled\n")
+        self._write(".manifest.json", "{}\n")
+
+        result = commit_export(
+            output_root=self.output,
+            changed_paths={"entra/conditionalaccesspolicy/Block.yaml": "created"},
+            push=True,
+        )
+
+        self.assertTrue(result.committed)
+        self.assertTrue(result.pushed)
+        remote_log = _git("log", "--format=%H %s", cwd=self.remote).splitlines()
+        self.assertEqual(len(remote_log), 1)
+        self.assertTrue(remote_log[0].startswith(f"{result.commit_sha} UTCM export "))
+        self.assertIn("1 created", remote_log[0])
+        self.assertEqual(
+            self._remote_files(),
+            [
+                "tenant_state/.manifest.json",
+                "tenant_state/entra/conditionalaccesspolicy/Block.yaml",
+            ],
+        )
+
+    def test_stage_untracked_picks_up_files_missing_from_changed_paths(self) -> None:
+        # A resumed run whose manifest was lost finds these already on disk and
+        # does not report them.
+        self._write("entra/conditionalaccesspolicy/Block.yaml", "state: enabled\n")
+        self._write("teams/meetingpolicy/Global.yaml", "recording: false\n")
+        self._write("_debug/snapshot_20260101T000000Z.json", "{}\n")
+
+        with self.assertLogs("utcm_exporter.git_history", level="WARNING"):
+            result = commit_export(
+                output_root=self.output,
+                changed_paths={"teams/meetingpolicy/Global.yaml": "created"},
+                push=True,
+                stage_untracked=True,
+            )
+
+        self.assertTrue(result.committed)
+        self.assertIn("entra/conditionalaccesspolicy: 1 created", result.message)
+        self.assertEqual(
+            self._remote_files(),
+            [
+                "tenant_state/entra/conditionalaccesspolicy/Block.yaml",
+                "tenant_state/teams/meetingpolicy/Global.yaml",
+            ],
+        )
+
+    def test_stage_untracked_commits_even_when_nothing_was_reported(self) -> None:
+        self._write("entra/conditionalaccesspolicy/Block.yaml", "state: enabled\n")
+
+        with self.assertLogs("utcm_exporter.git_history", level="WARNING"):
+            result = commit_export(output_root=self.output, changed_paths={}, stage_untracked=True)
+
+        self.assertTrue(result.committed)
+        self.assertIn("1 created", result.message)
+
+    def test_stages_only_reported_paths_by_default(self) -> None:
+        self._write("teams/meetingpolicy/Global.yaml", "recording: false\n")
+        self._write("teams/meetingpolicy/Notes.yaml", "edited by hand\n")
+
+        result = commit_export(
+            output_root=self.output,
+            changed_paths={"teams/meetingpolicy/Global.yaml": "created"},
+        )
+
+        self.assertTrue(result.committed)
+        committed = _git("show", "--name-only", "--format=", "HEAD", cwd=self.work).split()
+        self.assertEqual(committed, ["tenant_state/teams/meetingpolicy/Global.yaml"])
+
+    def test_stages_removals(self) -> None:
+        self._write("teams/meetingpolicy/Global.yaml", "recording: false\n")
+        self._write("teams/meetingpolicy/Legacy.yaml", "recording: true\n")
+        commit_export(
+            output_root=self.output,
+            changed_paths={
+                "teams/meetingpolicy/Global.yaml": "created",
+                "teams/meetingpolicy/Legacy.yaml": "created",
+            },
+        )
+        (self.output / "teams/meetingpolicy/Legacy.yaml").unlink()
+
+        result = commit_export(
+            output_root=self.output,
+            changed_paths={"teams/meetingpolicy/Legacy.yaml": "removed"},
+            push=True,
+        )
+
+        self.assertTrue(result.committed)
+        self.assertEqual(self._remote_files(), ["tenant_state/teams/meetingpolicy/Global.yaml"])
+
+    def test_nothing_changed_makes_no_commit(self) -> None:
+        self.assertFalse(commit_export(output_root=self.output, changed_paths={}).committed)
+
+
+if __name__ == "__main__":
+    unittest.main()
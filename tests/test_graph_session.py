@@ -0,0 +1,143 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from utcm_exporter.graph_session import GraphSession
+
+
+class _StubGraph:
+    """Local HTTP server answering each path with a scripted list of responses."""
+
+    def __init__(self) -> None:
+        self.scripts: dict[str, list[tuple[int, dict[str, str]]]] = {}
+        self.requests: list[tuple[str, str, str | None]] = []
+        stub = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def _respond(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                stub.requests.append((self.command, self.path, self.headers.get("Authorization")))
+                script = stub.scripts.get(self.path) or [(200, {})]
+                status, headers = script.pop(0) if len(script) > 1 else script[0]
+                body = b'{"ok": true}'
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = _respond
+            do_POST = _respond
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def attempts(self, path: str) -> int:
+        return sum(1 for _, request_path, _ in self.requests if request_path == path)
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _TokenProvider:
+    def __init__(self) -> None:
+        self.generation = 1
+        self.issued = 0
+        self.invalidations = 0
+
+    def get_token(self, scopes: object = None) -> str:
+        self.issued += 1
+        return f"token{self.generation}"
+
+    def invalidate(self) -> None:
+        self.invalidations += 1
+        self.generation += 1
+
+
+class GraphSessionRetryTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.stub = _StubGraph()
+        self.tokens = _TokenProvider()
+        self.session = GraphSession(self.tokens, max_retries=5, backoff_base_seconds=0.01)
+        sleep_patch = mock.patch("utcm_exporter.graph_session.time.sleep")
+        self.sleep = sleep_patch.start()
+        self.addCleanup(sleep_patch.stop)
+        self.addCleanup(self.session.close)
+        self.addCleanup(self.stub.close)
+
+    def test_retries_429_with_retry_after_then_503_then_succeeds(self) -> None:
+        self.stub.scripts["/jobs"] = [(429, {"Retry-After": "7"}), (503, {}), (200, {})]
+
+        response = self.session.get(self.stub.url("/jobs"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stub.attempts("/jobs"), 3)
+        delays = [call.args[0] for call in self.sleep.call_args_list]
+        self.assertEqual(len(delays), 2)
+        # Retry-After is honoured (plus up to 1s of jitter); 503 falls back to backoff.
+        self.assertGreaterEqual(delays[0], 7)
+        self.assertLess(delays[0], 8)
+        self.assertLessEqual(delays[1], 0.02)
+
+    def test_gives_up_after_max_retries(self) -> None:
+        self.stub.scripts["/busy"] = [(503, {})]
+
+        response = self.session.get(self.stub.url("/busy"))
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.stub.attempts("/busy"), 6)
+
+    def test_refreshes_token_once_after_401(self) -> None:
+        self.stub.scripts["/me"] = [(401, {}), (200, {})]
+
+        response = self.session.get(self.stub.url("/me"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.tokens.invalidations, 1)
+        self.assertEqual(
+            [auth for _, path, auth in self.stub.requests if path == "/me"],
+            ["Bearer token1", "Bearer token2"],
+        )
+
+    def test_persistent_401_is_returned_after_one_refresh(self) -> None:
+        self.stub.scripts["/denied"] = [(401, {})]
+
+        response = self.session.get(self.stub.url("/denied"))
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.stub.attempts("/denied"), 2)
+        self.assertEqual(self.tokens.invalidations, 1)
+
+    def test_post_is_not_retried_on_server_errors(self) -> None:
+        self.stub.scripts["/createSnapshot"] = [(504, {}), (201, {})]
+
+        response = self.session.post(self.stub.url("/createSnapshot"), json={"x": 1})
+
+        self.assertEqual(response.status_code, 504)
+        self.assertEqual(self.stub.attempts("/createSnapshot"), 1)
+        self.sleep.assert_not_called()
+
+    def test_post_is_retried_on_429(self) -> None:
+        self.stub.scripts["/createSnapshot"] = [(429, {"Retry-After": "0"}), (201, {})]
+
+        response = self.session.post(self.stub.url("/createSnapshot"), json={"x": 1})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.stub.attempts("/createSnapshot"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import multiprocessing
+import tempfile
+import unittest
+from pathlib import Path
+
+from utcm_exporter.journal import JournalEntry, PipelineJournal
+
+
+def _entry(job_id: str, phase: str = "created") -> JournalEntry:
+    return JournalEntry(
+        job_id=job_id,
+        resources=["microsoft.entra.x"],
+        output_root="out",
+        phase=phase,
+    )
+
+
+def _save_many(path: str, worker: int) -> None:
+    journal = PipelineJournal(path)
+    for step in range(20):
+        journal.save(f"w{worker}-{step}", _entry(f"job-{worker}-{step}"))
+
+
+class SharedJournalTests(unittest.TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.path = Path(temp_dir.name) / "journal.json"
+
+    def test_instances_sharing_a_file_keep_each_others_entries(self) -> None:
+        daemon = PipelineJournal(self.path)
+        run_all = PipelineJournal(self.path)
+
+        daemon.save("daemon", _entry("job-d"))
+        run_all.save("run-all", _entry("job-r"))
+        daemon.save("daemon", _entry("job-d", phase="polling"))
+        run_all.clear("run-all")
+        run_all.save("run-all-2", _entry("job-r2"))
+
+        reloaded = PipelineJournal(self.path)
+        self.assertEqual(reloaded.get("daemon").phase, "polling")
+        self.assertIsNone(reloaded.get("run-all"))
+        self.assertEqual(reloaded.get("run-all-2").job_id, "job-r2")
+        self.assertEqual(run_all.get("daemon").phase, "polling")
+
+    def test_concurrent_processes_lose_no_entries(self) -> None:
+        context = multiprocessing.get_context("spawn")
+        workers = [
+            context.Process(target=_save_many, args=(str(self.path), worker)) for worker in range(4)
+        ]
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join(60)
+            self.assertEqual(process.exitcode, 0)
+
+        journal = PipelineJournal(self.path)
+        for worker in range(4):
+            for step in range(20):
+                self.assertIsNotNone(journal.get(f"w{worker}-{step}"), (worker, step))
+
+
+if __name__ == "__main__":
+    unittest.main()
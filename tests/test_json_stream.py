@@ -0,0 +1,66 @@
+import json
+import unittest
+
+from utcm_exporter.json_stream import JSONStreamError, iter_json_object_array
+
+_DOCUMENT = {
+    "snapshotId": "s-1",
+    "count": 12.5,
+    "resources": [
+        12.5,
+        -0.25,
+        1e-3,
+        6.02e23,
+        1234567890,
+        0,
+        True,
+        None,
+        "Zürich ✓ \\u00e9",
+        {"displayName": "Policy 1", "weight": 3.14159, "limits": [10, 2.5e+2, -7]},
+        [],
+        {},
+    ],
+    "total": -42,
+}
+
+
+def _chunks(data: bytes, size: int) -> list[bytes]:
+    return [data[idx : idx + size] for idx in range(0, len(data), size)]
+
+
+class IterJsonObjectArrayTests(unittest.TestCase):
+    def test_every_chunk_size_decodes_the_same_values(self) -> None:
+        data = json.dumps(_DOCUMENT, ensure_ascii=False).encode("utf-8")
+        for size in range(1, len(data) + 1):
+            with self.subTest(chunk_size=size):
+                metadata: dict = {}
+                items = list(
+                    iter_json_object_array(
+                        _chunks(data, size),
+                        array_key="resources",
+                        metadata=metadata,
+                    )
+                )
+                self.assertEqual(items, _DOCUMENT["resources"])
+                self.assertEqual(
+                    metadata,
+                    {"snapshotId": "s-1", "count": 12.5, "total": -42},
+                )
+
+    def test_top_level_number_ending_at_end_of_input(self) -> None:
+        data = b'{"resources": [], "total": 12.5}'
+        for size in range(1, len(data) + 1):
+            with self.subTest(chunk_size=size):
+                metadata: dict = {}
+                chunks = _chunks(data, size)
+                list(iter_json_object_array(chunks, array_key="resources", metadata=metadata))
+                self.assertEqual(metadata, {"total": 12.5})
+
+    def test_truncated_document_raises(self) -> None:
+        data = b'{"resources": [1, 2'
+        with self.assertRaises(JSONStreamError):
+            list(iter_json_object_array(_chunks(data, 3), array_key="resources"))
+
+
+if __name__ == "__main__":
+    unittest.main()
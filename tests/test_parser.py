@@ -0,0 +1,107 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any
+from unittest import mock
+
+from utcm_exporter.parser import MANIFEST_FILE_NAME, write_resources_to_yaml
+
+_POLICY = "microsoft.entra.conditionalaccesspolicy"
+_GROUP = "microsoft.entra.group"
+
+
+def _resource(resource_type: str, name: str, **properties: Any) -> dict[str, Any]:
+    return {
+        "resourceType": resource_type,
+        "displayName": f"{resource_type.rsplit('.', 1)[-1]}-{name}",
+        "properties": {"displayName": name, **properties},
+    }
+
+
+class IncrementalExportTests(unittest.TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.output = Path(temp_dir.name) / "tenant_state"
+        self.resources = [
+            _resource(_POLICY, "Block", state="enabled"),
+            _resource(_POLICY, "Allow", state="enabled"),
+            _resource(_GROUP, "Admins", mailEnabled=False),
+        ]
+
+    def _export(self, resources: list[dict[str, Any]], **kwargs: Any):
+        return write_resources_to_yaml(
+            resources, output_root=self.output, clean=True, incremental=True, **kwargs
+        )
+
+    def _manifest(self) -> dict[str, Any]:
+        return json.loads((self.output / MANIFEST_FILE_NAME).read_text(encoding="utf-8"))
+
+    def _group_types(self) -> set[str]:
+        return {group["resourceType"] for group in self._manifest()["resourceTypes"].values()}
+
+    def test_unchanged_rerun_writes_nothing(self) -> None:
+        first = self._export(self.resources)
+        self.assertEqual(first.created, 3)
+
+        with mock.patch("utcm_exporter.parser._atomic_write_bytes") as atomic_write:
+            summary = self._export(self.resources)
+
+        self.assertEqual((summary.created, summary.updated, summary.removed), (0, 0, 0))
+        self.assertEqual(summary.unchanged, 3)
+        self.assertEqual(summary.changed_paths, {})
+        self.assertEqual(summary.changed_resource_types, [])
+        self.assertEqual(summary.skipped_resource_types, 2)
+        atomic_write.assert_not_called()
+
+    def test_changed_type_rerenders_only_its_own_files(self) -> None:
+        self._export(self.resources)
+        group_file = self.output / "entra/group/Admins.yaml"
+        group_mtime = group_file.stat().st_mtime_ns
+
+        changed = [
+            _resource(_POLICY, "Block", state="disabled"),
+            *self.resources[1:],
+        ]
+        summary = self._export(changed)
+
+        self.assertEqual(
+            summary.changed_paths, {"entra/conditionalaccesspolicy/Block.yaml": "updated"}
+        )
+        self.assertEqual(summary.changed_resource_types, [_POLICY])
+        self.assertEqual(summary.skipped_resource_types, 1)
+        self.assertEqual((summary.updated, summary.unchanged), (1, 2))
+        self.assertEqual(group_file.stat().st_mtime_ns, group_mtime)
+
+    def test_removed_type_is_pruned_from_manifest(self) -> None:
+        self._export(self.resources)
+
+        summary = self._export(self.resources[:2])
+
+        self.assertEqual(summary.changed_paths, {"entra/group/Admins.yaml": "removed"})
+        self.assertEqual(summary.changed_resource_types, [_GROUP])
+        self.assertFalse((self.output / "entra/group/Admins.yaml").exists())
+        manifest = self._manifest()
+        self.assertNotIn("entra/group/Admins.yaml", manifest["files"])
+        self.assertEqual(self._group_types(), {_POLICY})
+
+    def test_preserved_type_keeps_files_and_group_entry(self) -> None:
+        self._export(self.resources)
+
+        summary = self._export(self.resources[:2], preserve_resource_types=[_GROUP])
+
+        self.assertEqual(summary.removed, 0)
+        self.assertEqual(summary.changed_paths, {})
+        self.assertNotIn(_GROUP, summary.changed_resource_types)
+        self.assertTrue((self.output / "entra/group/Admins.yaml").exists())
+        manifest = self._manifest()
+        self.assertIn("entra/group/Admins.yaml", manifest["files"])
+        self.assertEqual(self._group_types(), {_POLICY, _GROUP})
+
+        rerun = self._export(self.resources)
+        self.assertFalse(rerun.changed)
+
+
+if __name__ == "__main__":
+    unittest.main()
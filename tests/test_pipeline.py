@@ -0,0 +1,230 @@
+import gzip
+import json
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import requests
+
+from utcm_exporter import parser
+from utcm_exporter.journal import JournalEntry, PipelineJournal, journal_key
+from utcm_exporter.pipeline import run_snapshot_pipeline
+from utcm_exporter.resources_catalog import ResourceStats
+from utcm_exporter.utcm_client import (
+    SnapshotJobFailedError,
+    SnapshotJobResult,
+    SubmittedSnapshotJob,
+)
+
+_RESOURCES = ["microsoft.entra.conditionalaccesspolicy"]
+
+
+def _git(*args: str, cwd: Path) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout
+
+
+class _Killed(BaseException):
+    """Stands in for the process dying; not an Exception so nothing catches it."""
+
+
+class ResumeAfterCrashTests(unittest.TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.base = Path(temp_dir.name)
+        self.work = self.base / "work"
+        _git("init", "--quiet", str(self.work), cwd=self.base)
+        for key, value in (("user.name", "Exporter"), ("user.email", "exporter@example.com")):
+            _git("config", key, value, cwd=self.work)
+        self.output = self.work / "tenant_state"
+        self.journal = PipelineJournal(self.base / "state" / "journal.json")
+        self.session = mock.Mock()
+
+    def _downloaded(self, job_id: str, policies: list[str]) -> None:
+        """Journal a run whose snapshot is already on disk, as after the download phase."""
+        path = self.base / "downloads" / f"{job_id}.json.gz"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "resources": [
+                {
+                    "resourceType": _RESOURCES[0],
+                    "displayName": f"ConditionalAccessPolicy-{name}",
+                    "properties": {"displayName": name, "state": "enabled"},
+                }
+                for name in policies
+            ]
+        }
+        path.write_bytes(gzip.compress(json.dumps(payload).encode("utf-8")))
+        entry = JournalEntry(
+            job_id=job_id,
+            resources=list(_RESOURCES),
+            output_root=str(self.output),
+            phase="downloaded",
+            resource_location=f"https://graph.example/{job_id}",
+            download_path=str(path),
+        )
+        self.journal.save(journal_key(_RESOURCES, self.output), entry)
+
+    def _run(self):
+        return run_snapshot_pipeline(
+            resources=list(_RESOURCES),
+            output_root=self.output,
+            git_commit=True,
+            journal=self.journal,
+            session=self.session,
+        )
+
+    def test_files_written_before_a_crash_are_committed_on_resume(self) -> None:
+        self._downloaded("job-1", ["Alpha", "Beta"])
+        self._run()
+
+        self._downloaded("job-2", ["Alpha", "Beta", "Gamma", "Delta", "Epsilon"])
+        real_write = parser._atomic_write_bytes
+        writes: list[Path] = []
+
+        def dying_write(path: Path, content: bytes) -> None:
+            if len(writes) == 2:
+                raise _Killed()
+            real_write(path, content)
+            writes.append(path)
+
+        with mock.patch.object(parser, "_atomic_write_bytes", dying_write):
+            with self.assertRaises(_Killed):
+                self._run()
+        self.assertEqual(len(writes), 2)
+        entry = self.journal.get(journal_key(_RESOURCES, self.output))
+        self.assertEqual(entry.phase, "downloaded")
+
+        result = self._run()
+
+        folder = "entra/conditionalaccesspolicy"
+        written_before_crash = {f"{folder}/{path.name}" for path in writes}
+        new_files = {f"{folder}/{name}.yaml" for name in ("Delta", "Epsilon", "Gamma")}
+        # Files left by the crashed run match the rendered bytes, so they are not
+        # rewritten and count as unchanged; commit_export stages them anyway.
+        self.assertEqual(
+            result.summary.changed_paths,
+            dict.fromkeys(sorted(new_files - written_before_crash), "created"),
+        )
+        self.assertEqual(result.summary.unchanged, 4)
+        self.assertTrue(result.summary.manifest_incomplete)
+        self.assertTrue(result.commit.committed)
+        committed = _git("show", "--name-only", "--format=", "HEAD", cwd=self.work).split()
+        self.assertEqual(
+            sorted(committed),
+            [
+                "tenant_state/.manifest.json",
+                *(f"tenant_state/{folder}/{name}.yaml" for name in ("Delta", "Epsilon", "Gamma")),
+            ],
+        )
+        self.assertIsNone(self.journal.get(journal_key(_RESOURCES, self.output)))
+
+
+class PollErrorTests(unittest.TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.base = Path(temp_dir.name)
+        self.output = self.base / "tenant_state"
+        self.journal = PipelineJournal(self.base / "journal.json")
+        self.key = journal_key(_RESOURCES, self.output)
+        self.journal.save(
+            self.key,
+            JournalEntry(
+                job_id="job-1",
+                resources=list(_RESOURCES),
+                output_root=str(self.output),
+                phase="polling",
+            ),
+        )
+
+    def _run_failing_with(self, error: Exception) -> None:
+        with mock.patch(
+            "utcm_exporter.pipeline.wait_for_snapshot_job_result", side_effect=error
+        ):
+            with self.assertRaises(type(error)):
+                run_snapshot_pipeline(
+                    resources=list(_RESOURCES),
+                    output_root=self.output,
+                    journal=self.journal,
+                    session=mock.Mock(),
+                )
+
+    @staticmethod
+    def _http_error(status_code: int) -> requests.HTTPError:
+        response = requests.Response()
+        response.status_code = status_code
+        return requests.HTTPError(f"HTTP {status_code}", response=response)
+
+    def test_transient_poll_errors_keep_the_job_for_resume(self) -> None:
+        for status_code in (401, 403, 503):
+            with self.subTest(status_code=status_code):
+                self._run_failing_with(self._http_error(status_code))
+
+                entry = self.journal.get(self.key)
+                self.assertIsNotNone(entry)
+                self.assertEqual((entry.job_id, entry.phase), ("job-1", "polling"))
+
+    def test_missing_job_is_dropped(self) -> None:
+        self._run_failing_with(self._http_error(404))
+
+        self.assertIsNone(self.journal.get(self.key))
+
+    def test_failed_job_is_dropped(self) -> None:
+        self._run_failing_with(SnapshotJobFailedError("job-1 failed"))
+
+        self.assertIsNone(self.journal.get(self.key))
+
+
+class ResourceStatsTests(unittest.TestCase):
+    def test_only_submitted_resources_are_recorded(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        base = Path(temp_dir.name)
+        stats = ResourceStats(base / "resource_stats.json")
+        cached_unsupported = "microsoft.teams.meetingpolicy"
+        submitted = SubmittedSnapshotJob(job_id="job-1", resources=tuple(_RESOURCES))
+        result = SnapshotJobResult(
+            job_id="job-1",
+            status="succeeded",
+            resource_location="https://graph.example/job-1",
+            duration_seconds=120.0,
+        )
+        resources = [
+            {
+                "resourceType": _RESOURCES[0],
+                "displayName": "ConditionalAccessPolicy-Alpha",
+                "properties": {"displayName": "Alpha"},
+            }
+        ]
+
+        with (
+            mock.patch(
+                "utcm_exporter.pipeline.submit_snapshot_job_result", return_value=submitted
+            ),
+            mock.patch(
+                "utcm_exporter.pipeline.wait_for_snapshot_job_result", return_value=result
+            ),
+            mock.patch(
+                "utcm_exporter.pipeline.stream_snapshot_resources", return_value=iter(resources)
+            ),
+        ):
+            run_snapshot_pipeline(
+                resources=[*_RESOURCES, cached_unsupported],
+                output_root=base / "tenant_state",
+                resource_stats=stats,
+                session=mock.Mock(),
+            )
+
+        self.assertIsNone(stats.get(cached_unsupported))
+        observed = stats.get(_RESOURCES[0])
+        self.assertEqual(observed["averageInstances"], 1)
+        self.assertEqual(observed["averageDurationSeconds"], 120.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
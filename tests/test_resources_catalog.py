@@ -0,0 +1,86 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from utcm_exporter.resources_catalog import (
+    ResourceStats,
+    UnsupportedResourceCache,
+    load_resources_from_file,
+)
+
+
+class SharedStateFileTests(unittest.TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.root = Path(temp_dir.name)
+
+    def test_resource_stats_instances_merge_their_observations(self) -> None:
+        path = self.root / "resource_stats.json"
+        first = ResourceStats(path)
+        second = ResourceStats(path)
+
+        first.record_run(["microsoft.entra.a"], instance_counts={"microsoft.entra.a": 4})
+        second.record_run(["microsoft.teams.b"], instance_counts={"microsoft.teams.b": 2})
+
+        reloaded = ResourceStats(path)
+        self.assertEqual(reloaded.get("microsoft.entra.a")["averageInstances"], 4)
+        self.assertEqual(reloaded.get("microsoft.teams.b")["averageInstances"], 2)
+
+    def test_unsupported_caches_merge_their_entries(self) -> None:
+        path = self.root / "unsupported.json"
+        first = UnsupportedResourceCache(path)
+        second = UnsupportedResourceCache(path)
+
+        first.record_rejected(["microsoft.entra.a", "microsoft.entra.c"])
+        second.record_rejected(["microsoft.teams.b"])
+        second.record_accepted(["microsoft.entra.c"])
+
+        self.assertEqual(
+            UnsupportedResourceCache(path).rejected(),
+            ["microsoft.entra.a", "microsoft.teams.b"],
+        )
+
+
+class UnsupportedCacheAtLoadTests(unittest.TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.root = Path(temp_dir.name)
+
+    def _catalog(self, **payload: object) -> Path:
+        path = self.root / "resources.json"
+        path.write_text(json.dumps(payload), encoding="utf-8")
+        return path
+
+    def test_rejected_type_is_skipped_until_its_entry_expires(self) -> None:
+        catalog = self._catalog(resources=["microsoft.entra.a", "microsoft.teams.b"])
+        cache_path = self.root / "unsupported.json"
+        UnsupportedResourceCache(cache_path).record_rejected(["microsoft.teams.b"])
+
+        active = UnsupportedResourceCache(cache_path)
+        expired = UnsupportedResourceCache(cache_path, ttl_seconds=0)
+
+        self.assertEqual(
+            load_resources_from_file(catalog, unsupported_cache=active), ["microsoft.entra.a"]
+        )
+        self.assertEqual(
+            load_resources_from_file(catalog, unsupported_cache=expired),
+            ["microsoft.entra.a", "microsoft.teams.b"],
+        )
+
+    def test_legacy_excluded_unsupported_types_are_read_back(self) -> None:
+        catalog = self._catalog(
+            resources=["microsoft.entra.a"],
+            excludedUnsupported=["microsoft.teams.b"],
+        )
+
+        self.assertEqual(
+            load_resources_from_file(catalog),
+            ["microsoft.entra.a", "microsoft.teams.b"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
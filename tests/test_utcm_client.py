@@ -0,0 +1,44 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from utcm_exporter.utcm_client import (
+    UTCMClientError,
+    _build_unique_display_name,
+    list_snapshot_jobs,
+)
+
+
+class DisplayNameTests(unittest.TestCase):
+    def test_tag_survives_truncation_of_long_base_names(self) -> None:
+        names = {
+            _build_unique_display_name("GitBackup entra-hourly schedule", f"S{shard}")
+            for shard in (1, 2, 12)
+        }
+
+        self.assertEqual(len(names), 3)
+        for name in names:
+            self.assertLessEqual(len(name), 32)
+            self.assertTrue(name.startswith("GitBackup e"), name)
+        self.assertTrue(any(" S12 " in name for name in names))
+
+    def test_untagged_name_keeps_base_and_timestamp(self) -> None:
+        name = _build_unique_display_name("GitBackup")
+
+        self.assertRegex(name, r"^GitBackup \d{8} \d{6}$")
+
+
+class BlockingWrapperTests(unittest.TestCase):
+    def test_blocking_call_inside_event_loop_points_to_async_variant(self) -> None:
+        session = mock.Mock()
+
+        async def call_blocking() -> None:
+            list_snapshot_jobs(session=session)
+
+        with self.assertRaisesRegex(UTCMClientError, r"await list_snapshot_jobs_async\("):
+            asyncio.run(call_blocking())
+        session.request.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()